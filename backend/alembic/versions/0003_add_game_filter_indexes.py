@@ -0,0 +1,27 @@
+"""Add composite indexes for per-user game filters
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Index games by user with end time and time class."""
+    op.create_index('ix_games_user_end_time', 'games', ['user_id', 'end_time'], unique=False)
+    op.create_index('ix_games_user_time_class', 'games', ['user_id', 'time_class', 'end_time'], unique=False)
+
+
+def downgrade():
+    """Drop the per-user game filter indexes."""
+    op.drop_index('ix_games_user_time_class', table_name='games')
+    op.drop_index('ix_games_user_end_time', table_name='games')
@@ -1,4 +1,5 @@
-from typing import List, Optional
+import asyncio
+from typing import Dict, List, Optional, Tuple
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
@@ -9,7 +10,6 @@ from ..services.chess_analysis import ChessAnalysisService
 from ..services.tier_service import get_tier_service
 from ..core.config import settings
 from loguru import logger
-import asyncio
 
 router = APIRouter()
 
@@ -50,50 +50,33 @@ class AnalysisRequest(BaseModel):
     mode: str = "auto"  # "auto", "stockfish-only", or "ai-enhanced"
 
 
-def analyze_game_background_wrapper(game_id: int, user_id: int):
-    """Wrapper to run async analysis in background task."""
-    asyncio.run(analyze_game_background(game_id, user_id))
-
-
-async def analyze_game_background(game_id: int, user_id: int):
-    """Background task to analyze a single game with Stockfish."""
-    
-    # Create new database session for background task
+def _load_game_for_analysis(game_id: int, user_id: int) -> Optional[Tuple[str, str]]:
+    """Look up a game's PGN and the user's color in it (None if either is missing)."""
     db = SessionLocal()
-    
     try:
-        logger.info(f"Starting analysis for game {game_id}")
-        
         # Get the game
         game = db.query(Game).filter(Game.id == game_id).first()
         if not game or not game.pgn:
             logger.warning(f"Game {game_id} not found or has no PGN")
-            return
+            return None
         
         # Get user to determine color
         user = db.query(User).filter(User.id == user_id).first()
         if not user:
             logger.warning(f"User {user_id} not found")
-            return
+            return None
         
         # Determine user's color
         user_color = "white" if game.white_username and game.white_username.lower() == user.chesscom_username else "black"
-        
-        # Initialize analysis service
-        analyzer = ChessAnalysisService(stockfish_path=settings.STOCKFISH_PATH)
-        
-        # Run analysis
-        logger.info(f"Analyzing game {game_id} with Stockfish...")
-        analysis_result = await analyzer.analyze_game(
-            game.pgn,
-            depth=settings.STOCKFISH_DEPTH,
-            time_limit=settings.STOCKFISH_TIME
-        )
-        
-        if not analysis_result:
-            logger.warning(f"Analysis failed for game {game_id}")
-            return
-        
+        return game.pgn, user_color
+    finally:
+        db.close()
+
+
+def _save_game_analysis(game_id: int, user_color: str, analysis_result: Dict) -> None:
+    """Create or update a game's analysis and mark the game analyzed."""
+    db = SessionLocal()
+    try:
         # Check if analysis already exists
         existing_analysis = db.query(GameAnalysis).filter(GameAnalysis.game_id == game_id).first()
         
@@ -136,16 +119,51 @@ async def analyze_game_background(game_id: int, user_id: int):
             logger.info(f"Created new analysis for game {game_id}")
         
         # Mark game as analyzed
-        game.is_analyzed = True
+        db.query(Game).filter(Game.id == game_id).update({Game.is_analyzed: True}, synchronize_session=False)
         
         db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def analyze_game_background(game_id: int, user_id: int):
+    """
+    Background task to analyze a single game with Stockfish.
+    
+    Runs on the app's event loop so it can borrow pooled engines; the blocking
+    database steps run in worker threads so other requests aren't held up.
+    """
+    try:
+        logger.info(f"Starting analysis for game {game_id}")
+        
+        loaded = await asyncio.to_thread(_load_game_for_analysis, game_id, user_id)
+        if loaded is None:
+            return
+        pgn, user_color = loaded
+        
+        # Initialize analysis service
+        analyzer = ChessAnalysisService(stockfish_path=settings.STOCKFISH_PATH)
+        
+        # Run analysis
+        logger.info(f"Analyzing game {game_id} with Stockfish...")
+        analysis_result = await analyzer.analyze_game(
+            pgn,
+            depth=settings.STOCKFISH_DEPTH,
+            time_limit=settings.STOCKFISH_TIME
+        )
+        
+        if not analysis_result:
+            logger.warning(f"Analysis failed for game {game_id}")
+            return
+        
+        await asyncio.to_thread(_save_game_analysis, game_id, user_color, analysis_result)
         logger.info(f"Successfully completed analysis for game {game_id}")
         
     except Exception as e:
         logger.error(f"Error analyzing game {game_id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
 
 
 @router.post("/{user_id}/analyze")
@@ -234,7 +252,8 @@ async def analyze_user_games(
     # Queue analysis tasks
     for game in games_to_analyze:
         if game.pgn:  # Only analyze games with PGN data
-            background_tasks.add_task(analyze_game_background_wrapper, game.id, user_id)
+            # Runs on the app event loop so pooled Stockfish engines can be reused
+            background_tasks.add_task(analyze_game_background, game.id, user_id)
     
     # Update user's analyzed_games count
     user.analyzed_games = db.query(Game).filter(
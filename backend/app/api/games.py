@@ -121,10 +121,8 @@ async def fetch_recent_games(
         games_added = 0
         games_updated = 0
         
-        for raw_game in raw_games:
-            # Parse game data
-            game_data = chesscom_api.parse_game_data(raw_game, user.chesscom_username)
-            
+        # Parse game data
+        for game_data in chesscom_api.parse_games(raw_games, user.chesscom_username):
             # Legacy filter by time class if specified
             if fetch_request.time_classes and game_data["time_class"] not in fetch_request.time_classes:
                 continue
@@ -71,6 +71,9 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str = os.getenv("SUPABASE_ANON_KEY", "")
     SUPABASE_SERVICE_ROLE_KEY: str = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
     SUPABASE_STORAGE_BUCKET: str = os.getenv("SUPABASE_STORAGE_BUCKET", "chess-insight-files")
+    SUPABASE_JWT_SECRET: str = os.getenv("SUPABASE_JWT_SECRET", "")  # Verifies legacy HS256 tokens locally
+    SUPABASE_RATE_LIMIT: float = float(os.getenv("SUPABASE_RATE_LIMIT", "20"))  # Auth requests per second
+    SUPABASE_RATE_BURST: int = int(os.getenv("SUPABASE_RATE_BURST", "40"))
     
     # Database connection URL
     SQLALCHEMY_DATABASE_URI: str = os.getenv("DATABASE_URL", "")
@@ -84,6 +87,7 @@ class Settings(BaseSettings):
     # Chess.com API
     CHESSCOM_API_BASE_URL: str = "https://api.chess.com/pub"
     CHESSCOM_API_RATE_LIMIT: int = 100  # requests per minute
+    CHESSCOM_MAX_CONCURRENCY: int = int(os.getenv("CHESSCOM_MAX_CONCURRENCY", "16"))  # requests in flight
     
     # Stockfish Engine
     STOCKFISH_PATH: str = os.getenv("STOCKFISH_PATH", "/usr/games/stockfish")
@@ -3,6 +3,7 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 import redis
+import redis.asyncio as aioredis
 import os
 
 from .config import settings
@@ -42,6 +43,9 @@ except (redis.ConnectionError, Exception) as e:
     print(f"⚠️ Redis not available: {e}. Using mock client for development.")
     redis_client = None
 
+# Async Redis client with its own connection pool (connects lazily on first command)
+async_redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True, max_connections=20)
+
 
 def get_db():
     """Dependency for getting database session."""
@@ -55,3 +59,26 @@ def get_db():
 def get_redis():
     """Dependency for getting Redis connection."""
     return redis_client
+
+
+def get_async_redis():
+    """Dependency for getting the async Redis client."""
+    return async_redis_client
+
+
+def redis_pipeline():
+    """
+    Get a non-transactional Redis pipeline for batching commands.
+    
+    Commands queued on the pipeline are sent in a single round trip:
+    
+        with redis_pipeline() as pipe:
+            pipe.get(key1)
+            pipe.get(key2)
+            value1, value2 = pipe.execute()
+    
+    Returns None when Redis is not available.
+    """
+    if redis_client is None:
+        return None
+    return redis_client.pipeline(transaction=False)
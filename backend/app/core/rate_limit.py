@@ -0,0 +1,106 @@
+"""Atomic Redis-backed quota counters and client-side rate limiting."""
+import asyncio
+import time
+from typing import Optional
+from loguru import logger
+
+from .database import redis_client
+
+# Seed the counter from the database value on first use, then check-and-increment
+# in a single server-side step so concurrent requests cannot overspend a quota.
+_CONSUME_QUOTA_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[2])
+end
+local used = tonumber(redis.call('GET', KEYS[1]))
+if used >= tonumber(ARGV[1]) then
+    return -1
+end
+local value = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return tonumber(ARGV[1]) - value
+"""
+
+# Counter keys expire so Redis never drifts far from the database counter
+AI_QUOTA_TTL_SECONDS = 24 * 3600
+
+# Script object issues EVALSHA and falls back to SCRIPT LOAD when needed
+_consume_quota_script = redis_client.register_script(_CONSUME_QUOTA_LUA) if redis_client is not None else None
+
+
+def consume_ai_quota(user_id: int, limit: int, used: int = 0) -> Optional[int]:
+    """
+    Atomically consume one AI analysis from a user's quota.
+    
+    Args:
+        user_id: User ID the quota belongs to
+        limit: Maximum number of AI analyses allowed
+        used: Current usage recorded in the database, used to seed the counter
+    
+    Returns:
+        Remaining analyses after consuming one, -1 if the quota is exhausted,
+        or None if Redis is unavailable and the caller should rely on the database
+    """
+    if _consume_quota_script is None:
+        return None
+    
+    try:
+        return int(_consume_quota_script(keys=[f"ai:{user_id}"], args=[limit, AI_QUOTA_TTL_SECONDS, used]))
+    except Exception as e:
+        logger.warning(f"Redis quota check failed for user {user_id}: {e}")
+        return None
+
+
+def reset_ai_quota(user_id: int) -> None:
+    """Drop the cached AI quota counter so it is re-seeded from the database."""
+    if redis_client is None:
+        return
+    
+    try:
+        redis_client.delete(f"ai:{user_id}")
+    except Exception as e:
+        logger.warning(f"Failed to reset Redis quota for user {user_id}: {e}")
+
+
+class TokenBucket:
+    """
+    Async token bucket for throttling calls to an upstream API.
+    
+    Bursts of up to `capacity` calls go through immediately; beyond that callers
+    wait until tokens refill at `rate` per second, instead of being rejected
+    (and retried) by the upstream rate limiter.
+    """
+    
+    def __init__(self, capacity: float, rate: float):
+        """
+        Args:
+            capacity: Maximum number of tokens (burst size)
+            rate: Tokens added per second
+        """
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+    
+    def _refill(self) -> None:
+        """Add the tokens accrued since the last refill."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+    
+    async def take(self, n: float = 1) -> None:
+        """
+        Take `n` tokens, waiting for them to refill if necessary.
+        
+        Raises:
+            ValueError: If `n` exceeds the capacity (the bucket can never hold that many)
+        """
+        if n > self.capacity:
+            raise ValueError(f"Cannot take {n} tokens from a bucket of capacity {self.capacity}")
+        
+        while True:
+            self._refill()
+            if self.tokens >= n:
+                self.tokens -= n
+                return
+            await asyncio.sleep((n - self.tokens) / self.rate)
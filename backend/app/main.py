@@ -1,18 +1,67 @@
+from contextlib import asynccontextmanager
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
 from loguru import logger
+from sqlalchemy import text
 import sys
 
 from .core.config import settings
 from .api import users, games, analysis, insights
-from .core.database import engine, Base
+from .core.database import engine, Base, redis_client, async_redis_client
+from .services.stockfish_pool import get_stockfish_pool, close_stockfish_pools
+from .services.chesscom_api import chesscom_api
+from .services.filter_service import warm_filter_kernel
+
+# Threads available to asyncio.to_thread
+DEFAULT_EXECUTOR_MAX_WORKERS = 32
+
+# Health probe statement, built once instead of per request
+_HEALTH_STMT = text("SELECT 1")
 
 # Configure logging
 logger.remove()
-logger.add(sys.stderr, level=settings.LOG_LEVEL)
+# enqueue=True hands records to a background thread so request handlers never block on stderr
+logger.add(sys.stderr, level=settings.LOG_LEVEL, enqueue=True, backtrace=False, diagnose=False)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create database tables and engine pools on startup and release them on shutdown."""
+    # Worker threads for blocking calls (Supabase SDK, DB probes) run via asyncio.to_thread
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=DEFAULT_EXECUTOR_MAX_WORKERS)
+    )
+    
+    # Drop any connections inherited from a forked parent process
+    engine.dispose()
+    await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+    
+    # Pre-warm Stockfish engines (analysis still works if this fails - engines start lazily)
+    try:
+        await get_stockfish_pool().start()
+    except Exception as e:
+        logger.warning(f"Stockfish pool not started: {e}")
+    
+    # JIT-compile the game filter kernel now rather than inside the first large filter request
+    await asyncio.to_thread(warm_filter_kernel)
+    
+    yield
+    
+    await close_stockfish_pools()
+    await chesscom_api.close()
+    engine.dispose()
+    if redis_client is not None:
+        redis_client.connection_pool.disconnect()
+    await async_redis_client.aclose()
+    # Flush queued log records
+    await logger.complete()
 
-# Create tables
-Base.metadata.create_all(bind=engine)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -21,6 +70,9 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     docs_url=f"{settings.API_V1_STR}/docs",
     redoc_url=f"{settings.API_V1_STR}/redoc",
+    # orjson serializes the large evaluation/game payloads much faster than stdlib json
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware with environment-aware configuration
@@ -53,14 +105,26 @@ async def root():
     }
 
 
-@app.get("/health")
+def _probe_database() -> None:
+    """Run the health probe query against the database."""
+    # AUTOCOMMIT skips the BEGIN/ROLLBACK pair around the probe query
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(_HEALTH_STMT)
+
+
+async def liveness_check(request):
+    """Lightweight liveness probe that skips dependency checks."""
+    return PlainTextResponse("ok")
+
+
+# Registered ahead of the API routers as a plain Starlette route so probes skip
+# FastAPI request validation and router matching
+app.router.routes.insert(0, Route("/health", liveness_check, methods=["GET"]))
+
+
 @app.get("/api/v1/health")
 async def health_check():
     """Health check endpoint with database connectivity test."""
-    from .core.database import SessionLocal
-    from sqlalchemy import text
-    import redis
-    
     health_status = {
         "status": "healthy",
         "version": settings.VERSION,
@@ -68,27 +132,28 @@ async def health_check():
         "checks": {}
     }
     
+    # Probe database and Redis concurrently
+    db_result, redis_result = await asyncio.gather(
+        asyncio.to_thread(_probe_database),
+        async_redis_client.ping(),
+        return_exceptions=True
+    )
+    
     # Check database connectivity
-    try:
-        db = SessionLocal()
-        db.execute(text("SELECT 1"))
-        db.close()
-        health_status["checks"]["database"] = "healthy"
-    except Exception as e:
-        logger.error(f"Database health check failed: {e}")
-        health_status["checks"]["database"] = f"unhealthy: {str(e)}"
+    if isinstance(db_result, Exception):
+        logger.error(f"Database health check failed: {db_result}")
+        health_status["checks"]["database"] = f"unhealthy: {str(db_result)}"
         health_status["status"] = "degraded"
+    else:
+        health_status["checks"]["database"] = "healthy"
     
     # Check Redis connectivity
-    try:
-        redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
-        redis_client.ping()
-        redis_client.close()
-        health_status["checks"]["redis"] = "healthy"
-    except Exception as e:
-        logger.error(f"Redis health check failed: {e}")
-        health_status["checks"]["redis"] = f"unhealthy: {str(e)}"
+    if isinstance(redis_result, Exception):
+        logger.error(f"Redis health check failed: {redis_result}")
+        health_status["checks"]["redis"] = f"unhealthy: {str(redis_result)}"
         health_status["status"] = "degraded"
+    else:
+        health_status["checks"]["redis"] = "healthy"
     
     # Return 503 if any critical service is down
     if health_status["status"] == "degraded":
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Text, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Text, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -8,6 +8,11 @@ class Game(Base):
     """Game model for storing Chess.com games."""
     
     __tablename__ = "games"
+    __table_args__ = (
+        # Per-user date range and time class filters (recent games, analysis batches)
+        Index("ix_games_user_end_time", "user_id", "end_time"),
+        Index("ix_games_user_time_class", "user_id", "time_class", "end_time"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, JSON, Text
+from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..core.database import Base
@@ -27,8 +28,9 @@ class User(Base):
     current_ratings = Column(JSON, nullable=True)  # Store different time control ratings
     
     # User preferences
-    analysis_preferences = Column(JSON, default={})
-    notification_preferences = Column(JSON, default={})
+    # default=dict gives each row its own dict; MutableDict tracks in-place edits
+    analysis_preferences = Column(MutableDict.as_mutable(JSON), default=dict)
+    notification_preferences = Column(MutableDict.as_mutable(JSON), default=dict)
     
     # Subscription tier management
     tier = Column(String, default="free")  # "free" or "pro"
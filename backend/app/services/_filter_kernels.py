@@ -0,0 +1,77 @@
+"""
+Compiled predicate kernel for GameColumnStore filtering.
+
+Numba is optional; without it NUMBA_AVAILABLE is False and FilterService
+keeps using NumPy boolean masks.
+"""
+import numpy as np
+from loguru import logger
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logger.warning("numba library not installed")
+
+
+def _filter_kernel(end_times, tc_codes, rated, start_ts, end_ts,
+                   allowed_mask, rated_only, unrated_only, limit):
+    """
+    Indices of the first `limit` games passing every predicate, in one scan.
+    
+    Args:
+        end_times: float64 end timestamps (NaN = missing)
+        tc_codes: int8 TIME_CLASS_CODES bits
+        rated: bool rated flags
+        start_ts / end_ts: Inclusive timestamp bounds (-inf / inf = unbounded)
+        allowed_mask: OR of allowed time class bits (0 = any time class)
+        rated_only / unrated_only: Rated status filters
+        limit: Maximum number of indices to return
+    
+    Returns:
+        int64 array of passing indices
+    """
+    out = np.empty(end_times.shape[0], np.int64)
+    k = 0
+    if limit <= 0:
+        return out[:0]
+    check_dates = start_ts > -np.inf or end_ts < np.inf
+    for i in range(end_times.shape[0]):
+        et = end_times[i]
+        if check_dates and (et != et or et < start_ts or et > end_ts):
+            continue
+        if allowed_mask != 0 and (tc_codes[i] & allowed_mask) == 0:
+            continue
+        if rated_only and not rated[i]:
+            continue
+        if unrated_only and rated[i]:
+            continue
+        out[k] = i
+        k += 1
+        if k == limit:
+            break
+    return out[:k]
+
+
+if NUMBA_AVAILABLE:
+    filter_kernel = njit(cache=True, boundscheck=False)(_filter_kernel)
+else:
+    filter_kernel = None
+
+
+def warm_filter_kernel() -> None:
+    """
+    Compile the kernel (or load it from Numba's cache) ahead of the first filter.
+    
+    Called once at application startup; compiling lazily would stall the first
+    large filter request in every worker for several seconds.
+    """
+    if filter_kernel is None:
+        return
+    
+    # Same argument types FilterService passes, so this is the specialization requests use
+    filter_kernel(
+        np.zeros(1, np.float64), np.zeros(1, np.int8), np.zeros(1, np.bool_),
+        -np.inf, np.inf, 0, False, False, 1
+    )
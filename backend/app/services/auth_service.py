@@ -1,14 +1,185 @@
 """Authentication service using Supabase Auth."""
-from typing import Optional, Dict, Any
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
+
+import httpx
+import jwt
+from cachetools import TTLCache
 from loguru import logger
 
 from ..core.supabase_client import get_supabase, get_supabase_admin
 from ..core.config import settings
+from ..core.rate_limit import TokenBucket
+
+
+# Validated users are cached for at most this long (and never past the token's exp)
+USER_CACHE_TTL_SECONDS = 60
+
+# Tokens this close to expiry are not cached
+USER_CACHE_MIN_REMAINING_SECONDS = 5
+
+# Validated user data keyed by SHA-256 of the access token -> (expires_at, user)
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL_SECONDS)
+
+
+def _token_cache_key(access_token: str) -> bytes:
+    """Hash the access token so raw tokens are never kept in memory as keys."""
+    return hashlib.sha256(access_token.encode()).digest()
+
+
+def _token_expiry(access_token: str) -> Optional[float]:
+    """Read the `exp` claim without verifying the signature (None if unavailable)."""
+    try:
+        claims = jwt.decode(access_token, options={"verify_signature": False})
+        return float(claims["exp"])
+    except Exception:
+        return None
+
+
+def _invalidate_cached_user(access_token: str) -> None:
+    """Drop any cached validation result for a token."""
+    _user_cache.pop(_token_cache_key(access_token), None)
+
+
+def _cache_user(access_token: str, user_data: Dict[str, Any], expires_at: Optional[float]) -> None:
+    """Cache a validated user until the token expires (capped at the cache TTL)."""
+    now = time.time()
+    if expires_at and expires_at - now > USER_CACHE_MIN_REMAINING_SECONDS:
+        _user_cache[_token_cache_key(access_token)] = (min(expires_at, now + USER_CACHE_TTL_SECONDS), user_data)
+
+
+# Client-side throttles for Supabase Auth: credential flows and session calls
+auth_signin_bucket = TokenBucket(settings.SUPABASE_RATE_BURST, settings.SUPABASE_RATE_LIMIT)
+auth_session_bucket = TokenBucket(settings.SUPABASE_RATE_BURST, settings.SUPABASE_RATE_LIMIT)
+
+
+# The shared client keeps one session, so set_session and the call that uses it
+# must not interleave with another request's in the worker threads
+_session_lock = threading.Lock()
+
+
+# Successful refreshes are reused for this long (covers client retries)
+REFRESH_CACHE_TTL_SECONDS = 5
+
+# Refresh results and in-flight refreshes keyed by SHA-256 of the refresh token
+_refresh_cache: TTLCache = TTLCache(maxsize=1_000, ttl=REFRESH_CACHE_TTL_SECONDS)
+_refresh_inflight: Dict[bytes, "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+# Asymmetric algorithms accepted for tokens signed with a JWKS key
+JWKS_ALGORITHMS = ("RS256", "ES256")
+
+# Minimum time between JWKS refetches triggered by an unknown key ID
+JWKS_REFRESH_COOLDOWN_SECONDS = 300
+
+# Supabase signing keys by key ID
+_jwks: Dict[str, jwt.PyJWK] = {}
+_jwks_fetched_at = 0.0
+
+
+async def _get_signing_key(kid: str) -> Optional[jwt.PyJWK]:
+    """Get a Supabase signing key, refetching the JWKS on an unknown key ID."""
+    global _jwks_fetched_at
+    
+    if kid in _jwks or time.time() - _jwks_fetched_at < JWKS_REFRESH_COOLDOWN_SECONDS:
+        return _jwks.get(kid)
+    
+    # Set before fetching so failures are also subject to the cooldown
+    _jwks_fetched_at = time.time()
+    try:
+        async with httpx.AsyncClient(timeout=httpx.Timeout(5.0)) as client:
+            response = await client.get(f"{settings.SUPABASE_URL}/auth/v1/.well-known/jwks.json")
+            response.raise_for_status()
+        
+        jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        _jwks.clear()
+        _jwks.update({key.key_id: key for key in jwk_set.keys if key.key_id})
+    except Exception as e:
+        logger.warning(f"Failed to fetch Supabase JWKS: {e}")
+    
+    return _jwks.get(kid)
+
+
+async def _verify_token_locally(access_token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify a Supabase access token's signature and claims without a network call.
+    
+    Returns:
+        Token claims, or None if the token can't be verified locally
+    
+    Raises:
+        jwt.ExpiredSignatureError: If the token is validly signed but expired
+    """
+    try:
+        header = jwt.get_unverified_header(access_token)
+    except jwt.PyJWTError:
+        return None
+    
+    algorithm = header.get("alg")
+    if algorithm == "HS256" and settings.SUPABASE_JWT_SECRET:
+        key = settings.SUPABASE_JWT_SECRET
+    elif algorithm in JWKS_ALGORITHMS and header.get("kid"):
+        signing_key = await _get_signing_key(header["kid"])
+        if signing_key is None:
+            return None
+        key = signing_key.key
+    else:
+        return None
+    
+    try:
+        return jwt.decode(
+            access_token,
+            key=key,
+            algorithms=[algorithm],
+            audience="authenticated",
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.ExpiredSignatureError:
+        raise
+    except jwt.PyJWTError:
+        return None
+
+
+def _user_from_claims(claims: Dict[str, Any]) -> Dict[str, Any]:
+    """Build user data from verified token claims."""
+    return {
+        "id": claims["sub"],
+        "email": claims.get("email"),
+        "phone": claims.get("phone"),
+        "role": claims.get("role"),
+        "aud": claims.get("aud"),
+        "app_metadata": claims.get("app_metadata") or {},
+        "user_metadata": claims.get("user_metadata") or {},
+    }
+
+
+def _user_from_supabase(response: Any) -> Dict[str, Any]:
+    """Build user data with the same fields as _user_from_claims from a Supabase user."""
+    # The SDK wraps the user in a UserResponse
+    user = getattr(response, "user", None) or response
+    data = user.dict()
+    return {
+        "id": data["id"],
+        "email": data.get("email"),
+        "phone": data.get("phone"),
+        "role": data.get("role"),
+        "aud": data.get("aud"),
+        "app_metadata": data.get("app_metadata") or {},
+        "user_metadata": data.get("user_metadata") or {},
+    }
 
 
 class AuthService:
-    """Handle authentication operations with Supabase."""
+    """
+    Handle authentication operations with Supabase.
+    
+    The Supabase SDK is synchronous, so its calls run in a worker thread to keep
+    the event loop free while waiting on the auth API.
+    """
     
     @staticmethod
     async def sign_up(email: str, password: str, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -27,7 +198,8 @@ class AuthService:
             supabase = get_supabase()
             
             # Sign up user with Supabase Auth
-            auth_response = supabase.auth.sign_up({
+            await auth_signin_bucket.take()
+            auth_response = await asyncio.to_thread(supabase.auth.sign_up, {
                 "email": email,
                 "password": password,
                 "options": {
@@ -65,7 +237,8 @@ class AuthService:
         try:
             supabase = get_supabase()
             
-            auth_response = supabase.auth.sign_in_with_password({
+            await auth_signin_bucket.take()
+            auth_response = await asyncio.to_thread(supabase.auth.sign_in_with_password, {
                 "email": email,
                 "password": password
             })
@@ -98,9 +271,11 @@ class AuthService:
         Returns:
             Dict with success status
         """
+        _invalidate_cached_user(access_token)
         try:
             supabase = get_supabase()
-            supabase.auth.sign_out()
+            await auth_session_bucket.take()
+            await asyncio.to_thread(supabase.auth.sign_out)
             logger.info("User signed out successfully")
             return {"success": True}
         except Exception as e:
@@ -108,24 +283,46 @@ class AuthService:
             return {"success": False, "error": str(e)}
     
     @staticmethod
-    async def get_user(access_token: str) -> Optional[Dict[str, Any]]:
+    async def get_user(access_token: str, force_refresh: bool = False) -> Optional[Dict[str, Any]]:
         """
         Get user details from access token.
         
+        The token is verified locally against the Supabase signing keys; Supabase
+        is only queried when local verification isn't possible or when fresh
+        user data is requested.
+        
         Args:
             access_token: JWT access token
+            force_refresh: Fetch the user from Supabase instead of using token claims
         
         Returns:
             User data or None if invalid
         """
+        if not force_refresh:
+            cached: Optional[Tuple[float, Dict[str, Any]]] = _user_cache.get(_token_cache_key(access_token))
+            if cached and cached[0] > time.time():
+                return cached[1]
+            
+            try:
+                claims = await _verify_token_locally(access_token)
+            except jwt.ExpiredSignatureError:
+                return None
+            
+            if claims:
+                user_data = _user_from_claims(claims)
+                _cache_user(access_token, user_data, float(claims["exp"]))
+                return user_data
+        
         try:
             supabase = get_supabase()
-            # Set the session
-            supabase.auth.set_session(access_token, access_token)
             
-            user = supabase.auth.get_user()
+            await auth_session_bucket.take()
+            # Passing the token avoids touching the shared client's session
+            user = await asyncio.to_thread(supabase.auth.get_user, access_token)
             if user:
-                return user.dict()
+                user_data = _user_from_supabase(user)
+                _cache_user(access_token, user_data, _token_expiry(access_token))
+                return user_data
             return None
         except Exception as e:
             logger.error(f"Get user error: {str(e)}")
@@ -136,24 +333,47 @@ class AuthService:
         """
         Refresh access token using refresh token.
         
+        Concurrent refreshes of the same token share one Supabase call, and a
+        successful result is reused for retries within a few seconds.
+        
         Args:
             refresh_token: Refresh token from previous session
         
         Returns:
             Dict with new access and refresh tokens
         """
+        key = _token_cache_key(refresh_token)
+        cached = _refresh_cache.get(key)
+        if cached:
+            return cached
+        
+        task = _refresh_inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(AuthService._refresh_session(refresh_token))
+            _refresh_inflight[key] = task
+            task.add_done_callback(lambda _: _refresh_inflight.pop(key, None))
+        
+        # Shielded so one cancelled caller doesn't cancel the refresh for the others
+        return await asyncio.shield(task)
+    
+    @staticmethod
+    async def _refresh_session(refresh_token: str) -> Dict[str, Any]:
+        """Exchange a refresh token with Supabase, caching successful results."""
         try:
             supabase = get_supabase()
             
-            auth_response = supabase.auth.refresh_session(refresh_token)
+            await auth_session_bucket.take()
+            auth_response = await asyncio.to_thread(supabase.auth.refresh_session, refresh_token)
             
             if auth_response.session:
                 logger.info("Token refreshed successfully")
-                return {
+                result = {
                     "access_token": auth_response.session.access_token,
                     "refresh_token": auth_response.session.refresh_token,
                     "success": True
                 }
+                _refresh_cache[_token_cache_key(refresh_token)] = result
+                return result
             else:
                 return {"success": False, "error": "Token refresh failed"}
                 
@@ -174,7 +394,8 @@ class AuthService:
         """
         try:
             supabase = get_supabase()
-            supabase.auth.reset_password_email(email)
+            await auth_signin_bucket.take()
+            await asyncio.to_thread(supabase.auth.reset_password_email, email)
             logger.info(f"Password reset email sent to: {email}")
             return {"success": True, "message": "Password reset email sent"}
         except Exception as e:
@@ -200,9 +421,9 @@ class AuthService:
         Returns:
             Dict with updated user data
         """
+        _invalidate_cached_user(access_token)
         try:
             supabase = get_supabase()
-            supabase.auth.set_session(access_token, access_token)
             
             update_data = {}
             if email:
@@ -212,7 +433,13 @@ class AuthService:
             if metadata:
                 update_data["data"] = metadata
             
-            user = supabase.auth.update_user(update_data)
+            def apply_update():
+                with _session_lock:
+                    supabase.auth.set_session(access_token, access_token)
+                    return supabase.auth.update_user(update_data)
+            
+            await auth_session_bucket.take()
+            user = await asyncio.to_thread(apply_update)
             
             if user:
                 logger.info("User updated successfully")
@@ -3,19 +3,84 @@ Chess game analysis service using Stockfish engine.
 Based on python-chess official documentation.
 """
 
+import asyncio
+import os
 import chess
 import chess.engine
-import chess.pgn
-import io
-from typing import Dict, List, Optional
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional, Union
 from loguru import logger
 
+from .pgn_parser import parse_game
+from .stockfish_pool import get_stockfish_pool
+
+
+# Move classification labels, in the order they are reported
+MOVE_CLASSIFICATIONS = (
+    "brilliant", "great", "best", "excellent", "good", "inaccuracy", "mistake", "blunder"
+)
+
+# Upper bounds (inclusive) of centipawn loss for each label in LOSS_CLASSIFICATIONS;
+# anything above the last bound is a blunder
+LOSS_THRESHOLDS = (10, 25, 50, 100, 300)
+LOSS_CLASSIFICATIONS = ("best", "excellent", "good", "inaccuracy", "mistake", "blunder")
+
+# Centipawn value of a forced mate
+MATE_SCORE = 10000
+
 
 class ChessAnalysisService:
     """Service for analyzing chess games using Stockfish."""
     
-    def __init__(self, stockfish_path: str = "/usr/games/stockfish"):
+    def __init__(self, stockfish_path: str = "/usr/games/stockfish", max_workers: Optional[int] = None):
         self.stockfish_path = stockfish_path
+        self.pool = get_stockfish_pool(stockfish_path)
+        # Max positions of one game evaluated concurrently (1 = sequential)
+        self.max_workers = max_workers or self.pool.max_size
+    
+    async def _evaluate_positions(
+        self,
+        positions: List[chess.Board],
+        limit: chess.engine.Limit
+    ) -> List[chess.engine.InfoDict]:
+        """
+        Evaluate positions on pooled engines, at most `max_workers` at a time.
+        
+        Returns:
+            One engine info dict per position, in the same order as `positions`
+        """
+        workers = asyncio.Semaphore(self.max_workers)
+        
+        async def evaluate(position: chess.Board) -> chess.engine.InfoDict:
+            async with workers:
+                async with self.pool.acquire() as engine:
+                    return await engine.analyse(position, limit)
+        
+        return await asyncio.gather(*(evaluate(position) for position in positions))
+    
+    async def _evaluate_line(
+        self,
+        board: chess.Board,
+        moves: List[chess.Move],
+        limit: chess.engine.Limit
+    ) -> List[chess.engine.InfoDict]:
+        """
+        Evaluate a start position and the position after each move on one engine.
+        
+        Moves are pushed onto `board` in place, so no position copies are made
+        and python-chess sends each position to the engine as a move list.
+        
+        Returns:
+            One engine info dict per position (start position first)
+        """
+        game_key = object()
+        async with self.pool.acquire() as engine:
+            infos = [await engine.analyse(board, limit, game=game_key)]
+            for move in moves:
+                board.push(move)
+                infos.append(await engine.analyse(board, limit, game=game_key))
+        return infos
     
     async def analyze_game(
         self, 
@@ -42,42 +107,43 @@ class ChessAnalysisService:
         try:
             logger.info(f"Starting game analysis with depth={depth}, time={time_limit}")
             
-            # Initialize Stockfish engine
-            transport, engine = await chess.engine.popen_uci(self.stockfish_path)
-            logger.info("Stockfish engine initialized successfully")
-            
             # Parse PGN
-            game = chess.pgn.read_game(io.StringIO(pgn_text))
+            game = parse_game(pgn_text)
             if not game:
                 raise ValueError("Invalid PGN - could not parse game")
             
+            # Collect every position once - the position after move N is
+            # the position before move N+1, so each is evaluated only once.
+            # SAN, side to move and ply are read off the live board as it is
+            # walked; position copies are only needed for concurrent evaluation.
+            concurrent = self.max_workers > 1
             board = game.board()
+            positions = [board.copy(stack=False)] if concurrent else []
+            moves = []
+            for node in game.mainline():
+                move = node.move
+                san = board.san(move)
+                turn_before = board.turn
+                board.push(move)
+                moves.append((move, san, turn_before, board.ply()))
+                if concurrent:
+                    positions.append(board.copy(stack=False))
+            
+            # Evaluate positions on pooled Stockfish engines
+            limit = chess.engine.Limit(depth=depth, time=time_limit)
+            if concurrent:
+                infos = await self._evaluate_positions(positions, limit)
+            else:
+                infos = await self._evaluate_line(game.board(), [m[0] for m in moves], limit)
             
             # Analyze each position
             move_data = []
             total_centipawn_loss = 0
             move_count = 0
             
-            for node in game.mainline():
-                move = node.move
-                
-                # Get position BEFORE move
-                position_before = board.copy()
-                
-                # Analyze best move in current position
-                info_before = await engine.analyse(
-                    position_before,
-                    chess.engine.Limit(depth=depth, time=time_limit)
-                )
-                
-                # Make the played move
-                board.push(move)
-                
-                # Analyze position AFTER move
-                info_after = await engine.analyse(
-                    board,
-                    chess.engine.Limit(depth=depth, time=time_limit)
-                )
+            for index, (move, san, turn_before, ply) in enumerate(moves):
+                info_before = infos[index]
+                info_after = infos[index + 1]
                 
                 # Calculate centipawn loss
                 score_before = info_before.get("score")
@@ -85,27 +151,28 @@ class ChessAnalysisService:
                 
                 if score_before and score_after:
                     # Convert scores to centipawns from player's perspective (who made the move)
-                    player_turn = position_before.turn
-                    cp_before = self._score_to_centipawns(score_before, player_turn)
-                    cp_after = self._score_to_centipawns(score_after, player_turn)
+                    cp_before = self._score_to_centipawns(score_before, turn_before)
+                    cp_after = self._score_to_centipawns(score_after, turn_before)
+                    
+                    # Engine's best move in the position the move was played from
+                    pv = info_before.get("pv")
+                    best_move = pv[0] if pv else None
                     
-                    # Centipawn loss (always positive - how much worse the position got)
-                    cp_loss = max(0, cp_before - cp_after)
+                    # Centipawn loss (always positive - how much worse the position got).
+                    # Playing the engine's own choice loses nothing by definition; comparing
+                    # two separate searches would only add search noise.
+                    cp_loss = 0 if move == best_move else max(0, cp_before - cp_after)
                     total_centipawn_loss += cp_loss
                     move_count += 1
                     
                     # Classify move based on centipawn loss
                     classification = self._classify_move(cp_loss)
-                    
-                    # Get best move suggestion
-                    best_move_uci = None
-                    if info_before.get("pv"):
-                        best_move_uci = info_before["pv"][0].uci()
+                    best_move_uci = best_move.uci() if best_move else None
                     
                     move_data.append({
                         "move": move.uci(),
-                        "move_san": position_before.san(move),
-                        "ply": board.ply(),
+                        "move_san": san,
+                        "ply": ply,
                         "centipawn_loss": round(cp_loss, 2),
                         "classification": classification,
                         "best_move": best_move_uci,
@@ -121,21 +188,12 @@ class ChessAnalysisService:
             # Perfect play (0 CP loss) = 100%, 100 CP loss = ~0%
             accuracy_percentage = max(0, min(100, 100 - (average_cp_loss / 10)))
             
-            # Count move classifications
+            # Count move classifications in a single pass
+            classification_counts = Counter(m["classification"] for m in move_data)
             move_classifications = {
-                "brilliant": sum(1 for m in move_data if m["classification"] == "brilliant"),
-                "great": sum(1 for m in move_data if m["classification"] == "great"),
-                "best": sum(1 for m in move_data if m["classification"] == "best"),
-                "excellent": sum(1 for m in move_data if m["classification"] == "excellent"),
-                "good": sum(1 for m in move_data if m["classification"] == "good"),
-                "inaccuracy": sum(1 for m in move_data if m["classification"] == "inaccuracy"),
-                "mistake": sum(1 for m in move_data if m["classification"] == "mistake"),
-                "blunder": sum(1 for m in move_data if m["classification"] == "blunder"),
+                label: classification_counts.get(label, 0) for label in MOVE_CLASSIFICATIONS
             }
             
-            # Close engine before returning
-            await engine.quit()
-            
             return {
                 "accuracy_percentage": round(accuracy_percentage, 2),
                 "average_centipawn_loss": round(average_cp_loss, 2),
@@ -150,33 +208,48 @@ class ChessAnalysisService:
         except Exception as e:
             logger.error(f"Analysis failed: {e}")
             raise
-        finally:
-            # Ensure engine is always closed
-            try:
-                await engine.quit()
-            except:
-                pass
     
-    def _score_to_centipawns(self, score: chess.engine.Score, turn: bool) -> float:
+    async def analyze_games(
+        self,
+        pgn_texts: List[str],
+        depth: int = 15,
+        time_limit: float = 1.0,
+        max_concurrent: Optional[int] = None
+    ) -> List[Union[Dict, Exception]]:
+        """
+        Analyze several games concurrently.
+        
+        Args:
+            pgn_texts: PGN strings of the games
+            depth: Stockfish search depth (default: 15)
+            time_limit: Time limit per position in seconds (default: 1.0)
+            max_concurrent: Max games analyzed at once (default: half the CPU count)
+        
+        Returns:
+            One result per game, in input order - the analysis dict, or the
+            exception raised while analyzing that game
+        """
+        games = asyncio.Semaphore(max_concurrent or max(1, (os.cpu_count() or 1) // 2))
+        
+        async def analyze(pgn_text: str) -> Dict:
+            async with games:
+                return await self.analyze_game(pgn_text, depth=depth, time_limit=time_limit)
+        
+        return await asyncio.gather(*(analyze(pgn_text) for pgn_text in pgn_texts), return_exceptions=True)
+    
+    def _score_to_centipawns(self, score: chess.engine.PovScore, turn: chess.Color) -> float:
         """
-        Convert chess.engine.Score to centipawns from current player's perspective.
+        Convert an engine score to centipawns from the given player's perspective.
         
         Args:
             score: Score object from engine analysis
-            turn: Current turn (chess.WHITE or chess.BLACK)
+            turn: Player whose perspective to use (chess.WHITE or chess.BLACK)
         
         Returns:
-            Centipawn value (positive = advantage, negative = disadvantage)
+            Centipawn value (positive = advantage, negative = disadvantage);
+            mates count as +/-10000 minus the distance to mate
         """
-        if score.is_mate():
-            # Mate score: assign very high/low value
-            mate_in = score.relative.mate()
-            return 10000 if mate_in > 0 else -10000
-        else:
-            # Regular centipawn score
-            cp = score.relative.score()
-            # Ensure score is from current player's perspective
-            return cp if cp is not None else 0
+        return score.pov(turn).score(mate_score=MATE_SCORE)
     
     def _classify_move(self, centipawn_loss: float) -> str:
         """
@@ -189,15 +262,4 @@ class ChessAnalysisService:
         Returns:
             Move classification string
         """
-        if centipawn_loss <= 10:
-            return "best"
-        elif centipawn_loss <= 25:
-            return "excellent"
-        elif centipawn_loss <= 50:
-            return "good"
-        elif centipawn_loss <= 100:
-            return "inaccuracy"
-        elif centipawn_loss <= 300:
-            return "mistake"
-        else:
-            return "blunder"
+        return LOSS_CLASSIFICATIONS[bisect_left(LOSS_THRESHOLDS, centipawn_loss)]
@@ -1,5 +1,8 @@
-import io
+import atexit
 import re
+import threading
+from collections import Counter
+from itertools import islice
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from datetime import datetime
@@ -7,18 +10,58 @@ from datetime import datetime
 import chess
 import chess.pgn
 import chess.engine
-from stockfish import Stockfish
+import numpy as np
 from loguru import logger
 
 from ..core.config import settings
+from .pgn_parser import parse_game
 
 
-@dataclass
+# Common openings by their first moves (UCI) -> (ECO code, opening name).
+# Used when the PGN headers don't name the opening; the longest matching prefix wins.
+ECO_BY_UCI_PREFIX: Dict[Tuple[str, ...], Tuple[str, str]] = {
+    ("e2e4",): ("B00", "King's Pawn Opening"),
+    ("e2e4", "e7e5"): ("C20", "King's Pawn Game"),
+    ("e2e4", "e7e5", "g1f3", "g8f6"): ("C42", "Petrov's Defense"),
+    ("e2e4", "e7e5", "g1f3", "b8c6", "d2d4"): ("C44", "Scotch Game"),
+    ("e2e4", "e7e5", "g1f3", "b8c6", "f1c4"): ("C50", "Italian Game"),
+    ("e2e4", "e7e5", "g1f3", "b8c6", "f1b5"): ("C60", "Ruy Lopez"),
+    ("e2e4", "c7c5"): ("B20", "Sicilian Defense"),
+    ("e2e4", "e7e6"): ("C00", "French Defense"),
+    ("e2e4", "c7c6"): ("B10", "Caro-Kann Defense"),
+    ("e2e4", "d7d5"): ("B01", "Scandinavian Defense"),
+    ("e2e4", "g8f6"): ("B02", "Alekhine's Defense"),
+    ("e2e4", "d7d6", "d2d4", "g8f6"): ("B07", "Pirc Defense"),
+    ("d2d4",): ("A40", "Queen's Pawn Opening"),
+    ("d2d4", "d7d5"): ("D00", "Queen's Pawn Game"),
+    ("d2d4", "d7d5", "c2c4"): ("D06", "Queen's Gambit"),
+    ("d2d4", "d7d5", "c2c4", "d5c4"): ("D20", "Queen's Gambit Accepted"),
+    ("d2d4", "d7d5", "c2c4", "e7e6"): ("D30", "Queen's Gambit Declined"),
+    ("d2d4", "d7d5", "c2c4", "c7c6"): ("D10", "Slav Defense"),
+    ("d2d4", "g8f6", "c2c4", "e7e6", "b1c3", "f8b4"): ("E20", "Nimzo-Indian Defense"),
+    ("d2d4", "g8f6", "c2c4", "g7g6"): ("E60", "King's Indian Defense"),
+    ("c2c4",): ("A10", "English Opening"),
+    ("g1f3",): ("A04", "Reti Opening"),
+}
+
+# Longest book line, i.e. how many moves a lookup needs to read
+ECO_MAX_PLIES = max(len(line) for line in ECO_BY_UCI_PREFIX)
+
+
+def lookup_opening(uci_moves: Tuple[str, ...]) -> Optional[Tuple[str, str]]:
+    """Find the (ECO code, name) of the longest book line that prefixes the given moves."""
+    for length in range(min(len(uci_moves), ECO_MAX_PLIES), 0, -1):
+        opening = ECO_BY_UCI_PREFIX.get(uci_moves[:length])
+        if opening:
+            return opening
+    return None
+
+
+@dataclass(frozen=True, slots=True)
 class MoveEvaluation:
     """Represents the evaluation of a single move."""
     move_number: int
     move: str
-    position_fen: str
     evaluation: float  # In centipawns
     best_move: Optional[str]
     mate_in: Optional[int]
@@ -26,7 +69,7 @@ class MoveEvaluation:
     evaluation_change: Optional[float]  # Change from previous position
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class GamePhase:
     """Represents statistics for a game phase."""
     name: str
@@ -37,7 +80,7 @@ class GamePhase:
     key_positions: List[MoveEvaluation]
 
 
-@dataclass
+@dataclass(slots=True)
 class AnalysisResult:
     """Complete analysis result for a game."""
     game_id: str
@@ -81,11 +124,27 @@ class AnalysisResult:
 class ChessAnalyzer:
     """Chess game analyzer using Stockfish engine."""
     
+    # Move classification -> AnalysisResult counter field
+    CLASSIFICATION_FIELDS = {
+        'brilliant': 'brilliant_moves',
+        'great': 'great_moves',
+        'best': 'best_moves',
+        'excellent': 'excellent_moves',
+        'good': 'good_moves',
+        'inaccuracy': 'inaccuracies',
+        'mistake': 'mistakes',
+        'blunder': 'blunders',
+    }
+    
     def __init__(self):
         self.stockfish_path = settings.STOCKFISH_PATH
         self.analysis_depth = settings.STOCKFISH_DEPTH
         self.analysis_time = settings.STOCKFISH_TIME
         
+        # Stockfish process reused across analyze_game calls
+        self._engine: Optional[chess.engine.SimpleEngine] = None
+        self._engine_lock = threading.Lock()
+        
         # Move classification thresholds (in centipawns)
         self.thresholds = {
             'brilliant': -50,    # Sacrifice or spectacular move
@@ -98,29 +157,66 @@ class ChessAnalyzer:
             'blunder': 300       # Major blunder
         }
     
-    def _get_stockfish_engine(self) -> Stockfish:
-        """Initialize Stockfish engine."""
+    def _get_stockfish_engine(self) -> chess.engine.SimpleEngine:
+        """Get the long-lived Stockfish engine, starting it on first use."""
+        if self._engine is not None:
+            return self._engine
+        
         try:
-            stockfish = Stockfish(
-                path=self.stockfish_path,
-                depth=self.analysis_depth,
-                parameters={
-                    "Hash": 512,
-                    "Threads": 2,
-                    "Minimum Thinking Time": int(self.analysis_time * 1000),
-                }
-            )
-            return stockfish
+            engine = chess.engine.SimpleEngine.popen_uci(self.stockfish_path)
+            engine.configure({"Hash": 512, "Threads": 2})
+            self._engine = engine
+            return engine
         except Exception as e:
             logger.error(f"Failed to initialize Stockfish: {e}")
             raise RuntimeError(f"Stockfish initialization failed: {e}")
     
+    def _close_engine(self) -> None:
+        """Quit the Stockfish engine if it is running."""
+        engine, self._engine = self._engine, None
+        if engine is not None:
+            try:
+                engine.quit()
+            except Exception:
+                pass
+    
+    def close(self) -> None:
+        """Release the Stockfish engine process."""
+        with self._engine_lock:
+            self._close_engine()
+    
+    def _evaluate_position(
+        self,
+        engine: chess.engine.SimpleEngine,
+        board: chess.Board,
+        game_key: object = None
+    ) -> Tuple[int, Optional[int], Optional[chess.Move]]:
+        """
+        Evaluate a position with a single engine search.
+        
+        Returns:
+            Tuple of (centipawns from White's perspective, mate in N or None, best move or None)
+        """
+        info = engine.analyse(
+            board,
+            chess.engine.Limit(depth=self.analysis_depth, time=self.analysis_time),
+            info=chess.engine.Info.SCORE | chess.engine.Info.PV,
+            game=game_key
+        )
+        
+        score = info["score"].white()
+        mate_in = score.mate()
+        eval_cp = score.score() if mate_in is None else 0
+        
+        pv = info.get("pv")
+        best_move = pv[0] if pv else None
+        
+        return eval_cp, mate_in, best_move
+    
     def parse_pgn(self, pgn_string: str) -> Optional[chess.pgn.Game]:
         """Parse PGN string into chess.pgn.Game object."""
         try:
-            pgn_io = io.StringIO(pgn_string)
-            game = chess.pgn.read_game(pgn_io)
-            return game
+            return parse_game(pgn_string)
         except Exception as e:
             logger.error(f"Failed to parse PGN: {e}")
             return None
@@ -132,18 +228,28 @@ class ChessAnalyzer:
         opening_name = game.headers.get("Opening")
         eco_code = game.headers.get("ECO")
         
+        # Fall back to the opening book when the headers are incomplete
+        if not opening_name or not eco_code:
+            uci_moves = tuple(move.uci() for move in islice(game.mainline_moves(), ECO_MAX_PLIES))
+            book_opening = lookup_opening(uci_moves)
+            if book_opening:
+                eco_code = eco_code or book_opening[0]
+                opening_name = opening_name or book_opening[1]
+        
         # Count opening moves (typically first 10-15 moves)
+        # The board is pushed move by move (node.board() would replay the game from the root)
         opening_moves = 0
         node = game
+        board = game.board()
         while node.variations and opening_moves < 20:
             node = node.variations[0]
+            board.push(node.move)
             opening_moves += 1
             
             # Simple heuristic: opening ends when pieces start getting traded
             # or when we reach move 15
             if opening_moves >= 10:
-                board = node.board()
-                if len(board.piece_map()) < 30:  # Pieces have been traded
+                if chess.popcount(board.occupied) < 30:  # Pieces have been traded
                     break
         
         return opening_name, eco_code, min(opening_moves, 15)
@@ -164,19 +270,46 @@ class ChessAnalyzer:
         else:
             return 'blunder'
     
-    def determine_game_phases(self, total_moves: int, evaluations: List[MoveEvaluation]) -> Tuple[GamePhase, GamePhase, GamePhase]:
-        """Determine game phase boundaries and calculate phase statistics."""
+    @staticmethod
+    def _abs_changes(evaluations: List[MoveEvaluation]) -> np.ndarray:
+        """Absolute evaluation changes of the given moves as one array."""
+        return np.abs(np.fromiter(
+            (ev.evaluation_change or 0.0 for ev in evaluations),
+            dtype=np.float64,
+            count=len(evaluations)
+        ))
+    
+    def determine_game_phases(
+        self,
+        total_moves: int,
+        evaluations: List[MoveEvaluation],
+        abs_changes: Optional[np.ndarray] = None
+    ) -> Tuple[GamePhase, GamePhase, GamePhase]:
+        """
+        Determine game phase boundaries and calculate phase statistics.
+        
+        Args:
+            abs_changes: Absolute evaluation changes of `evaluations`, if already
+                computed (derived from `evaluations` otherwise)
+        """
         
         # Simple heuristic for game phases
         opening_end = min(20, total_moves // 3)
         endgame_start = max(opening_end + 10, total_moves * 2 // 3)
         
+        # Evaluations are ordered by move number, so each phase is a contiguous slice
+        move_numbers = np.fromiter((ev.move_number for ev in evaluations), dtype=np.int64, count=len(evaluations))
+        if abs_changes is None:
+            abs_changes = self._abs_changes(evaluations)
+        
         def create_phase(name: str, start: int, end: int) -> GamePhase:
-            phase_moves = [ev for ev in evaluations if start <= ev.move_number < end]
-            acpl = sum(abs(ev.evaluation_change or 0) for ev in phase_moves) / max(len(phase_moves), 1)
+            lo, hi = np.searchsorted(move_numbers, [start, end])
+            phase_moves = evaluations[lo:hi]
+            phase_changes = abs_changes[lo:hi]
+            acpl = float(phase_changes.sum()) / max(len(phase_moves), 1)
             
             # Identify key positions (large evaluation swings)
-            key_positions = [ev for ev in phase_moves if abs(ev.evaluation_change or 0) > 100]
+            key_positions = [phase_moves[i] for i in np.flatnonzero(phase_changes > 100)]
             
             return GamePhase(
                 name=name,
@@ -204,104 +337,110 @@ class ChessAnalyzer:
             logger.error("Failed to parse PGN")
             return None
         
-        # Initialize Stockfish
-        try:
-            stockfish = self._get_stockfish_engine()
-        except RuntimeError as e:
-            logger.error(f"Stockfish initialization failed: {e}")
-            return None
-        
         # Extract opening information
         opening_name, opening_eco, opening_moves = self.extract_opening_info(game)
         
         # Analyze each position
         evaluations = []
         board = game.board()
-        stockfish.set_fen_position(board.fen())
-        
-        # Get initial position evaluation
-        prev_eval = stockfish.get_evaluation()
-        prev_eval_cp = prev_eval.get('value', 0) if prev_eval.get('type') == 'cp' else 0
-        
-        move_number = 0
+        # A new game key makes python-chess send ucinewgame to the reused engine
+        game_key = object()
         
-        for node in game.mainline():
-            move_number += 1
-            move = node.move
-            board.push(move)
-            
-            # Set position in Stockfish
-            stockfish.set_fen_position(board.fen())
-            
-            # Get current evaluation
-            current_eval = stockfish.get_evaluation()
-            current_eval_cp = current_eval.get('value', 0) if current_eval.get('type') == 'cp' else 0
+        # The shared engine analyses one game at a time
+        with self._engine_lock:
+            # Initialize Stockfish (started once, then reused across games)
+            try:
+                engine = self._get_stockfish_engine()
+            except RuntimeError as e:
+                logger.error(f"Stockfish initialization failed: {e}")
+                return None
             
-            # Adjust evaluation for player perspective
-            if board.turn == chess.BLACK:  # After move, it's the other player's turn
-                current_eval_cp = -current_eval_cp
-                prev_eval_cp = -prev_eval_cp
-            
-            # Calculate evaluation change
-            eval_change = current_eval_cp - prev_eval_cp
-            
-            # For the player who just moved, a negative change is bad
-            if (user_color == 'white' and move_number % 2 == 1) or \
-               (user_color == 'black' and move_number % 2 == 0):
-                eval_change = -eval_change
-            
-            # Get best move
-            best_move_info = stockfish.get_best_move()
-            best_move = best_move_info if best_move_info else None
-            
-            # Classify move
-            is_best = str(move) == best_move if best_move else False
-            classification = self.classify_move(eval_change, is_best)
-            
-            # Create move evaluation
-            move_eval = MoveEvaluation(
-                move_number=move_number,
-                move=str(move),
-                position_fen=board.fen(),
-                evaluation=current_eval_cp,
-                best_move=best_move,
-                mate_in=current_eval.get('value') if current_eval.get('type') == 'mate' else None,
-                classification=classification,
-                evaluation_change=eval_change
-            )
-            
-            evaluations.append(move_eval)
-            prev_eval_cp = current_eval_cp
-        
-        # Filter evaluations for user's moves only
-        if user_color == 'white':
-            user_moves = [ev for ev in evaluations if ev.move_number % 2 == 1]
-        else:
-            user_moves = [ev for ev in evaluations if ev.move_number % 2 == 0]
+            try:
+                engine_version = engine.id.get("name", "Stockfish")
+                
+                # Get initial position evaluation
+                prev_eval_cp, _, prev_best_move = self._evaluate_position(engine, board, game_key)
+                
+                move_number = 0
+                
+                for node in game.mainline():
+                    move_number += 1
+                    move = node.move
+                    board.push(move)
+                    
+                    # Get current evaluation and best move from one search
+                    # (python-chess sends the position incrementally as a move list)
+                    current_eval_cp, mate_in, best_move = self._evaluate_position(engine, board, game_key)
+                    
+                    # Adjust evaluation for player perspective
+                    if board.turn == chess.BLACK:  # After move, it's the other player's turn
+                        current_eval_cp = -current_eval_cp
+                        prev_eval_cp = -prev_eval_cp
+                    
+                    # Calculate evaluation change
+                    eval_change = current_eval_cp - prev_eval_cp
+                    
+                    # For the player who just moved, a negative change is bad
+                    if (user_color == 'white' and move_number % 2 == 1) or \
+                       (user_color == 'black' and move_number % 2 == 0):
+                        eval_change = -eval_change
+                    
+                    # Classify move - the engine's top choice in the position the
+                    # move was played from is always 'best'
+                    if move == prev_best_move:
+                        classification = 'best'
+                    else:
+                        classification = self.classify_move(eval_change)
+                    
+                    # Create move evaluation
+                    move_eval = MoveEvaluation(
+                        move_number=move_number,
+                        move=move.uci(),
+                        evaluation=current_eval_cp,
+                        best_move=best_move.uci() if best_move else None,
+                        mate_in=mate_in,
+                        classification=classification,
+                        evaluation_change=eval_change
+                    )
+                    
+                    evaluations.append(move_eval)
+                    prev_eval_cp = current_eval_cp
+                    prev_best_move = best_move
+            except chess.engine.EngineError:
+                # Don't hand a broken engine to the next game
+                self._close_engine()
+                raise
         
-        # Calculate statistics
-        user_acpl = sum(abs(ev.evaluation_change or 0) for ev in user_moves) / max(len(user_moves), 1)
+        # Split evaluations into user and opponent moves by move parity
+        user_moves = []
+        opponent_moves = []
+        user_parity = 1 if user_color == 'white' else 0
+        for ev in evaluations:
+            if ev.move_number % 2 == user_parity:
+                user_moves.append(ev)
+            else:
+                opponent_moves.append(ev)
         
-        opponent_moves = [ev for ev in evaluations if ev not in user_moves]
-        opponent_acpl = sum(abs(ev.evaluation_change or 0) for ev in opponent_moves) / max(len(opponent_moves), 1)
+        # Calculate statistics from one array of every ply's change; moves alternate,
+        # so each side's changes are a stride-2 slice (the user's start at ply 0 as white)
+        abs_changes = self._abs_changes(evaluations)
+        user_changes = abs_changes[1 - user_parity::2]
+        opponent_changes = abs_changes[user_parity::2]
+        user_acpl = float(user_changes.mean()) if len(user_changes) else 0.0
+        opponent_acpl = float(opponent_changes.mean()) if len(opponent_changes) else 0.0
         
-        # Count move classifications for user
+        # Count move classifications for user in a single pass
+        classification_counts = Counter(m.classification for m in user_moves)
         move_counts = {
-            'brilliant_moves': len([m for m in user_moves if m.classification == 'brilliant']),
-            'great_moves': len([m for m in user_moves if m.classification == 'great']),
-            'best_moves': len([m for m in user_moves if m.classification == 'best']),
-            'excellent_moves': len([m for m in user_moves if m.classification == 'excellent']),
-            'good_moves': len([m for m in user_moves if m.classification == 'good']),
-            'inaccuracies': len([m for m in user_moves if m.classification == 'inaccuracy']),
-            'mistakes': len([m for m in user_moves if m.classification == 'mistake']),
-            'blunders': len([m for m in user_moves if m.classification == 'blunder']),
+            field: classification_counts.get(label, 0)
+            for label, field in self.CLASSIFICATION_FIELDS.items()
         }
         
         # Determine game phases
-        opening, middlegame, endgame = self.determine_game_phases(len(evaluations), user_moves)
+        opening, middlegame, endgame = self.determine_game_phases(len(evaluations), user_moves, user_changes)
         
         # Find critical positions and blunders
-        critical_positions = [ev for ev in user_moves if abs(ev.evaluation_change or 0) > 150]
+        critical_positions = [user_moves[i] for i in np.flatnonzero(user_changes > 150)]
         blunder_moves = [ev for ev in user_moves if ev.classification == 'blunder']
         
         # Calculate analysis time
@@ -324,7 +463,7 @@ class ChessAnalyzer:
             middlegame_phase=middlegame,
             endgame_phase=endgame,
             analysis_time=analysis_duration,
-            engine_version=f"Stockfish {stockfish.get_stockfish_major_version()}",
+            engine_version=engine_version,
             **move_counts
         )
         
@@ -335,3 +474,4 @@ class ChessAnalyzer:
 
 # Global analyzer instance
 chess_analyzer = ChessAnalyzer()
+atexit.register(chess_analyzer.close)
@@ -1,12 +1,22 @@
 import asyncio
-import json
+import math
+import random
+import time
+from bisect import bisect_left
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Mapping, Optional, Tuple
 
 import httpx
+import orjson
+from cachetools import LRUCache
 from loguru import logger
 
 from ..core.config import settings
+from ..core.database import async_redis_client
+
+# Bound once so per-game timestamp conversion skips the module attribute lookups
+_UTC = timezone.utc
+_fromtimestamp = datetime.fromtimestamp
 
 
 class ChessComAPIError(Exception):
@@ -17,74 +27,200 @@ class ChessComAPIError(Exception):
 class ChessComAPI:
     """Chess.com API client with rate limiting and caching."""
     
-    def __init__(self):
+    # Attempts per request when Chess.com answers 429 or 5xx, and the longest backoff
+    MAX_RETRIES = 3
+    MAX_RETRY_DELAY = 30.0
+    
+    # Monthly archives fetched concurrently when collecting games by count
+    ARCHIVE_BATCH_SIZE = 3
+    
+    # Monthly archives kept for conditional (If-None-Match) refetches
+    ARCHIVE_CACHE_SIZE = 512
+    
+    # Finished months don't change, so they are kept in Redis across restarts
+    FINISHED_ARCHIVE_TTL_SECONDS = 30 * 24 * 3600
+    
+    # Archive game fields read by parsing and filtering; the rest (tcn, initial_setup,
+    # accuracies, eco URL, ...) are dropped before games are cached
+    ARCHIVE_GAME_FIELDS = (
+        "uuid", "url", "pgn", "fen", "time_class", "time_control", "rules", "rated",
+        "start_time", "end_time", "white", "black",
+    )
+    
+    # Chess.com requires User-Agent with contact info (new API requirement)
+    DEFAULT_HEADERS = httpx.Headers({
+        "User-Agent": f"{settings.PROJECT_NAME}/{settings.VERSION} (contact: api@chessinsight.ai)",
+        "Accept": "application/json"
+    })
+    
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Args:
+            transport: Transport for the HTTP client (e.g. httpx.MockTransport in
+                tests); None uses the default network transport
+        """
         self.base_url = settings.CHESSCOM_API_BASE_URL
+        self._transport = transport
         self.rate_limit_delay = 60.0 / settings.CHESSCOM_API_RATE_LIMIT  # Delay between requests
-        self.last_request_time = 0.0
+        # Earliest monotonic time the next request may start; reserved under the lock
+        # so concurrent requests get consecutive slots instead of all skipping the wait
+        self._next_slot = 0.0
+        
+        # (username, year, month) -> (etag, games) of previously fetched archives
+        self._etag_cache: LRUCache = LRUCache(maxsize=self.ARCHIVE_CACHE_SIZE)
         
-        # HTTP client configuration
-        # Chess.com requires User-Agent with contact info (new API requirement)
-        self.client = httpx.AsyncClient(
+        # Loop-bound state, created on first use inside the running event loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._rate_lock: Optional[asyncio.Lock] = None
+        # Caps requests on the wire regardless of how far callers fan out
+        self._concurrency: Optional[asyncio.Semaphore] = None
+        # Requests in flight keyed by (endpoint, headers)
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the HTTP client."""
+        # HTTP/2 multiplexes concurrent archive fetches over one connection
+        # (httpx falls back to HTTP/1.1 keep-alive if the server doesn't negotiate it)
+        return httpx.AsyncClient(
+            transport=self._transport,
             timeout=httpx.Timeout(30.0),
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0),
             follow_redirects=True,  # Follow 301 redirects for case normalization
-            headers={
-                "User-Agent": f"{settings.PROJECT_NAME}/{settings.VERSION} (contact: api@chessinsight.ai)",
-                "Accept": "application/json"
-            }
+            headers=self.DEFAULT_HEADERS
         )
     
-    async def _make_request(self, endpoint: str, headers: Optional[Dict] = None) -> Tuple[Dict, Dict]:
-        """Make rate-limited request to Chess.com API."""
+    def _bind_loop(self) -> None:
+        """(Re)create the client and loop-bound state when the event loop changes."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        
+        if self._client is not None and not self._client.is_closed and (loop is None or loop is self._loop):
+            return
         
-        # Rate limiting
-        current_time = asyncio.get_event_loop().time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.rate_limit_delay:
-            await asyncio.sleep(self.rate_limit_delay - time_since_last)
+        if self._loop is not None and self._client is not None and not self._client.is_closed:
+            # Connections of a client from another loop can't be closed from this one
+            logger.warning("Chess.com client used from a new event loop; creating a new client")
+        self._client = self._create_client()
+        self._rate_lock = asyncio.Lock()
+        self._concurrency = asyncio.Semaphore(settings.CHESSCOM_MAX_CONCURRENCY)
+        self._inflight = {}
+        self._loop = loop
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared HTTP client for the running event loop, created on first use."""
+        self._bind_loop()
+        return self._client
+    
+    async def _make_request(self, endpoint: str, headers: Optional[Dict] = None) -> Tuple[Dict, Mapping[str, str]]:
+        """
+        Make rate-limited request to Chess.com API.
         
-        self.last_request_time = asyncio.get_event_loop().time()
+        Identical requests already in flight are shared instead of sent twice,
+        so the result may be the same objects another caller receives.
+        """
+        self._bind_loop()
+        key = (endpoint, tuple(sorted((headers or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._send_request(endpoint, headers))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # Shielded so one cancelled caller doesn't cancel the request for the others
+        return await asyncio.shield(task)
+    
+    async def _wait_for_slot(self) -> None:
+        """Reserve the next rate-limit slot, then wait for it outside the lock."""
+        async with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.rate_limit_delay
+        
+        if slot > now:
+            await asyncio.sleep(slot - now)
+    
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        """Seconds to wait before retrying a 429/5xx response (honours Retry-After)."""
+        # Sent with 429 and often with 503 (maintenance)
+        try:
+            return min(float(response.headers.get("Retry-After")), self.MAX_RETRY_DELAY)
+        except (TypeError, ValueError):
+            return min(2 ** attempt + random.random(), self.MAX_RETRY_DELAY)
+    
+    async def _send_request(self, endpoint: str, headers: Optional[Dict] = None) -> Tuple[Dict, Mapping[str, str]]:
+        """
+        Send one request to the Chess.com API, waiting for a rate-limit slot.
         
+        Rate-limited (429) and server error (5xx) responses are retried with
+        exponential backoff, up to MAX_RETRIES attempts in total.
+        """
         # Build URL - ensure proper path joining
         # endpoint starts with / (e.g., "/player/username")
         # base_url is "https://api.chess.com/pub"
         url = self.base_url + endpoint
         request_headers = headers or {}
         
-        try:
-            logger.debug(f"Making request to {url}")
-            response = await self.client.get(url, headers=request_headers)
-            
-            # Chess.com returns 301 for case normalization - client follows automatically
-            # But we should log if redirected
-            if len(response.history) > 0:
-                logger.debug(f"Followed redirect: {response.history[0].url} -> {response.url}")
-            
-            response.raise_for_status()
+        for attempt in range(self.MAX_RETRIES):
+            await self._wait_for_slot()
             
-            # Return data and response headers for caching
-            return response.json(), dict(response.headers)
-            
-        except httpx.HTTPStatusError as e:
-            # Parse error response for better error messages
             try:
-                error_data = e.response.json()
-                error_message = error_data.get("message", "Unknown error")
-            except:
-                error_message = e.response.text[:200]
-            
-            if e.response.status_code == 404:
-                # User not found (or endpoint doesn't exist)
-                raise ChessComAPIError(f"Not found: {error_message}")
-            elif e.response.status_code == 410:
-                # Permanently removed (e.g., banned/deleted account)
-                raise ChessComAPIError(f"Resource permanently unavailable: {error_message}")
-            elif e.response.status_code == 429:
-                # Rate limit exceeded
-                raise ChessComAPIError(f"Rate limit exceeded. Please try again later.")
-            else:
-                raise ChessComAPIError(f"API error ({e.response.status_code}): {error_message}")
-        except httpx.RequestError as e:
-            raise ChessComAPIError(f"Network error: {str(e)}")
+                logger.debug(f"Making request to {url}")
+                async with self._concurrency:
+                    response = await self.client.get(url, headers=request_headers)
+                
+                # Chess.com returns 301 for case normalization - client follows automatically
+                # But we should log if redirected
+                if response.history:
+                    logger.debug(f"Followed redirect: {response.history[0].url} -> {response.url}")
+                
+                # Not Modified - the caller's cached copy (sent with If-None-Match) is current
+                if response.status_code == 304:
+                    return None, response.headers
+                
+                response.raise_for_status()
+                
+                # Return data and response headers for caching. orjson parses the body
+                # bytes directly; httpx.Headers is already a case-insensitive mapping.
+                return orjson.loads(response.content), response.headers
+                
+            except httpx.HTTPStatusError as e:
+                status_code = e.response.status_code
+                if (status_code == 429 or status_code >= 500) and attempt < self.MAX_RETRIES - 1:
+                    delay = self._retry_delay(e.response, attempt)
+                    logger.warning(f"Chess.com returned {status_code} for {url}; retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                
+                # Parse error response for better error messages
+                try:
+                    error_data = e.response.json()
+                    error_message = error_data.get("message", "Unknown error")
+                except:
+                    error_message = e.response.text[:200]
+                
+                if status_code == 404:
+                    # User not found (or endpoint doesn't exist)
+                    raise ChessComAPIError(f"Not found: {error_message}")
+                elif status_code == 410:
+                    # Permanently removed (e.g., banned/deleted account)
+                    raise ChessComAPIError(f"Resource permanently unavailable: {error_message}")
+                elif status_code == 429:
+                    # Rate limit exceeded
+                    raise ChessComAPIError(f"Rate limit exceeded. Please try again later.")
+                else:
+                    raise ChessComAPIError(f"API error ({status_code}): {error_message}")
+            except httpx.RequestError as e:
+                raise ChessComAPIError(f"Network error: {str(e)}")
+    
+    @staticmethod
+    def _player_endpoint(username: str, path: str = "") -> str:
+        """Build a player endpoint; usernames are always sent lowercase."""
+        return f"/player/{username.lower()}{path}"
     
     async def get_player_profile(self, username: str) -> Dict:
         """Get player profile information.
@@ -100,38 +236,151 @@ class ChessComAPI:
         """
         # Chess.com API requires lowercase usernames
         # Mixed case will return 301 redirect, which client follows automatically
-        endpoint = f"/player/{username.lower()}"
+        endpoint = self._player_endpoint(username)
         data, headers = await self._make_request(endpoint)
         return data
     
     async def get_player_stats(self, username: str) -> Dict:
         """Get player statistics including ratings."""
-        endpoint = f"/player/{username.lower()}/stats"
+        endpoint = self._player_endpoint(username, "/stats")
         data, headers = await self._make_request(endpoint)
         return data
     
+    async def _gather_by_username(self, fetch, usernames: List[str], what: str) -> Dict[str, Dict]:
+        """Run `fetch(username)` for several players concurrently, skipping failures."""
+        results = await asyncio.gather(*(fetch(username) for username in usernames), return_exceptions=True)
+        
+        by_username = {}
+        for username, result in zip(usernames, results):
+            if isinstance(result, ChessComAPIError):
+                logger.warning(f"Failed to fetch {what} for {username}: {result}")
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                by_username[username] = result
+        return by_username
+    
+    async def get_player_profiles(self, usernames: List[str]) -> Dict[str, Dict]:
+        """
+        Get profiles of several players concurrently.
+        
+        Returns:
+            Profile per username; players whose profile couldn't be fetched are left out
+        """
+        return await self._gather_by_username(self.get_player_profile, usernames, "profile")
+    
+    async def get_players_stats(self, usernames: List[str]) -> Dict[str, Dict]:
+        """
+        Get statistics of several players concurrently.
+        
+        Returns:
+            Statistics per username; players whose stats couldn't be fetched are left out
+        """
+        return await self._gather_by_username(self.get_player_stats, usernames, "stats")
+    
     async def get_player_games_archive_list(self, username: str) -> List[str]:
         """Get list of available game archives for a player."""
-        endpoint = f"/player/{username.lower()}/games/archives"
+        endpoint = self._player_endpoint(username, "/games/archives")
         data, headers = await self._make_request(endpoint)
         return data.get("archives", [])
     
     async def get_player_games_by_month(self, username: str, year: int, month: int, 
-                                       etag: Optional[str] = None) -> Tuple[Dict, Dict]:
-        """Get player games for a specific month with caching support."""
-        endpoint = f"/player/{username.lower()}/games/{year:04d}/{month:02d}"
+                                       etag: Optional[str] = None) -> Tuple[Dict, Mapping[str, str]]:
+        """
+        Get player games for a specific month with caching support.
+        
+        Returns:
+            Tuple of (games data, response headers); data is None when `etag`
+            is given and the archive hasn't changed (304 Not Modified)
+        """
+        endpoint = self._player_endpoint(username, f"/games/{year:04d}/{month:02d}")
         
         headers = {}
         if etag:
             headers["If-None-Match"] = etag
         
-        try:
-            data, response_headers = await self._make_request(endpoint, headers)
-            return data, response_headers
-        except httpx.HTTPStatusError as e:
-            if e.response.status_code == 304:  # Not Modified
-                return None, dict(e.response.headers)
-            raise
+        return await self._make_request(endpoint, headers)
+    
+    async def _get_month_games(self, username: str, year: int, month: int) -> List[Dict]:
+        """
+        Get a month's games.
+        
+        Finished months are served from Redis without touching the API (or its
+        rate limit); other months revalidate a previously fetched copy by ETag.
+        """
+        key = (username.lower(), year, month)
+        now = datetime.now(timezone.utc)
+        finished = (year, month) < (now.year, now.month)
+        
+        redis_key = f"chesscom:archive:{key[0]}:{year:04d}/{month:02d}"
+        if finished:
+            try:
+                stored = await async_redis_client.get(redis_key)
+                if stored is not None:
+                    return orjson.loads(stored)
+            except Exception as e:
+                logger.debug(f"Archive cache unavailable: {e}")
+        
+        etag, cached_games = self._etag_cache.get(key, (None, None))
+        
+        games_data, response_headers = await self.get_player_games_by_month(username, year, month, etag=etag)
+        if games_data is None:
+            return cached_games or []
+        
+        fields = self.ARCHIVE_GAME_FIELDS
+        games = [
+            {field: game[field] for field in fields if field in game}
+            for game in games_data.get("games", [])
+        ]
+        new_etag = response_headers.get("etag")
+        if new_etag:
+            self._etag_cache[key] = (new_etag, games)
+        
+        if finished:
+            try:
+                await async_redis_client.set(redis_key, orjson.dumps(games), ex=self.FINISHED_ARCHIVE_TTL_SECONDS)
+            except Exception as e:
+                logger.debug(f"Archive cache unavailable: {e}")
+        return games
+    
+    @staticmethod
+    def _games_since(games: List[Dict], timestamp: float) -> List[Dict]:
+        """Games of one archive that ended at or after `timestamp`."""
+        end_times = [game.get("end_time", 0) for game in games]
+        # Archives list games in the order they ended; sort a copy if one doesn't
+        if any(later < earlier for earlier, later in zip(end_times, end_times[1:])):
+            games = sorted(games, key=lambda game: game.get("end_time", 0))
+            end_times.sort()
+        return games[bisect_left(end_times, timestamp):]
+    
+    @staticmethod
+    def _archive_month(archive_url: str) -> Tuple[int, int]:
+        """Extract (year, month) from an archive URL ending in /YYYY/MM."""
+        parts = archive_url.split('/')
+        return int(parts[-2]), int(parts[-1])
+    
+    async def _fetch_months(self, username: str, months: List[Tuple[int, int]]) -> List[List[Dict]]:
+        """
+        Fetch several monthly archives concurrently.
+        
+        Returns:
+            Games of each month, in the order of `months` (empty for months that failed)
+        """
+        results = await asyncio.gather(
+            *(self._get_month_games(username, year, month) for year, month in months),
+            return_exceptions=True
+        )
+        
+        month_games = []
+        for (year, month), result in zip(months, results):
+            if isinstance(result, ChessComAPIError):
+                logger.warning(f"Failed to fetch archive {year:04d}/{month:02d}: {result}")
+                month_games.append([])
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                month_games.append(result)
+        return month_games
     
     async def get_recent_games(
         self, 
@@ -173,54 +422,36 @@ class ChessComAPI:
         if days:
             # Fetch by date range
             target_date = datetime.now(timezone.utc).timestamp() - (days * 24 * 3600)
+            target = datetime.fromtimestamp(target_date, tz=timezone.utc)
             
-            for archive_url in archives[:3]:  # Limit to last 3 months
-                try:
-                    # Extract year and month from archive URL
-                    parts = archive_url.split('/')
-                    year, month = int(parts[-2]), int(parts[-1])
-                    
-                    games_data, _ = await self.get_player_games_by_month(username, year, month)
-                    
-                    if games_data and "games" in games_data:
-                        games = games_data["games"]
-                        
-                        # Filter games by date
-                        recent_games = [
-                            game for game in games 
-                            if game.get("end_time", 0) >= target_date
-                        ]
-                        
-                        all_games.extend(recent_games)
-                        
-                        # If we found games older than our target, we can stop
-                        if games and min(game.get("end_time", 0) for game in games) < target_date:
-                            break
-                            
-                except ChessComAPIError as e:
-                    logger.warning(f"Failed to fetch archive {archive_url}: {e}")
-                    continue
+            # Only months that can contain games after the target date (at most the last 3)
+            months = [
+                (year, month) for year, month in map(self._archive_month, archives[:3])
+                if (year, month) >= (target.year, target.month)
+            ]
+            
+            for games in await self._fetch_months(username, months):
+                # Filter games by date
+                all_games.extend(self._games_since(games, target_date))
         
         else:  # count
-            # Fetch by count - get recent games until we have enough
-            for archive_url in archives[:6]:  # Check up to 6 months
-                try:
-                    # Extract year and month from archive URL
-                    parts = archive_url.split('/')
-                    year, month = int(parts[-2]), int(parts[-1])
-                    
-                    games_data, _ = await self.get_player_games_by_month(username, year, month)
-                    
-                    if games_data and "games" in games_data:
-                        all_games.extend(games_data["games"])
-                    
-                    # Stop if we have enough games
-                    if len(all_games) >= count:
-                        break
-                        
-                except ChessComAPIError as e:
-                    logger.warning(f"Failed to fetch archive {archive_url}: {e}")
-                    continue
+            # Fetch by count - the latest month usually has enough games on its own;
+            # older months are fetched concurrently, only as many as still look needed
+            months = [self._archive_month(archive_url) for archive_url in archives[:6]]  # Check up to 6 months
+            fetched = 0
+            batch_size = 1
+            while fetched < len(months) and len(all_games) < count:
+                for games in await self._fetch_months(username, months[fetched:fetched + batch_size]):
+                    all_games.extend(games)
+                fetched += batch_size
+                
+                # Size the next batch from the games per month seen so far
+                missing = count - len(all_games)
+                per_month = len(all_games) / fetched
+                batch_size = (
+                    min(self.ARCHIVE_BATCH_SIZE, max(1, math.ceil(missing / per_month)))
+                    if per_month else self.ARCHIVE_BATCH_SIZE
+                )
         
         # Sort by end_time (most recent first)
         all_games.sort(key=lambda x: x.get("end_time", 0), reverse=True)
@@ -234,71 +465,84 @@ class ChessComAPI:
     
     async def get_player_current_daily_chess(self, username: str) -> Dict:
         """Get current daily chess games."""
-        endpoint = f"/player/{username.lower()}/games/to-move"
+        endpoint = self._player_endpoint(username, "/games/to-move")
         data, headers = await self._make_request(endpoint)
         return data
     
-    def parse_game_data(self, game: Dict, username: str) -> Dict:
-        """Parse and normalize game data from Chess.com API."""
+    def parse_game_data(self, game: Dict, username: str, include_raw: bool = False) -> Dict:
+        """
+        Parse and normalize game data from Chess.com API.
+        
+        Args:
+            game: Game dict from a monthly archive
+            username: Username of the player the game is parsed for
+            include_raw: Also return the original game dict under "raw_data"
+        """
+        return self._parse_game_data(game, username.lower(), include_raw)
+    
+    def parse_games(self, games: List[Dict], username: str, include_raw: bool = False) -> List[Dict]:
+        """Parse and normalize a list of games played by the same user."""
+        username_lc = username.lower()
+        return [self._parse_game_data(game, username_lc, include_raw) for game in games]
+    
+    def _parse_game_data(self, game: Dict, username_lc: str, include_raw: bool = False) -> Dict:
+        """Parse one game for a username that is already lowercased."""
         
-        # Determine user's color and opponent
+        # Each player field is read once and reused for the white/black and user/opponent views
         white_player = game.get("white", {})
         black_player = game.get("black", {})
+        white_username = white_player.get("username")
+        black_username = black_player.get("username")
+        white_rating = white_player.get("rating")
+        black_rating = black_player.get("rating")
+        white_result = white_player.get("result")
+        black_result = black_player.get("result")
         
-        user_color = None
-        opponent_username = None
-        user_rating = None
-        opponent_rating = None
-        
-        if white_player.get("username", "").lower() == username.lower():
+        # Determine user's color and opponent
+        if (white_username or "").lower() == username_lc:
             user_color = "white"
-            opponent_username = black_player.get("username")
-            user_rating = white_player.get("rating")
-            opponent_rating = black_player.get("rating")
-        elif black_player.get("username", "").lower() == username.lower():
+            opponent_username, user_rating, opponent_rating, user_result = black_username, white_rating, black_rating, white_result
+        elif (black_username or "").lower() == username_lc:
             user_color = "black"
-            opponent_username = white_player.get("username")
-            user_rating = black_player.get("rating")
-            opponent_rating = white_player.get("rating")
-        
-        # Determine game result for user
-        user_result = None
-        if user_color == "white":
-            user_result = white_player.get("result")
-        elif user_color == "black":
-            user_result = black_player.get("result")
-        
-        # Parse time control
-        time_control = game.get("time_control", "")
-        time_class = game.get("time_class", "")
-        
-        return {
+            opponent_username, user_rating, opponent_rating, user_result = white_username, black_rating, white_rating, black_result
+        else:
+            user_color = opponent_username = user_rating = opponent_rating = user_result = None
+        
+        # Timestamps are read once and converted only when present
+        start_time = game.get("start_time")
+        end_time = game.get("end_time")
+        
+        game_data = {
             "chesscom_game_id": str(game.get("uuid", "")),
             "chesscom_url": game.get("url", ""),
-            "time_class": time_class,
-            "time_control": time_control,
+            "time_class": game.get("time_class", ""),
+            "time_control": game.get("time_control", ""),
             "rules": game.get("rules", "chess"),
-            "white_username": white_player.get("username"),
-            "black_username": black_player.get("username"),
-            "white_rating": white_player.get("rating"),
-            "black_rating": black_player.get("rating"),
-            "white_result": white_player.get("result"),
-            "black_result": black_player.get("result"),
+            "white_username": white_username,
+            "black_username": black_username,
+            "white_rating": white_rating,
+            "black_rating": black_rating,
+            "white_result": white_result,
+            "black_result": black_result,
             "pgn": game.get("pgn", ""),
             "fen": game.get("fen", ""),
-            "start_time": datetime.fromtimestamp(game.get("start_time", 0), tz=timezone.utc) if game.get("start_time") else None,
-            "end_time": datetime.fromtimestamp(game.get("end_time", 0), tz=timezone.utc) if game.get("end_time") else None,
+            "start_time": _fromtimestamp(start_time, _UTC) if start_time else None,
+            "end_time": _fromtimestamp(end_time, _UTC) if end_time else None,
             "user_color": user_color,
             "opponent_username": opponent_username,
             "user_rating": user_rating,
             "opponent_rating": opponent_rating,
             "user_result": user_result,
-            "raw_data": game  # Store original data for reference
         }
+        if include_raw:
+            game_data["raw_data"] = game  # Original data for reference
+        return game_data
     
     async def close(self):
-        """Close the HTTP client."""
-        await self.client.aclose()
+        """Close the HTTP client (safe to call more than once)."""
+        client, self._client = self._client, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
 
 
 # Global API client instance
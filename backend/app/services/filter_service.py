@@ -4,43 +4,86 @@ Game Filtering Service for post-fetch filtering of Chess.com games.
 Since Chess.com API doesn't support native filtering, we fetch games
 and then apply filters on the results.
 """
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from functools import lru_cache, reduce
+from operator import or_
+from typing import Dict, FrozenSet, List, Optional, Tuple, Union
+
+import numpy as np
 from loguru import logger
+from sqlalchemy.orm import Session
+
+from ..models.game import Game
+
+from ._filter_kernels import NUMBA_AVAILABLE, filter_kernel, warm_filter_kernel
+
+
+# Bit code of each Chess.com time class in GameColumnStore (0 = any other time class);
+# filters naming a time class outside this table use the per-game loop instead
+TIME_CLASS_CODES = {"bullet": 1, "blitz": 2, "rapid": 4, "daily": 8}
+
+
+def _end_timestamp(end_time, missing=None):
+    """Game end time as a Unix timestamp (`missing` if absent or unusable)."""
+    if not end_time:
+        return missing
+    if isinstance(end_time, datetime):
+        return end_time.timestamp()
+    if isinstance(end_time, (int, float)):
+        return end_time
+    return missing
+
+
+@lru_cache(maxsize=1024)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 date string (a trailing 'Z' means UTC); repeat strings hit the cache."""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
 
+def _parse_date(value) -> Optional[datetime]:
+    """Filter date from a dict value: ISO strings are parsed, anything else passes through."""
+    if not value:
+        return None
+    return _parse_iso(value) if isinstance(value, str) else value
 
+
+@dataclass(frozen=True, slots=True)
 class GameFilter:
-    """Filter configuration for game queries."""
+    """
+    Filter configuration for game queries.
     
-    def __init__(
-        self,
-        game_count: Optional[int] = None,
-        start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None,
-        time_controls: Optional[List[str]] = None,
-        rated_only: Optional[bool] = None,
-        unrated_only: Optional[bool] = None,
-    ):
-        """
-        Initialize game filter.
+    Attributes:
+        game_count: Maximum number of games to return (e.g., 10, 25, 50)
+        start_date: Filter games after this date
+        end_date: Filter games before this date
+        time_controls: Time controls to include ('bullet', 'blitz', 'rapid', 'daily')
+        rated_only: Only include rated games
+        unrated_only: Only include unrated games
+    """
+    
+    game_count: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    time_controls: Tuple[str, ...] = ()
+    rated_only: Optional[bool] = None
+    unrated_only: Optional[bool] = None
+    # Lowercased time classes to keep, or None when any time class passes
+    _time_classes: Optional[FrozenSet[str]] = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Accept any iterable (or None) of time controls; store an immutable tuple
+        time_controls = tuple(self.time_controls or ())
+        object.__setattr__(self, "time_controls", time_controls)
         
-        Args:
-            game_count: Maximum number of games to return (e.g., 10, 25, 50)
-            start_date: Filter games after this date
-            end_date: Filter games before this date
-            time_controls: List of time controls to include ['bullet', 'blitz', 'rapid', 'daily']
-            rated_only: Only include rated games
-            unrated_only: Only include unrated games
-        """
-        self.game_count = game_count
-        self.start_date = start_date
-        self.end_date = end_date
-        self.time_controls = time_controls or []
-        self.rated_only = rated_only
-        self.unrated_only = unrated_only
+        # Normalise once here rather than on every apply_filters call;
+        # 'all' (or no time controls) disables the time control filter
+        time_classes = frozenset(tc.lower() for tc in time_controls)
+        object.__setattr__(self, "_time_classes", time_classes if time_classes and "all" not in time_classes else None)
         
         # Validation
-        if rated_only and unrated_only:
+        if self.rated_only and self.unrated_only:
             raise ValueError("Cannot specify both rated_only and unrated_only")
     
     @classmethod
@@ -64,88 +107,117 @@ class GameFilter:
             }
         """
         # Parse dates if provided as strings
-        start_date = None
-        if filter_dict.get("start_date"):
-            if isinstance(filter_dict["start_date"], str):
-                start_date = datetime.fromisoformat(filter_dict["start_date"].replace('Z', '+00:00'))
-            else:
-                start_date = filter_dict["start_date"]
-        
-        end_date = None
-        if filter_dict.get("end_date"):
-            if isinstance(filter_dict["end_date"], str):
-                end_date = datetime.fromisoformat(filter_dict["end_date"].replace('Z', '+00:00'))
-            else:
-                end_date = filter_dict["end_date"]
-        
         return cls(
             game_count=filter_dict.get("game_count"),
-            start_date=start_date,
-            end_date=end_date,
+            start_date=_parse_date(filter_dict.get("start_date")),
+            end_date=_parse_date(filter_dict.get("end_date")),
             time_controls=filter_dict.get("time_controls"),
             rated_only=filter_dict.get("rated_only"),
             unrated_only=filter_dict.get("unrated_only"),
         )
     
     def to_dict(self) -> Dict:
-        """Convert filter to dictionary for serialization."""
+        """
+        Convert filter to dictionary for serialization.
+        
+        Dates stay `datetime` objects; the app's ORJSONResponse encodes them
+        as ISO 8601 strings natively.
+        """
         return {
             "game_count": self.game_count,
-            "start_date": self.start_date.isoformat() if self.start_date else None,
-            "end_date": self.end_date.isoformat() if self.end_date else None,
-            "time_controls": self.time_controls,
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "time_controls": list(self.time_controls),
             "rated_only": self.rated_only,
             "unrated_only": self.unrated_only,
         }
 
 
+class GameColumnStore:
+    """
+    Column-oriented view of a game list.
+    
+    The fields filters read are extracted once into parallel NumPy arrays, so
+    predicates scan compact columns instead of every game dict; matching games
+    are only looked up in `source` at the end.
+    """
+    
+    def __init__(self, games: List[Dict]):
+        """
+        Args:
+            games: List of game dictionaries (from Chess.com API)
+        """
+        count = len(games)
+        self.source = games
+        # Unix timestamps; NaN where the end time is missing
+        self.end_time = np.fromiter(
+            (_end_timestamp(game.get("end_time"), np.nan) for game in games),
+            dtype=np.float64,
+            count=count
+        )
+        # Time classes as TIME_CLASS_CODES bits, so membership is a single AND
+        self.time_class = np.fromiter(
+            (TIME_CLASS_CODES.get(game.get("time_class", "").lower(), 0) for game in games),
+            dtype=np.int8,
+            count=count
+        )
+        self.rated = np.fromiter((bool(game.get("rated", False)) for game in games), dtype=np.bool_, count=count)
+    
+    def __len__(self) -> int:
+        return len(self.source)
+    
+    def take(self, indices: np.ndarray) -> List[Dict]:
+        """Game dicts at the given positions."""
+        return [self.source[i] for i in indices]
+
+
 class FilterService:
     """Service for filtering games based on various criteria."""
     
+    # Lists at least this long are filtered with NumPy masks instead of a Python loop
+    VECTORIZE_MIN_GAMES = 256
+    # Games per NumPy mask evaluation, so the mask path can stop once `limit` games match
+    MASK_CHUNK_SIZE = 4096
+    
     @staticmethod
-    def apply_filters(games: List[Dict], game_filter: GameFilter) -> List[Dict]:
+    def apply_filters(games: Union[List[Dict], GameColumnStore], game_filter: GameFilter) -> List[Dict]:
         """
         Apply filters to a list of games.
         
         Args:
-            games: List of game dictionaries (from Chess.com API)
+            games: List of game dictionaries (from Chess.com API), or a column
+                   store built from them to reuse across several filters
             game_filter: Filter configuration
             
         Returns:
             Filtered list of games
         """
-        filtered_games = games.copy()
+        # Precompute every predicate once; games are then tested in a single pass
+        start_ts = game_filter.start_date.timestamp() if game_filter.start_date else None
+        end_ts = game_filter.end_date.timestamp() if game_filter.end_date else None
         
-        # Apply date range filter
-        if game_filter.start_date or game_filter.end_date:
-            filtered_games = FilterService._filter_by_date_range(
-                filtered_games,
-                game_filter.start_date,
-                game_filter.end_date
-            )
-            logger.debug(f"After date filter: {len(filtered_games)} games")
+        allowed_time_classes = game_filter._time_classes
         
-        # Apply time control filter
-        if game_filter.time_controls:
-            filtered_games = FilterService._filter_by_time_control(
-                filtered_games,
-                game_filter.time_controls
-            )
-            logger.debug(f"After time control filter: {len(filtered_games)} games")
+        # Neither flag set (or both False) includes rated and unrated games
+        rated_only = bool(game_filter.rated_only)
+        unrated_only = bool(game_filter.unrated_only)
         
-        # Apply rated/unrated filter
-        if game_filter.rated_only is not None or game_filter.unrated_only is not None:
-            filtered_games = FilterService._filter_by_rated(
-                filtered_games,
-                game_filter.rated_only,
-                game_filter.unrated_only
-            )
-            logger.debug(f"After rated filter: {len(filtered_games)} games")
+        # Game count limit applies after the other filters
+        limit = game_filter.game_count or len(games)
         
-        # Apply game count limit (after other filters)
-        if game_filter.game_count:
-            filtered_games = filtered_games[:game_filter.game_count]
-            logger.debug(f"After count limit: {len(filtered_games)} games")
+        # Time classes without a bit code can only be matched by name, in the loop
+        vectorizable = allowed_time_classes is None or allowed_time_classes.issubset(TIME_CLASS_CODES)
+        
+        predicates = (start_ts, end_ts, allowed_time_classes, rated_only, unrated_only, limit)
+        source = games.source if isinstance(games, GameColumnStore) else games
+        if start_ts is None and end_ts is None and allowed_time_classes is None and not (rated_only or unrated_only):
+            # Only the count limit applies - no per-game tests needed
+            filtered_games = source[:limit]
+        elif vectorizable and (isinstance(games, GameColumnStore) or len(games) >= FilterService.VECTORIZE_MIN_GAMES):
+            store = games if isinstance(games, GameColumnStore) else GameColumnStore(games)
+            filtered_games = store.take(FilterService._filter_indices(store, *predicates))
+        else:
+            filtered_games = FilterService._apply_filters_loop(source, *predicates)
         
         logger.info(
             f"Filtered {len(games)} games down to {len(filtered_games)} "
@@ -155,94 +227,142 @@ class FilterService:
         return filtered_games
     
     @staticmethod
-    def _filter_by_date_range(
+    def apply_filters_sql(db: Session, user_id: int, game_filter: GameFilter) -> List[Game]:
+        """
+        Apply filters to a user's stored games in the database.
+        
+        Uses the (user_id, end_time) and (user_id, time_class, end_time)
+        indexes instead of filtering rows in Python.
+        
+        Args:
+            db: Database session
+            user_id: Owner of the games
+            game_filter: Filter configuration
+            
+        Returns:
+            Matching games, most recent first
+            
+        Raises:
+            ValueError: If a rated filter is set (rated status is not stored)
+        """
+        if game_filter.rated_only or game_filter.unrated_only:
+            raise ValueError("Rated filters are not supported for stored games")
+        
+        query = db.query(Game).filter(Game.user_id == user_id)
+        if game_filter.start_date:
+            query = query.filter(Game.end_time >= game_filter.start_date)
+        if game_filter.end_date:
+            query = query.filter(Game.end_time <= game_filter.end_date)
+        if game_filter._time_classes is not None:
+            query = query.filter(Game.time_class.in_(game_filter._time_classes))
+        
+        query = query.order_by(Game.end_time.desc())
+        if game_filter.game_count:
+            query = query.limit(game_filter.game_count)
+        
+        return query.all()
+    
+    @staticmethod
+    def _apply_filters_loop(
         games: List[Dict],
-        start_date: Optional[datetime],
-        end_date: Optional[datetime]
+        start_ts: Optional[float],
+        end_ts: Optional[float],
+        allowed_time_classes: Optional[FrozenSet[str]],
+        rated_only: bool,
+        unrated_only: bool,
+        limit: int
     ) -> List[Dict]:
-        """Filter games by date range."""
-        filtered = []
+        """Filter games one at a time, stopping once `limit` games match."""
+        filter_dates = start_ts is not None or end_ts is not None
         
+        filtered_games = []
         for game in games:
-            end_time = game.get("end_time")
+            if filter_dates:
+                end_time = _end_timestamp(game.get("end_time"))
+                
+                # Skip if no (usable) end_time
+                if end_time is None:
+                    continue
+                if start_ts is not None and end_time < start_ts:
+                    continue
+                if end_ts is not None and end_time > end_ts:
+                    continue
             
-            # Skip if no end_time
-            if not end_time:
-                continue
+            if allowed_time_classes is not None:
+                # Chess.com time classes are already lowercase; only lowercase on a miss
+                time_class = game.get("time_class", "")
+                if time_class not in allowed_time_classes and time_class.lower() not in allowed_time_classes:
+                    continue
             
-            # Convert timestamp to datetime if needed
-            if isinstance(end_time, (int, float)):
-                game_date = datetime.fromtimestamp(end_time, tz=timezone.utc)
-            elif isinstance(end_time, datetime):
-                game_date = end_time
-            else:
-                continue
+            if rated_only or unrated_only:
+                is_rated = game.get("rated", False)
+                if (rated_only and not is_rated) or (unrated_only and is_rated):
+                    continue
             
-            # Check date range
-            if start_date and game_date < start_date:
-                continue
-            if end_date and game_date > end_date:
-                continue
-            
-            filtered.append(game)
+            filtered_games.append(game)
+            if len(filtered_games) >= limit:
+                break
         
-        return filtered
+        return filtered_games
     
     @staticmethod
-    def _filter_by_time_control(
-        games: List[Dict],
-        time_controls: List[str]
-    ) -> List[Dict]:
+    def _filter_indices(
+        store: GameColumnStore,
+        start_ts: Optional[float],
+        end_ts: Optional[float],
+        allowed_time_classes: Optional[FrozenSet[str]],
+        rated_only: bool,
+        unrated_only: bool,
+        limit: int
+    ) -> np.ndarray:
         """
-        Filter games by time control.
+        Indices of matching games, from the compiled kernel or per-column NumPy masks.
         
-        Args:
-            games: List of games
-            time_controls: List of time control types to include
-                          ['bullet', 'blitz', 'rapid', 'daily', 'all']
-        
-        Returns:
-            Filtered games matching time controls
+        Every allowed time class must be a TIME_CLASS_CODES key; games with other
+        time classes are stored as 0 and never match a time class filter here.
         """
-        # If 'all' is in the list, return all games
-        if 'all' in time_controls or not time_controls:
-            return games
+        allowed_mask = (
+            reduce(or_, (TIME_CLASS_CODES[tc] for tc in allowed_time_classes), 0)
+            if allowed_time_classes is not None else None
+        )
         
-        # Normalize time control names
-        normalized_controls = [tc.lower() for tc in time_controls]
+        if NUMBA_AVAILABLE:
+            return filter_kernel(
+                store.end_time, store.time_class, store.rated,
+                -np.inf if start_ts is None else start_ts,
+                np.inf if end_ts is None else end_ts,
+                allowed_mask or 0, rated_only, unrated_only, limit
+            )
         
-        filtered = []
-        for game in games:
-            time_class = game.get("time_class", "").lower()
+        # Masks are built a chunk at a time so a small game_count stops the scan early
+        matches = []
+        found = 0
+        for offset in range(0, len(store), FilterService.MASK_CHUNK_SIZE):
+            window = slice(offset, offset + FilterService.MASK_CHUNK_SIZE)
+            end_time = store.end_time[window]
+            mask = np.ones(end_time.shape[0], dtype=np.bool_)
             
-            if time_class in normalized_controls:
-                filtered.append(game)
-        
-        return filtered
-    
-    @staticmethod
-    def _filter_by_rated(
-        games: List[Dict],
-        rated_only: Optional[bool],
-        unrated_only: Optional[bool]
-    ) -> List[Dict]:
-        """Filter games by rated/unrated status."""
-        if rated_only is None and unrated_only is None:
-            return games
-        
-        filtered = []
-        for game in games:
-            is_rated = game.get("rated", False)
+            # Missing end times are NaN, which fails every comparison
+            if start_ts is not None:
+                mask &= end_time >= start_ts
+            if end_ts is not None:
+                mask &= end_time <= end_ts
+            
+            if allowed_mask is not None:
+                mask &= (store.time_class[window] & allowed_mask) != 0
+            
+            if rated_only:
+                mask &= store.rated[window]
+            elif unrated_only:
+                mask &= ~store.rated[window]
             
-            if rated_only and is_rated:
-                filtered.append(game)
-            elif unrated_only and not is_rated:
-                filtered.append(game)
-            elif not rated_only and not unrated_only:
-                # Include all if neither is True
-                filtered.append(game)
+            chunk_matches = np.flatnonzero(mask)[:limit - found] + offset
+            matches.append(chunk_matches)
+            found += chunk_matches.shape[0]
+            if found >= limit:
+                break
         
-        return filtered
+        return np.concatenate(matches) if matches else np.empty(0, dtype=np.int64)
     
     @staticmethod
     def get_filter_summary(games: List[Dict]) -> Dict:
@@ -264,44 +384,46 @@ class FilterService:
                 "date_range": None
             }
         
-        # Count time controls
-        time_control_counts = {}
-        rated_count = 0
-        unrated_count = 0
-        dates = []
+        time_control_counts = Counter(game.get("time_class", "unknown") for game in games)
         
-        for game in games:
-            # Time control
-            time_class = game.get("time_class", "unknown")
-            time_control_counts[time_class] = time_control_counts.get(time_class, 0) + 1
-            
-            # Rated status
-            if game.get("rated", False):
-                rated_count += 1
-            else:
-                unrated_count += 1
-            
-            # Date
-            end_time = game.get("end_time")
-            if end_time:
-                if isinstance(end_time, (int, float)):
-                    dates.append(datetime.fromtimestamp(end_time, tz=timezone.utc))
-                elif isinstance(end_time, datetime):
-                    dates.append(end_time)
+        if len(games) >= FilterService.VECTORIZE_MIN_GAMES:
+            rated = np.fromiter((bool(game.get("rated", False)) for game in games), dtype=np.bool_, count=len(games))
+            rated_count = int(rated.sum())
+            end_times = np.fromiter(
+                (_end_timestamp(game.get("end_time"), np.nan) for game in games),
+                dtype=np.float64,
+                count=len(games)
+            )
+            end_times = end_times[~np.isnan(end_times)]
+            min_ts, max_ts = (end_times.min(), end_times.max()) if end_times.size else (None, None)
+        else:
+            # One pass with running min/max - no per-game date list
+            rated_count = 0
+            min_ts = max_ts = None
+            for game in games:
+                if game.get("rated", False):
+                    rated_count += 1
+                
+                end_ts = _end_timestamp(game.get("end_time"))
+                if end_ts is not None:
+                    if min_ts is None or end_ts < min_ts:
+                        min_ts = end_ts
+                    if max_ts is None or end_ts > max_ts:
+                        max_ts = end_ts
         
-        # Determine date range
+        # Determine date range; orjson formats the two datetimes in the response
         date_range = None
-        if dates:
+        if min_ts is not None:
             date_range = {
-                "earliest": min(dates).isoformat(),
-                "latest": max(dates).isoformat()
+                "earliest": datetime.fromtimestamp(float(min_ts), tz=timezone.utc),
+                "latest": datetime.fromtimestamp(float(max_ts), tz=timezone.utc)
             }
         
         return {
             "total_games": len(games),
-            "time_controls": time_control_counts,
+            "time_controls": dict(time_control_counts),
             "rated_count": rated_count,
-            "unrated_count": unrated_count,
+            "unrated_count": len(games) - rated_count,
             "date_range": date_range
         }
 
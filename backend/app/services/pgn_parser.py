@@ -0,0 +1,32 @@
+"""
+Shared PGN parsing.
+
+Both analysis services parse the same PGN text; games are parsed once and the
+parsed `chess.pgn.Game` is reused for repeat requests (retries, re-analysis).
+"""
+
+import io
+from functools import lru_cache
+from typing import Optional
+
+import chess.pgn
+
+
+# Parsed games kept in memory (~6 KB of PGN per game)
+PGN_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=PGN_CACHE_SIZE)
+def parse_game(pgn_text: str) -> Optional[chess.pgn.Game]:
+    """
+    Parse the first game of a PGN string.
+    
+    The returned game is shared between callers and must not be modified.
+    
+    Args:
+        pgn_text: PGN string of the game
+    
+    Returns:
+        Parsed game, or None if the text contains no game
+    """
+    return chess.pgn.read_game(io.StringIO(pgn_text))
@@ -0,0 +1,153 @@
+"""
+Pool of long-lived Stockfish engines.
+
+Starting Stockfish and completing the UCI handshake costs tens of milliseconds
+and allocates a fresh hash table, so engines are kept alive and shared across
+analysis requests instead of being spawned per game.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import chess.engine
+from loguru import logger
+
+from ..core.config import settings
+
+
+class StockfishPool:
+    """Async pool of Stockfish engine processes."""
+
+    def __init__(
+        self,
+        stockfish_path: str,
+        min_size: int = 2,
+        max_size: Optional[int] = None,
+        idle_timeout: float = 300.0,
+        hash_mb: int = 256
+    ):
+        """
+        Initialize the pool. Engines are started lazily on first use.
+
+        Args:
+            stockfish_path: Path to the Stockfish binary
+            min_size: Number of engines kept alive even when idle
+            max_size: Maximum number of engines running at once (default: CPU count)
+            idle_timeout: Seconds after which surplus idle engines are closed
+            hash_mb: Hash table size (MB) per engine
+        """
+        self.stockfish_path = stockfish_path
+        self.max_size = max_size or os.cpu_count() or 1
+        self.min_size = min(min_size, self.max_size)
+        self.idle_timeout = idle_timeout
+        self.hash_mb = hash_mb
+
+        # Idle engines with the time they were released
+        self._idle: List[Tuple[chess.engine.UciProtocol, float]] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self) -> None:
+        """Bind pool state to the running event loop (engines can't cross loops)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._idle:
+                logger.warning("Stockfish pool used from a new event loop; discarding idle engines")
+            self._idle = []
+            self._semaphore = asyncio.Semaphore(self.max_size)
+            self._loop = loop
+
+    async def _start_engine(self) -> chess.engine.UciProtocol:
+        """Start and configure a new engine process."""
+        _, engine = await chess.engine.popen_uci(self.stockfish_path)
+        # One search thread per engine: parallelism comes from running engines side by side
+        await engine.configure({"Hash": self.hash_mb, "Threads": 1})
+        return engine
+
+    @staticmethod
+    async def _quit_engine(engine: chess.engine.UciProtocol) -> None:
+        """Quit an engine, ignoring engines that already terminated."""
+        try:
+            await engine.quit()
+        except Exception:
+            pass
+
+    async def start(self) -> None:
+        """Pre-warm `min_size` engines."""
+        self._bind_loop()
+        missing = self.min_size - len(self._idle)
+        if missing <= 0:
+            return
+
+        engines = await asyncio.gather(*(self._start_engine() for _ in range(missing)))
+        now = time.monotonic()
+        self._idle.extend((engine, now) for engine in engines)
+        logger.info(f"Stockfish pool started with {len(self._idle)} engines")
+
+    async def _prune_idle(self) -> None:
+        """Close surplus engines that have been idle longer than `idle_timeout`."""
+        cutoff = time.monotonic() - self.idle_timeout
+        keep = []
+        expired = []
+        # Most recently released engines are at the end of the list
+        for engine, released_at in reversed(self._idle):
+            if released_at < cutoff and len(keep) >= self.min_size:
+                expired.append(engine)
+            else:
+                keep.append((engine, released_at))
+
+        if expired:
+            self._idle = list(reversed(keep))
+            for engine in expired:
+                await self._quit_engine(engine)
+            logger.debug(f"Closed {len(expired)} idle Stockfish engines")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[chess.engine.UciProtocol]:
+        """
+        Borrow an engine from the pool.
+
+        Usage:
+            async with pool.acquire() as engine:
+                info = await engine.analyse(board, limit)
+
+        Engines that raise while borrowed are discarded rather than returned.
+        """
+        self._bind_loop()
+        async with self._semaphore:
+            engine = self._idle.pop()[0] if self._idle else await self._start_engine()
+            try:
+                yield engine
+            except BaseException:
+                await self._quit_engine(engine)
+                raise
+
+            self._idle.append((engine, time.monotonic()))
+            await self._prune_idle()
+
+    async def close(self) -> None:
+        """Quit all idle engines."""
+        idle, self._idle = self._idle, []
+        for engine, _ in idle:
+            await self._quit_engine(engine)
+
+
+# Pools keyed by Stockfish binary path
+_pools: Dict[str, StockfishPool] = {}
+
+
+def get_stockfish_pool(stockfish_path: Optional[str] = None) -> StockfishPool:
+    """Get the shared engine pool for a Stockfish binary."""
+    path = stockfish_path or settings.STOCKFISH_PATH
+    if path not in _pools:
+        _pools[path] = StockfishPool(path)
+    return _pools[path]
+
+
+async def close_stockfish_pools() -> None:
+    """Quit every pooled engine (called on application shutdown)."""
+    for pool in _pools.values():
+        await pool.close()
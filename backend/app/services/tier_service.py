@@ -1,12 +1,22 @@
 """
 Tier Management Service for handling Free vs Pro user logic.
 """
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Dict, Optional
+from typing import Dict, Iterator, Optional, Set
 from sqlalchemy.orm import Session
 from loguru import logger
 
 from ..models.user import User
+from ..core.rate_limit import consume_ai_quota, reset_ai_quota
+
+
+# Upgrade prompts shown to free users
+_EXHAUSTED_MSG = (
+    "🎯 You've used all your free AI analyses! "
+    "Upgrade to Pro for unlimited AI coaching and YouTube recommendations."
+)
+_REMAINING_TMPL = "💡 You have {n} AI analysis trial{s} remaining. Upgrade to Pro for unlimited access!"
 
 
 class TierService:
@@ -18,6 +28,66 @@ class TierService:
     
     def __init__(self, db: Session):
         self.db = db
+        # Open batch() blocks; while > 0 changes are flushed, not committed
+        self._batch_depth = 0
+        # Users whose Redis AI quota was consumed for usage not yet committed
+        self._uncommitted_quota: Set[int] = set()
+    
+    @contextmanager
+    def batch(self) -> Iterator["TierService"]:
+        """
+        Group tier updates into one transaction.
+        
+        Inside the block every update is only flushed; the outermost block
+        commits once on exit (or rolls back if it raises).
+        
+        Example:
+            with tier_service.batch():
+                for user in users:
+                    tier_service.increment_ai_usage(user)
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        except Exception:
+            if self._batch_depth == 1:
+                self.db.rollback()
+                self._release_quota()
+            raise
+        else:
+            if self._batch_depth == 1:
+                self._commit()
+        finally:
+            self._batch_depth -= 1
+    
+    def _commit(self) -> None:
+        """Commit, releasing the Redis quota consumed for usage that didn't persist."""
+        try:
+            self.db.commit()
+        except Exception:
+            self._release_quota()
+            raise
+        self._uncommitted_quota.clear()
+    
+    def _release_quota(self) -> None:
+        """Drop Redis quota counters consumed since the last commit; they re-seed from the database."""
+        for user_id in self._uncommitted_quota:
+            reset_ai_quota(user_id)
+        self._uncommitted_quota.clear()
+    
+    def _save(self, commit: bool) -> None:
+        """Commit pending changes, or just flush them when deferred to a batch/caller."""
+        if commit and not self._batch_depth:
+            self._commit()
+            return
+        
+        try:
+            self.db.flush()
+        except Exception:
+            # An open batch() releases the quota when it rolls back
+            if not self._batch_depth:
+                self._release_quota()
+            raise
     
     def can_use_ai_analysis(self, user: User) -> bool:
         """
@@ -45,77 +115,100 @@ class TierService:
         Returns:
             Dictionary with tier information
         """
+        # Read each instrumented attribute once
+        tier = user.tier
+        is_pro = tier == "pro"
+        used = user.ai_analyses_used
+        limit = user.ai_analyses_limit
+        trial_exhausted_at = user.trial_exhausted_at
+        trial_exhausted = not is_pro and used >= limit
+        
         return {
-            "tier": user.tier,
-            "is_pro": user.is_pro,
-            "can_use_ai": self.can_use_ai_analysis(user),
-            "ai_analyses_used": user.ai_analyses_used,
-            "ai_analyses_limit": user.ai_analyses_limit,
-            "remaining_ai_analyses": user.remaining_ai_analyses,
-            "trial_exhausted": user.ai_analyses_used >= user.ai_analyses_limit and not user.is_pro,
-            "trial_exhausted_at": user.trial_exhausted_at.isoformat() if user.trial_exhausted_at else None
+            "tier": tier,
+            "is_pro": is_pro,
+            "can_use_ai": not trial_exhausted,
+            "ai_analyses_used": used,
+            "ai_analyses_limit": limit,
+            "remaining_ai_analyses": -1 if is_pro else max(0, limit - used),
+            "trial_exhausted": trial_exhausted,
+            "trial_exhausted_at": trial_exhausted_at.isoformat() if trial_exhausted_at else None
         }
     
-    def increment_ai_usage(self, user: User) -> bool:
+    def increment_ai_usage(self, user: User, commit: bool = True) -> bool:
         """
         Increment AI analysis usage counter for user.
         
         Args:
             user: User model instance
+            commit: Commit immediately (False = flush only; caller commits)
             
         Returns:
             True if increment was successful, False if limit reached
         """
+        username = user.chesscom_username
         if user.is_pro:
             # Pro users have unlimited usage
-            logger.info(f"Pro user {user.chesscom_username} using AI analysis (unlimited)")
+            logger.info(f"Pro user {username} using AI analysis (unlimited)")
             return True
         
-        if user.ai_analyses_used >= user.ai_analyses_limit:
+        used = user.ai_analyses_used
+        limit = user.ai_analyses_limit
+        if used >= limit:
             logger.warning(
-                f"Free user {user.chesscom_username} has exhausted AI analysis trial "
-                f"({user.ai_analyses_used}/{user.ai_analyses_limit})"
+                f"Free user {username} has exhausted AI analysis trial "
+                f"({used}/{limit})"
             )
             return False
         
+        # Reserve a slot atomically so concurrent requests cannot overspend the trial
+        remaining = consume_ai_quota(user.id, limit, used)
+        if remaining == -1:
+            logger.warning(f"Free user {username} AI analysis quota already consumed")
+            return False
+        if remaining is not None:
+            self._uncommitted_quota.add(user.id)
+        
         # Increment usage
-        user.ai_analyses_used += 1
+        used += 1
+        user.ai_analyses_used = used
         
         # Mark trial as exhausted if limit reached
-        if user.ai_analyses_used >= user.ai_analyses_limit and not user.trial_exhausted_at:
+        if used >= limit and not user.trial_exhausted_at:
             user.trial_exhausted_at = datetime.now(timezone.utc)
             logger.info(
-                f"Free user {user.chesscom_username} has exhausted AI analysis trial "
-                f"({user.ai_analyses_used}/{user.ai_analyses_limit})"
+                f"Free user {username} has exhausted AI analysis trial "
+                f"({used}/{limit})"
             )
         else:
             logger.info(
-                f"Free user {user.chesscom_username} AI analysis usage: "
-                f"{user.ai_analyses_used}/{user.ai_analyses_limit}"
+                f"Free user {username} AI analysis usage: "
+                f"{used}/{limit}"
             )
         
-        self.db.commit()
+        self._save(commit)
         return True
     
-    def upgrade_to_pro(self, user: User) -> None:
+    def upgrade_to_pro(self, user: User, commit: bool = True) -> None:
         """
         Upgrade user to Pro tier.
         
         Args:
             user: User model instance
+            commit: Commit immediately (False = flush only; caller commits)
         """
         user.tier = "pro"
         user.ai_analyses_limit = -1  # Unlimited
         logger.info(f"User {user.chesscom_username} upgraded to Pro tier")
-        self.db.commit()
+        self._save(commit)
     
-    def downgrade_to_free(self, user: User, reset_trial: bool = False) -> None:
+    def downgrade_to_free(self, user: User, reset_trial: bool = False, commit: bool = True) -> None:
         """
         Downgrade user to Free tier.
         
         Args:
             user: User model instance
             reset_trial: Whether to reset trial counter
+            commit: Commit immediately (False = flush only; caller commits)
         """
         user.tier = "free"
         user.ai_analyses_limit = self.FREE_AI_ANALYSIS_LIMIT
@@ -123,11 +216,12 @@ class TierService:
         if reset_trial:
             user.ai_analyses_used = 0
             user.trial_exhausted_at = None
+            reset_ai_quota(user.id)
             logger.info(f"User {user.chesscom_username} downgraded to Free tier (trial reset)")
         else:
             logger.info(f"User {user.chesscom_username} downgraded to Free tier")
         
-        self.db.commit()
+        self._save(commit)
     
     def get_upgrade_message(self, user: User) -> Optional[str]:
         """
@@ -142,17 +236,11 @@ class TierService:
         if user.is_pro:
             return None
         
-        if user.ai_analyses_used >= user.ai_analyses_limit:
-            return (
-                "🎯 You've used all your free AI analyses! "
-                "Upgrade to Pro for unlimited AI coaching and YouTube recommendations."
-            )
+        remaining = user.ai_analyses_limit - user.ai_analyses_used
+        if remaining <= 0:
+            return _EXHAUSTED_MSG
         
-        remaining = user.remaining_ai_analyses
-        return (
-            f"💡 You have {remaining} AI analysis trial{'s' if remaining != 1 else ''} remaining. "
-            "Upgrade to Pro for unlimited access!"
-        )
+        return _REMAINING_TMPL.format(n=remaining, s="" if remaining == 1 else "s")
 
 
 # Factory function
@@ -4,7 +4,7 @@ import pytest
 from typing import Generator
 import asyncio
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from unittest.mock import Mock, AsyncMock, MagicMock
@@ -14,6 +14,7 @@ from app.core.database import Base, get_db
 from app.models.user import User
 from app.models.game import Game
 from app.models.insights import UserInsight
+from tests.fixtures.supabase_mocks import MockSupabaseClient
 
 # Set test environment
 os.environ["TESTING"] = "1"
@@ -32,30 +33,78 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
-def override_get_db():
-    """Override database dependency for testing."""
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+# pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _emit_begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+def pytest_addoption(parser):
+    """Register command line options."""
+    parser.addoption(
+        "--network",
+        action="store_true",
+        default=False,
+        help="run tests marked 'network' that call the live Chess.com API"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip live-network tests unless explicitly requested."""
+    if config.getoption("--network") or os.getenv("RUN_NETWORK_TESTS"):
+        return
+    
+    skip_network = pytest.mark.skip(reason="needs --network or RUN_NETWORK_TESTS=1")
+    for item in items:
+        if "network" in item.keywords:
+            item.add_marker(skip_network)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database_schema():
+    """Create the schema once for the whole test session."""
+    Base.metadata.create_all(bind=engine)
+    yield
+
+
+@pytest.fixture(scope="session")
+def event_loop() -> Generator:
+    """
+    One event loop for every async test and fixture in the session.
+    
+    Overrides pytest-asyncio's per-test loop, so loop-bound clients
+    (httpx, redis) can be reused across tests.
+    """
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
 
 
 @pytest.fixture(scope="function")
 def db() -> Generator:
     """
-    Create a fresh database for each test.
+    Database session isolated in a transaction that is rolled back after the test.
+    
+    Commits inside the test only release a SAVEPOINT, so no test sees
+    another's rows and the schema never has to be rebuilt.
     
     Yields:
         Database session
     """
-    Base.metadata.create_all(bind=engine)
-    db = TestingSessionLocal()
+    connection = engine.connect()
+    transaction = connection.begin()
+    db = TestingSessionLocal(bind=connection, join_transaction_mode="create_savepoint")
     try:
         yield db
     finally:
         db.close()
-        Base.metadata.drop_all(bind=engine)
+        transaction.rollback()
+        connection.close()
 
 
 @pytest.fixture(scope="function")
@@ -69,6 +118,10 @@ def client(db) -> Generator:
     Yields:
         FastAPI test client
     """
+    def override_get_db():
+        """Serve requests from the test's transactional session."""
+        yield db
+    
     app.dependency_overrides[get_db] = override_get_db
     
     with TestClient(app) as test_client:
@@ -132,106 +185,21 @@ def sample_game_data(sample_game_pgn):
 
 @pytest.fixture
 def mock_supabase_client(monkeypatch):
-    """Mock Supabase client for testing."""
-    class MockSupabaseClient:
-        def __init__(self):
-            self.auth = MockAuthClient()
-        
-        def table(self, name):
-            return MockTable()
-    
-    class MockSuccessResponse:
-        def __init__(self):
-            self.error = None
-    
-    class MockAuthClient:
-        def sign_up(self, credentials):
-            return MockAuthResponse(success=True)
-        
-        def sign_in_with_password(self, credentials):
-            return MockAuthResponse(success=True)
-        
-        def sign_out(self):
-            return MockSuccessResponse()
-        
-        def get_user(self):
-            return MockUser()
-        
-        def set_session(self, access_token, refresh_token):
-            pass
-        
-        def update_user(self, data):
-            return MockUser()
-        
-        def reset_password_email(self, email):
-            pass
-        
-        def refresh_session(self, refresh_token):
-            return MockAuthResponse(success=True)
-    
-    class MockAuthResponse:
-        def __init__(self, success=True):
-            self.user = MockUser() if success else None
-            self.session = MockSession() if success else None
-            self.error = None if success else {"message": "Error"}
-    
-    class MockUser:
-        def __init__(self):
-            self.id = "test-user-id-123"
-            self.email = "test@example.com"
-            self.created_at = "2024-01-01T00:00:00Z"
-        
-        def dict(self):
-            return {
-                "id": self.id,
-                "email": self.email,
-                "created_at": self.created_at
-            }
-    
-    class MockSession:
-        def __init__(self):
-            self.access_token = "test-access-token-abc123"
-            self.refresh_token = "test-refresh-token-xyz789"
-            self.expires_at = "2024-12-31T23:59:59Z"
-    
-    class MockTable:
-        def __init__(self):
-            self._data = []
-        
-        def select(self, *args):
-            return self
-        
-        def insert(self, data):
-            self._data.append(data)
-            return self
-        
-        def update(self, data):
-            return self
-        
-        def delete(self):
-            return self
-        
-        def eq(self, column, value):
-            return self
-        
-        def single(self):
-            return self
-        
-        def execute(self):
-            return MockResponse(self._data)
+    """Mock Supabase client for testing (the same instance the app receives)."""
+    client = MockSupabaseClient()
     
     def mock_get_supabase():
-        return MockSupabaseClient()
-    
-    def mock_get_supabase_admin():
-        return MockSupabaseClient()
+        return client
     
-    monkeypatch.setattr("app.core.supabase_client.get_supabase", mock_get_supabase)
-    monkeypatch.setattr("app.core.supabase_client.get_supabase_admin", mock_get_supabase_admin)
-    monkeypatch.setattr("app.services.auth_service.get_supabase", mock_get_supabase)
-    monkeypatch.setattr("app.services.auth_service.get_supabase_admin", mock_get_supabase_admin)
+    for target in (
+        "app.core.supabase_client.get_supabase",
+        "app.core.supabase_client.get_supabase_admin",
+        "app.services.auth_service.get_supabase",
+        "app.services.auth_service.get_supabase_admin",
+    ):
+        monkeypatch.setattr(target, mock_get_supabase)
     
-    return MockSupabaseClient()
+    return client
 
 
 @pytest.fixture
@@ -105,6 +105,8 @@ CREATE INDEX idx_games_chesscom_game_id ON games(chesscom_game_id);
 CREATE INDEX idx_games_end_time ON games(end_time);
 CREATE INDEX idx_games_time_class ON games(time_class);
 CREATE INDEX idx_games_is_analyzed ON games(is_analyzed);
+CREATE INDEX idx_games_user_end_time ON games(user_id, end_time);
+CREATE INDEX idx_games_user_time_class ON games(user_id, time_class, end_time);
 
 -- ============================================
 -- TABLE 3: game_analyses
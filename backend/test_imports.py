@@ -1,8 +1,9 @@
 """Quick script to verify all critical packages are installed."""
+from importlib.util import find_spec
 
 print("🔍 Testing package imports...\n")
 
-packages = [
+packages = (
     ("fastapi", "FastAPI"),
     ("supabase", "Supabase"),
     ("pytest", "Pytest"),
@@ -11,18 +12,18 @@ packages = [
     ("pydantic", "Pydantic"),
     ("sqlalchemy", "SQLAlchemy"),
     ("redis", "Redis"),
-]
+)
 
 failed = []
 success = []
 
+# Locate each package without importing it, so no package init code runs
 for module, name in packages:
-    try:
-        __import__(module)
+    if find_spec(module) is not None:
         print(f"✅ {name}")
         success.append(name)
-    except ImportError as e:
-        print(f"❌ {name}: {e}")
+    else:
+        print(f"❌ {name}: No module named '{module}'")
         failed.append(name)
 
 print(f"\n📊 Results: {len(success)}/{len(packages)} packages available")
@@ -0,0 +1,98 @@
+"""
+Numba-compiled raw bitboard move replay for the move iteration benchmark.
+
+A baseline for python-chess's `board.push`: moves are pre-encoded as uint8
+arrays and applied with bit operations on 12 piece bitboards, with no
+legality checks, hashing or Python objects in the loop. Requires numba.
+"""
+from typing import Tuple
+
+import chess
+import numpy as np
+from numba import njit
+
+
+# Bitboard index of a piece: 0-5 white pawn..king, 6-11 black pawn..king; -1 = empty square
+EMPTY = -1
+
+
+def encode_position(board: chess.Board) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Encode a position as a piece-index mailbox and 12 piece bitboards.
+    
+    Returns:
+        (mailbox int8[64], bitboards uint64[12])
+    """
+    mailbox = np.full(64, EMPTY, dtype=np.int8)
+    bitboards = np.zeros(12, dtype=np.uint64)
+    for square, piece in board.piece_map().items():
+        index = piece.piece_type - 1 + (0 if piece.color == chess.WHITE else 6)
+        mailbox[square] = index
+        bitboards[index] |= np.uint64(1) << np.uint64(square)
+    return mailbox, bitboards
+
+
+def encode_moves(moves) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Encode moves as from-square, to-square and promotion piece type (0 = none) arrays.
+    """
+    moves = list(moves)
+    moves_from = np.fromiter((move.from_square for move in moves), dtype=np.uint8, count=len(moves))
+    moves_to = np.fromiter((move.to_square for move in moves), dtype=np.uint8, count=len(moves))
+    moves_promo = np.fromiter((move.promotion or 0 for move in moves), dtype=np.uint8, count=len(moves))
+    return moves_from, moves_to, moves_promo
+
+
+@njit(cache=True)
+def replay(mailbox, bitboards, moves_from, moves_to, moves_promo):
+    """
+    Apply every move to copies of the given position.
+    
+    Handles captures, en passant, castling and promotion; no legality checks.
+    
+    Returns:
+        Occupancy bitboard of the final position
+    """
+    mailbox = mailbox.copy()
+    bitboards = bitboards.copy()
+    one = np.uint64(1)
+    
+    for i in range(moves_from.shape[0]):
+        from_square = np.int64(moves_from[i])
+        to_square = np.int64(moves_to[i])
+        from_bit = one << np.uint64(from_square)
+        to_bit = one << np.uint64(to_square)
+        piece = mailbox[from_square]
+        captured = mailbox[to_square]
+        
+        if captured != EMPTY:
+            bitboards[captured] ^= to_bit
+        bitboards[piece] ^= from_bit | to_bit
+        mailbox[from_square] = EMPTY
+        mailbox[to_square] = piece
+        
+        kind = piece % 6
+        if kind == 0 and captured == EMPTY and abs(to_square - from_square) % 8 != 0:
+            # En passant: the captured pawn is behind the destination square
+            pawn_square = to_square - 8 if piece < 6 else to_square + 8
+            bitboards[mailbox[pawn_square]] ^= one << np.uint64(pawn_square)
+            mailbox[pawn_square] = EMPTY
+        elif kind == 5 and abs(to_square - from_square) == 2:
+            # Castling: move the rook to the other side of the king
+            rook_from = from_square + 3 if to_square > from_square else from_square - 4
+            rook_to = from_square + 1 if to_square > from_square else from_square - 1
+            rook = mailbox[rook_from]
+            bitboards[rook] ^= (one << np.uint64(rook_from)) | (one << np.uint64(rook_to))
+            mailbox[rook_from] = EMPTY
+            mailbox[rook_to] = rook
+        
+        if moves_promo[i] != 0:
+            promoted = moves_promo[i] - 1 + (0 if piece < 6 else 6)
+            bitboards[piece] ^= to_bit
+            bitboards[promoted] ^= to_bit
+            mailbox[to_square] = promoted
+    
+    occupied = np.uint64(0)
+    for index in range(12):
+        occupied |= bitboards[index]
+    return occupied
@@ -1,249 +1,198 @@
 """
 Benchmarking suite for chess analysis performance.
 
-Run with: pytest benchmark_analysis.py -v --benchmark
+Uses pytest-benchmark, which calibrates rounds, warms up and reports
+statistics per benchmark.
+
+Run with:
+    pytest tests/benchmark_analysis.py --benchmark-only --benchmark-save=analysis --benchmark-min-rounds=20
+
+Compare against the saved baseline (fails on a >10% mean regression):
+    pytest tests/benchmark_analysis.py --benchmark-only --benchmark-compare --benchmark-compare-fail=mean:10%
 """
-import time
-import statistics
-from typing import List, Dict
-from fixtures.sample_pgns import get_all_sample_pgns
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Tuple
+
+import chess
 import chess.pgn
-import io
+import pytest
 
+from fixtures.sample_pgns import LineReader, fast_parse, get_all_sample_games, get_all_sample_pgns, get_sample_moves, get_sample_positions, split_pgn
 
-class AnalysisBenchmark:
-    """Benchmark chess analysis operations."""
-    
-    def __init__(self):
-        self.results: Dict[str, List[float]] = {}
+
+pytestmark = pytest.mark.benchmark
+
+STOCKFISH_PATH = os.getenv("STOCKFISH_PATH", "/usr/games/stockfish")
+
+# Positions evaluated by the Stockfish benchmarks
+EVALUATION_POSITIONS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",  # Starting
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",  # Italian
+    "rnbqkb1r/ppp2ppp/4pn2/3p4/2PP4/2N5/PP2PPPP/R1BQKBNR w KQkq - 0 4",  # Queen's Gambit
+]
+
+
+@pytest.fixture(scope="module")
+def sample_pgns() -> Mapping[str, str]:
+    """Raw sample PGNs."""
+    return get_all_sample_pgns()
+
+
+@pytest.fixture(scope="module")
+def sample_pgn_lines(sample_pgns) -> List[List[str]]:
+    """Sample PGNs pre-split into lines, so splitting isn't timed."""
+    return [split_pgn(pgn) for pgn in sample_pgns.values()]
+
+
+@pytest.fixture(scope="module")
+def sample_lines() -> List[Tuple[chess.Board, List[chess.Move]]]:
+    """
+    Start board and decoded mainline moves of each sample game.
     
-    def benchmark_pgn_parsing(self, iterations: int = 100) -> Dict:
-        """
-        Benchmark PGN parsing speed.
-        
-        Args:
-            iterations: Number of iterations to run
-        
-        Returns:
-            Dict with timing statistics
-        """
-        samples = get_all_sample_pgns()
-        timings = []
-        
-        for _ in range(iterations):
-            start = time.perf_counter()
-            
-            for pgn in samples.values():
-                game = chess.pgn.read_game(io.StringIO(pgn))
-                assert game is not None
-            
-            elapsed = time.perf_counter() - start
-            timings.append(elapsed)
+    Uses the games pre-parsed by the fixtures module, so move iteration is
+    timed without any FEN or SAN parsing.
+    """
+    return [(game.board(), get_sample_moves(name)) for name, game in get_all_sample_games().items()]
+
+
+def parse_all(pgn_lines: List[List[str]]) -> List[chess.pgn.Game]:
+    """Parse every sample PGN from its pre-split lines."""
+    return [chess.pgn.read_game(LineReader(lines)) for lines in pgn_lines]
+
+
+def replay_all(lines: List[Tuple[chess.Board, List[chess.Move]]]) -> None:
+    """Push every move of every sample game onto a copy of its start board."""
+    for start_board, moves in lines:
+        board = start_board.copy(stack=False)
         
-        return {
-            "operation": "pgn_parsing",
-            "iterations": iterations,
-            "games_per_iteration": len(samples),
-            "mean_time": statistics.mean(timings),
-            "median_time": statistics.median(timings),
-            "min_time": min(timings),
-            "max_time": max(timings),
-            "stddev": statistics.stdev(timings) if len(timings) > 1 else 0
-        }
+        for move in moves:
+            board.push(move)
+
+
+@pytest.mark.benchmark(group="pgn_parsing")
+def test_pgn_parsing(benchmark, sample_pgn_lines):
+    """Benchmark PGN parsing speed."""
+    games = benchmark(parse_all, sample_pgn_lines)
+    assert all(game is not None for game in games)
+
+
+@pytest.mark.benchmark(group="pgn_parsing")
+def test_pgn_tokenizing(benchmark, sample_pgns):
+    """Benchmark the single-pass tokenizer (headers + SAN list, no game tree)."""
+    def tokenize_all():
+        return [fast_parse(pgn) for pgn in sample_pgns.values()]
     
-    def benchmark_move_iteration(self, iterations: int = 100) -> Dict:
-        """
-        Benchmark move iteration speed.
-        
-        Args:
-            iterations: Number of iterations
-        
-        Returns:
-            Dict with timing statistics
-        """
-        samples = get_all_sample_pgns()
-        timings = []
-        
-        for _ in range(iterations):
-            start = time.perf_counter()
-            
-            for pgn in samples.values():
-                game = chess.pgn.read_game(io.StringIO(pgn))
-                board = game.board()
-                
-                for move in game.mainline_moves():
-                    board.push(move)
-            
-            elapsed = time.perf_counter() - start
-            timings.append(elapsed)
-        
-        return {
-            "operation": "move_iteration",
-            "iterations": iterations,
-            "games_per_iteration": len(samples),
-            "mean_time": statistics.mean(timings),
-            "median_time": statistics.median(timings),
-            "min_time": min(timings),
-            "max_time": max(timings),
-            "stddev": statistics.stdev(timings) if len(timings) > 1 else 0
-        }
+    parsed = benchmark(tokenize_all)
+    assert all(sans for _, sans in parsed)
+
+
+@pytest.mark.benchmark(group="move_iteration")
+def test_move_iteration(benchmark, sample_lines):
+    """Benchmark move iteration speed."""
+    benchmark(replay_all, sample_lines)
+
+
+@pytest.mark.benchmark(group="move_iteration")
+def test_bitboard_replay(benchmark, sample_lines):
+    """Benchmark raw Numba bitboard replay of the same moves, as a baseline for board.push."""
+    pytest.importorskip("numba")
+    from _bitboard_bench import encode_moves, encode_position, replay
     
-    def benchmark_position_evaluation(self, iterations: int = 50) -> Dict:
-        """
-        Benchmark position evaluation (requires Stockfish).
-        
-        Args:
-            iterations: Number of positions to evaluate
-        
-        Returns:
-            Dict with timing statistics
-        """
-        try:
-            from stockfish import Stockfish
-            import os
-            
-            stockfish_path = os.getenv("STOCKFISH_PATH", "/usr/games/stockfish")
-            stockfish = Stockfish(path=stockfish_path, depth=10)
-            
-            # Test positions
-            positions = [
-                "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",  # Starting
-                "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",  # Italian
-                "rnbqkb1r/ppp2ppp/4pn2/3p4/2PP4/2N5/PP2PPPP/R1BQKBNR w KQkq - 0 4",  # Queen's Gambit
-            ]
-            
-            timings = []
-            
-            for _ in range(iterations):
-                start = time.perf_counter()
-                
-                for fen in positions:
-                    stockfish.set_fen_position(fen)
-                    stockfish.get_evaluation()
-                
-                elapsed = time.perf_counter() - start
-                timings.append(elapsed)
-            
-            return {
-                "operation": "position_evaluation",
-                "iterations": iterations,
-                "positions_per_iteration": len(positions),
-                "mean_time": statistics.mean(timings),
-                "median_time": statistics.median(timings),
-                "min_time": min(timings),
-                "max_time": max(timings),
-                "stddev": statistics.stdev(timings) if len(timings) > 1 else 0,
-                "stockfish_available": True
-            }
-        
-        except Exception as e:
-            return {
-                "operation": "position_evaluation",
-                "error": str(e),
-                "stockfish_available": False
-            }
+    encoded = [(*encode_position(board), *encode_moves(moves)) for board, moves in sample_lines]
     
-    def run_all_benchmarks(self, verbose: bool = True) -> Dict:
-        """
-        Run all benchmarks and return results.
-        
-        Args:
-            verbose: Print results to console
-        
-        Returns:
-            Dict with all benchmark results
-        """
-        results = {}
-        
-        # PGN Parsing
-        if verbose:
-            print("\n🔄 Benchmarking PGN parsing...")
-        results["pgn_parsing"] = self.benchmark_pgn_parsing()
-        
-        # Move Iteration
-        if verbose:
-            print("🔄 Benchmarking move iteration...")
-        results["move_iteration"] = self.benchmark_move_iteration()
-        
-        # Position Evaluation (optional - requires Stockfish)
-        if verbose:
-            print("🔄 Benchmarking position evaluation (Stockfish)...")
-        results["position_evaluation"] = self.benchmark_position_evaluation()
-        
-        if verbose:
-            self.print_results(results)
-        
-        return results
+    def replay_all_bitboards():
+        return [replay(*game) for game in encoded]
     
-    def print_results(self, results: Dict):
-        """Print benchmark results in readable format."""
-        print("\n" + "="*60)
-        print("📊 CHESS ANALYSIS BENCHMARK RESULTS")
-        print("="*60)
-        
-        for operation, data in results.items():
-            print(f"\n🎯 {operation.replace('_', ' ').title()}")
-            print("-" * 60)
-            
-            if "error" in data:
-                print(f"  ❌ Error: {data['error']}")
-                continue
-            
-            if "iterations" in data:
-                print(f"  Iterations: {data['iterations']}")
-            
-            if "games_per_iteration" in data:
-                print(f"  Games per iteration: {data['games_per_iteration']}")
-            
-            if "positions_per_iteration" in data:
-                print(f"  Positions per iteration: {data['positions_per_iteration']}")
-            
-            print(f"\n  ⏱️  Timing Statistics:")
-            print(f"    Mean:   {data.get('mean_time', 0)*1000:.2f} ms")
-            print(f"    Median: {data.get('median_time', 0)*1000:.2f} ms")
-            print(f"    Min:    {data.get('min_time', 0)*1000:.2f} ms")
-            print(f"    Max:    {data.get('max_time', 0)*1000:.2f} ms")
-            print(f"    StdDev: {data.get('stddev', 0)*1000:.2f} ms")
-            
-            # Calculate throughput
-            if "mean_time" in data and data["mean_time"] > 0:
-                if "games_per_iteration" in data:
-                    throughput = data["games_per_iteration"] / data["mean_time"]
-                    print(f"\n  📈 Throughput: {throughput:.2f} games/second")
-                elif "positions_per_iteration" in data:
-                    throughput = data["positions_per_iteration"] / data["mean_time"]
-                    print(f"\n  📈 Throughput: {throughput:.2f} positions/second")
-        
-        print("\n" + "="*60)
-        print("✅ Benchmark complete!")
-        print("="*60 + "\n")
+    # Compile before timing
+    replay_all_bitboards()
+    occupancies = benchmark(replay_all_bitboards)
+    
+    for (board, moves), occupied in zip(sample_lines, occupancies):
+        final = board.copy(stack=False)
+        for move in moves:
+            final.push(move)
+        assert int(occupied) == final.occupied
 
 
-def test_run_benchmarks():
-    """Pytest-compatible benchmark runner."""
-    benchmark = AnalysisBenchmark()
-    results = benchmark.run_all_benchmarks(verbose=True)
+@pytest.mark.benchmark(group="position_access")
+def test_node_board_replay(benchmark):
+    """Benchmark position access via GameNode.board(), which replays from the root."""
+    nodes = [node for game in get_all_sample_games().values() for node in game.mainline()]
     
-    # Assertions for performance targets
-    assert results["pgn_parsing"]["mean_time"] < 0.1, "PGN parsing too slow"
-    assert results["move_iteration"]["mean_time"] < 0.2, "Move iteration too slow"
+    def access_all():
+        for node in nodes:
+            node.board()
+    
+    benchmark(access_all)
 
 
-if __name__ == "__main__":
-    # Run benchmarks directly
-    benchmark = AnalysisBenchmark()
-    results = benchmark.run_all_benchmarks(verbose=True)
+@pytest.mark.benchmark(group="position_access")
+def test_cached_position_lookup(benchmark):
+    """Benchmark position access via the positions cached in one forward sweep."""
+    positions = [get_sample_positions(name) for name in get_all_sample_games()]
+    plies = [(game_positions, ply) for game_positions in positions for ply in range(1, len(game_positions))]
     
-    # Save results to file
-    import json
-    from datetime import datetime
+    def access_all():
+        for game_positions, ply in plies:
+            game_positions[ply]
     
-    output = {
-        "timestamp": datetime.now().isoformat(),
-        "results": results
-    }
+    benchmark(access_all)
+
+
+# Stockfish instance of a pool worker process (set by _init_worker_engine)
+_worker_engine = None
+
+
+def _init_worker_engine():
+    """Start one Stockfish per worker process, reused for every position it evaluates."""
+    global _worker_engine
+    from stockfish import Stockfish
+    _worker_engine = Stockfish(path=STOCKFISH_PATH, depth=10)
+
+
+def _evaluate_in_worker(fen: str) -> Dict:
+    """Evaluate one position on the worker's engine."""
+    _worker_engine.set_fen_position(fen)
+    return _worker_engine.get_evaluation()
+
+
+def _require_stockfish():
+    """Skip unless the stockfish package and binary are available; returns the package."""
+    stockfish_module = pytest.importorskip("stockfish")
+    if not os.path.exists(STOCKFISH_PATH):
+        pytest.skip(f"Stockfish not found at {STOCKFISH_PATH}")
+    return stockfish_module
+
+
+@pytest.mark.benchmark(group="position_evaluation")
+def test_position_evaluation(benchmark):
+    """Benchmark position evaluation (requires Stockfish)."""
+    stockfish_module = _require_stockfish()
+    stockfish = stockfish_module.Stockfish(path=STOCKFISH_PATH, depth=10)
+    
+    def evaluate_all():
+        for fen in EVALUATION_POSITIONS:
+            stockfish.set_fen_position(fen)
+            stockfish.get_evaluation()
     
-    with open("benchmark_results.json", "w") as f:
-        json.dump(output, f, indent=2)
+    # Engine searches are slow; a fixed, smaller round count keeps the run short
+    benchmark.pedantic(evaluate_all, rounds=20, iterations=1, warmup_rounds=1)
+
+
+@pytest.mark.benchmark(group="position_evaluation")
+def test_parallel_position_evaluation(benchmark):
+    """Benchmark evaluating the positions concurrently, one Stockfish process per worker."""
+    _require_stockfish()
+    
+    workers = min(os.cpu_count() or 1, len(EVALUATION_POSITIONS))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_engine) as pool:
+        # Start every worker's engine before timing
+        list(pool.map(_evaluate_in_worker, EVALUATION_POSITIONS))
+        
+        def evaluate_all():
+            return list(pool.map(_evaluate_in_worker, EVALUATION_POSITIONS))
+        
+        evaluations = benchmark.pedantic(evaluate_all, rounds=20, iterations=1, warmup_rounds=1)
     
-    print(f"📝 Results saved to benchmark_results.json")
+    assert len(evaluations) == len(EVALUATION_POSITIONS)
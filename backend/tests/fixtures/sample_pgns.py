@@ -1,4 +1,11 @@
 """Sample PGN games for testing chess analysis."""
+import re
+from functools import lru_cache, partial
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Tuple
+
+import chess
+import chess.pgn
 
 # Real PGN from Magnus Carlsen vs Hikaru Nakamura (2021)
 SAMPLE_GAME_1_CARLSEN = """[Event "Speed Chess Championship 2021"]
@@ -120,13 +127,14 @@ Nc6 9. a3 Qa5 10. Rd1 Be7 11. Be2 dxc4 12. Bxc4 Nh5 13. Be5 Nxe5 14. Nxe5 Nf6
 
 
 # Dictionary mapping for easy access
-SAMPLE_GAMES = {
+# Read-only, so the parsed-game caches below can't go stale
+SAMPLE_GAMES = MappingProxyType({
     "carlsen_tactical": SAMPLE_GAME_1_CARLSEN,
     "blunder_heavy": SAMPLE_GAME_2_BLUNDERS,
     "tactical_brilliancy": SAMPLE_GAME_3_TACTICAL,
     "endgame_grind": SAMPLE_GAME_4_ENDGAME,
     "opening_theory": SAMPLE_GAME_5_OPENING
-}
+})
 
 
 def get_sample_pgn(game_name: str) -> str:
@@ -142,6 +150,144 @@ def get_sample_pgn(game_name: str) -> str:
     return SAMPLE_GAMES.get(game_name, SAMPLE_GAME_1_CARLSEN)
 
 
-def get_all_sample_pgns() -> dict:
-    """Get all sample PGNs."""
-    return SAMPLE_GAMES.copy()
+def get_all_sample_pgns() -> Mapping[str, str]:
+    """Get all sample PGNs (a read-only view, the same one on every call)."""
+    return SAMPLE_GAMES
+
+
+class LineReader:
+    """Text handle over pre-split lines; `chess.pgn.read_game` only calls readline()."""
+    
+    __slots__ = ("readline",)
+    
+    def __init__(self, lines: List[str]):
+        # One C-level next() per line, "" at the end like a file
+        self.readline = partial(next, iter(lines), "")
+
+
+def split_pgn(pgn: str) -> List[str]:
+    """Split a PGN into lines (with line endings) for LineReader."""
+    return pgn.splitlines(keepends=True)
+
+
+# One scan over a PGN: header tag pairs, comments (skipped) and SAN moves
+_PGN_TOKEN = re.compile(
+    r'(?m)^\[(\w+)\s+"([^"]*)"\]'
+    r'|\{[^}]*\}|;[^\n]*'
+    r'|([NBRQK]?[a-h]?[1-8]?x?[a-h][1-8](?:=[NBRQ])?[+#]?|O-O(?:-O)?[+#]?)'
+)
+
+
+def fast_parse(pgn: str) -> Tuple[Dict[str, str], List[str]]:
+    """
+    Tokenize a mainline-only PGN (no variations) without building a game tree.
+    
+    Args:
+        pgn: PGN string
+    
+    Returns:
+        (headers, SAN moves in order)
+    """
+    headers = {}
+    sans = []
+    for match in _PGN_TOKEN.finditer(pgn):
+        tag, value, san = match.groups()
+        if san:
+            sans.append(san)
+        elif tag:
+            headers[tag] = value
+    return headers, sans
+
+
+def _decode_mainline(pgn: str) -> List[chess.Move]:
+    """Decode a PGN's moves from the start position, stopping at the first illegal move."""
+    headers, sans = fast_parse(pgn)
+    board = chess.Board(headers.get("FEN", chess.STARTING_FEN))
+    moves = []
+    for san in sans:
+        try:
+            moves.append(board.push_san(san))
+        except ValueError:
+            break
+    return moves
+
+
+def _mainline_positions(game: chess.pgn.Game) -> List[chess.Board]:
+    """Boards before the first move and after every mainline move, in one forward sweep."""
+    board = game.board()
+    positions = [board.copy(stack=False)]
+    for move in game.mainline_moves():
+        board.push(move)
+        positions.append(board.copy(stack=False))
+    return positions
+
+
+@lru_cache(maxsize=None)
+def _parsed_game(game_name: str) -> chess.pgn.Game:
+    """Sample game parsed on first use, then shared by every consumer (do not modify)."""
+    return chess.pgn.read_game(LineReader(split_pgn(get_sample_pgn(game_name))))
+
+
+@lru_cache(maxsize=None)
+def _parsed_moves(game_name: str) -> List[chess.Move]:
+    """Sample game mainline moves, decoded on first use."""
+    return _decode_mainline(get_sample_pgn(game_name))
+
+
+@lru_cache(maxsize=None)
+def _parsed_positions(game_name: str) -> List[chess.Board]:
+    """
+    Sample game positions by ply, built on first use.
+    
+    GameNode.board() replays from the root on every call; these give O(1) access by ply.
+    """
+    return _mainline_positions(_parsed_game(game_name))
+
+
+def _sample_name(game_name: str) -> str:
+    """Known sample name, falling back to the default game like get_sample_pgn."""
+    return game_name if game_name in SAMPLE_GAMES else "carlsen_tactical"
+
+
+def get_sample_game(game_name: str) -> chess.pgn.Game:
+    """
+    Get a pre-parsed sample game by name.
+    
+    Args:
+        game_name: One of the keys from SAMPLE_GAMES
+    
+    Returns:
+        Parsed game (shared - do not modify)
+    """
+    return _parsed_game(_sample_name(game_name))
+
+
+def get_sample_moves(game_name: str) -> List[chess.Move]:
+    """
+    Get the mainline moves of a sample game by name.
+    
+    Args:
+        game_name: One of the keys from SAMPLE_GAMES
+    
+    Returns:
+        Decoded mainline moves (shared - do not modify)
+    """
+    return _parsed_moves(_sample_name(game_name))
+
+
+def get_sample_positions(game_name: str) -> List[chess.Board]:
+    """
+    Get the mainline positions of a sample game by name.
+    
+    Args:
+        game_name: One of the keys from SAMPLE_GAMES
+    
+    Returns:
+        Board at each ply - index 0 is the start position (shared - do not modify)
+    """
+    return _parsed_positions(_sample_name(game_name))
+
+
+def get_all_sample_games() -> Dict[str, chess.pgn.Game]:
+    """Get all pre-parsed sample games."""
+    return {name: _parsed_game(name) for name in SAMPLE_GAMES}
@@ -0,0 +1,106 @@
+"""
+Supabase client mocks shared by the test suite.
+
+Defined once at import time; the `mock_supabase_client` fixture in
+conftest.py patches them in.
+"""
+
+
+class MockSupabaseClient:
+    def __init__(self):
+        self.auth = MockAuthClient()
+    
+    def table(self, name):
+        return MockTable()
+
+
+class MockSuccessResponse:
+    def __init__(self):
+        self.error = None
+
+
+class MockAuthClient:
+    def sign_up(self, credentials):
+        return MockAuthResponse(success=True)
+    
+    def sign_in_with_password(self, credentials):
+        return MockAuthResponse(success=True)
+    
+    def sign_out(self):
+        return MockSuccessResponse()
+    
+    def get_user(self, jwt=None):
+        return MockUser()
+    
+    def set_session(self, access_token, refresh_token):
+        pass
+    
+    def update_user(self, data):
+        return MockUser()
+    
+    def reset_password_email(self, email):
+        pass
+    
+    def refresh_session(self, refresh_token):
+        return MockAuthResponse(success=True)
+
+
+class MockAuthResponse:
+    def __init__(self, success=True):
+        self.user = MockUser() if success else None
+        self.session = MockSession() if success else None
+        self.error = None if success else {"message": "Error"}
+
+
+class MockUser:
+    def __init__(self):
+        self.id = "test-user-id-123"
+        self.email = "test@example.com"
+        self.created_at = "2024-01-01T00:00:00Z"
+    
+    def dict(self):
+        return {
+            "id": self.id,
+            "email": self.email,
+            "created_at": self.created_at
+        }
+
+
+class MockSession:
+    def __init__(self):
+        self.access_token = "test-access-token-abc123"
+        self.refresh_token = "test-refresh-token-xyz789"
+        self.expires_at = "2024-12-31T23:59:59Z"
+
+
+class MockResponse:
+    def __init__(self, data):
+        self.data = data
+        self.error = None
+
+
+class MockTable:
+    def __init__(self):
+        self._data = []
+    
+    def select(self, *args):
+        return self
+    
+    def insert(self, data):
+        self._data.append(data)
+        return self
+    
+    def update(self, data):
+        return self
+    
+    def delete(self):
+        return self
+    
+    def eq(self, column, value):
+        return self
+    
+    def single(self):
+        return self
+    
+    def execute(self):
+        return MockResponse(self._data)
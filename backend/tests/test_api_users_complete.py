@@ -1,45 +1,43 @@
 """Complete API users tests with proper patterns."""
 import pytest
 from fastapi import status
-from unittest.mock import patch, MagicMock
+
+# Supabase is patched at core level by the mock_supabase_client fixture (via monkeypatch)
+pytestmark = pytest.mark.usefixtures("mock_supabase_client")
 
 
 @pytest.mark.api
-def test_create_user_endpoint(client, sample_user_data, mock_supabase_client, db):
+def test_create_user_endpoint(client, sample_user_data, db):
     """Test user creation endpoint."""
-    # Patch Supabase at core level
-    with patch('app.core.supabase_client.get_supabase', return_value=mock_supabase_client):
-        response = client.post("/api/v1/users/", json=sample_user_data)
-        
-        # API might return various status codes based on validation
-        assert response.status_code in [
-            status.HTTP_200_OK,
-            status.HTTP_201_CREATED,
-            status.HTTP_400_BAD_REQUEST,  # Validation errors
-            status.HTTP_422_UNPROCESSABLE_ENTITY  # Pydantic validation
-        ]
+    response = client.post("/api/v1/users/", json=sample_user_data)
+    
+    # API might return various status codes based on validation
+    assert response.status_code in [
+        status.HTTP_200_OK,
+        status.HTTP_201_CREATED,
+        status.HTTP_400_BAD_REQUEST,  # Validation errors
+        status.HTTP_422_UNPROCESSABLE_ENTITY  # Pydantic validation
+    ]
 
 
 @pytest.mark.api
-def test_get_nonexistent_user(client, mock_supabase_client):
+def test_get_nonexistent_user(client):
     """Test retrieving non-existent user."""
-    with patch('app.core.supabase_client.get_supabase', return_value=mock_supabase_client):
-        response = client.get("/api/v1/users/99999")
-        
-        # Should return 404 for non-existent user
-        assert response.status_code in [status.HTTP_404_NOT_FOUND, status.HTTP_422_UNPROCESSABLE_ENTITY]
+    response = client.get("/api/v1/users/99999")
+    
+    # Should return 404 for non-existent user
+    assert response.status_code in [status.HTTP_404_NOT_FOUND, status.HTTP_422_UNPROCESSABLE_ENTITY]
 
 
-@pytest.mark.api  
-def test_get_user_by_username_endpoint(client, sample_user_data, mock_supabase_client, db):
+@pytest.mark.api
+def test_get_user_by_username_endpoint(client, sample_user_data, db):
     """Test retrieving user by Chess.com username."""
-    with patch('app.core.supabase_client.get_supabase', return_value=mock_supabase_client):
-        # Try to get user (may not be implemented yet)
-        response = client.get(f"/api/v1/users/username/{sample_user_data['chesscom_username']}")
-        
-        # Accept both found and not found (depends on implementation state)
-        assert response.status_code in [
-            status.HTTP_200_OK,
-            status.HTTP_404_NOT_FOUND,
-            status.HTTP_422_UNPROCESSABLE_ENTITY
-        ]
+    # Try to get user (may not be implemented yet)
+    response = client.get(f"/api/v1/users/username/{sample_user_data['chesscom_username']}")
+    
+    # Accept both found and not found (depends on implementation state)
+    assert response.status_code in [
+        status.HTTP_200_OK,
+        status.HTTP_404_NOT_FOUND,
+        status.HTTP_422_UNPROCESSABLE_ENTITY
+    ]
@@ -1,69 +1,97 @@
 """Complete auth tests with proper async mocking."""
+import asyncio
+import time
+
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
 
+from app.services.auth_service import auth_service
+from tests.fixtures.supabase_mocks import MockSupabaseClient
 
-@pytest.mark.auth
-@pytest.mark.asyncio
-async def test_sign_up_success(mock_supabase_client):
-    """Test successful user registration."""
-    # Import after fixture setup
-    from app.services.auth_service import auth_service
-    
-    # Patch at the right level
-    with patch('app.core.supabase_client.get_supabase', return_value=mock_supabase_client):
-        result = await auth_service.sign_up(
-            email="newuser@example.com",
-            password="securepass123",
-            metadata={"chesscom_username": "testuser"}
-        )
-        
-        # Auth service returns dict with success key
-        assert "success" in result
-        assert result["success"] is True
+# Supabase is patched at core and auth_service level by the mock_supabase_client fixture
+pytestmark = pytest.mark.usefixtures("mock_supabase_client")
 
 
 @pytest.mark.auth
 @pytest.mark.asyncio
-async def test_sign_in_success(mock_supabase_client):
-    """Test successful user login."""
-    from app.services.auth_service import auth_service
+@pytest.mark.parametrize("method,kwargs,expected_keys", [
+    (
+        "sign_up",
+        {"email": "newuser@example.com", "password": "securepass123", "metadata": {"chesscom_username": "testuser"}},
+        ()
+    ),
+    (
+        "sign_in",
+        {"email": "test@example.com", "password": "password123"},
+        ("access_token", "refresh_token")
+    ),
+    (
+        "sign_out",
+        {"access_token": "test-access-token"},
+        ()
+    ),
+], ids=["sign_up", "sign_in", "sign_out"])
+async def test_auth_call_succeeds(method, kwargs, expected_keys):
+    """Test that registration, login and sign out return a success dict."""
+    result = await getattr(auth_service, method)(**kwargs)
     
-    with patch('app.core.supabase_client.get_supabase', return_value=mock_supabase_client):
-        result = await auth_service.sign_in(
-            email="test@example.com",
-            password="password123"
-        )
-        
-        assert "success" in result
-        assert result["success"] is True
-        assert "access_token" in result
-        assert "refresh_token" in result
+    # Auth service returns dict with success key
+    assert isinstance(result, dict)
+    assert result.get("success", False) is True
+    for key in expected_keys:
+        assert key in result
 
 
 @pytest.mark.auth
 @pytest.mark.asyncio
-async def test_get_user_with_valid_token(mock_supabase_client):
+async def test_get_user_with_valid_token():
     """Test getting user with valid token."""
-    from app.services.auth_service import auth_service
+    user = await auth_service.get_user("test-access-token-abc123")
+    
+    # Should return user dict or None
+    assert user is None or isinstance(user, dict)
+
+
+class TokenUser:
+    """Supabase user whose ID is the token it was looked up with."""
+    
+    def __init__(self, token):
+        self.token = token
     
-    with patch('app.core.supabase_client.get_supabase', return_value=mock_supabase_client):
-        user = await auth_service.get_user("test-access-token-abc123")
-        
-        # Should return user dict or None
-        assert user is not None or user is None  # Both are valid responses
+    def dict(self):
+        return {"id": self.token, "email": f"{self.token}@example.com"}
+
+
+class SessionAuthClient:
+    """Auth client that, like the SDK's, falls back to the last set_session token."""
+    
+    def __init__(self):
+        self.session_token = None
+    
+    def set_session(self, access_token, refresh_token):
+        self.session_token = access_token
+    
+    def get_user(self, jwt=None):
+        time.sleep(0.01)  # Give another worker thread time to swap the session
+        return TokenUser(jwt or self.session_token)
+    
+    def update_user(self, attributes):
+        time.sleep(0.01)
+        return TokenUser(self.session_token)
 
 
 @pytest.mark.auth
 @pytest.mark.asyncio
-async def test_sign_out(mock_supabase_client):
-    """Test user sign out."""
-    from app.services.auth_service import auth_service
+async def test_concurrent_requests_keep_their_own_user(monkeypatch):
+    """Test that concurrent get_user/update_user calls never see another request's token."""
+    client = MockSupabaseClient()
+    client.auth = SessionAuthClient()
+    monkeypatch.setattr("app.services.auth_service.get_supabase", lambda: client)
+    tokens = [f"token-{i}" for i in range(8)]
+    
+    users = await asyncio.gather(*(auth_service.get_user(token) for token in tokens))
+    assert [user["id"] for user in users] == tokens
     
-    with patch('app.core.supabase_client.get_supabase', return_value=mock_supabase_client):
-        result = await auth_service.sign_out("test-access-token")
-        
-        # Auth service should return success dict
-        assert result is not None
-        assert isinstance(result, dict)
-        assert result.get("success", False) is True
+    updates = await asyncio.gather(
+        *(auth_service.update_user(token, metadata={"theme": "dark"}) for token in tokens)
+    )
+    assert [result["user"]["id"] for result in updates] == tokens
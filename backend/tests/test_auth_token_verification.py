@@ -0,0 +1,196 @@
+"""Tests for local verification of Supabase access tokens."""
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+import app.services.auth_service as auth_module
+from app.core.config import settings
+from app.services.auth_service import auth_service
+
+JWT_SECRET = "test-jwt-secret-at-least-32-bytes-long"
+
+USER_FIELDS = {"id", "email", "phone", "role", "aud", "app_metadata", "user_metadata"}
+
+RSA_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+EC_KEY = ec.generate_private_key(ec.SECP256R1())
+
+
+def make_claims(**overrides):
+    """Claims of a Supabase access token for an authenticated user."""
+    now = int(time.time())
+    claims = {
+        "sub": "local-user-id",
+        "email": "local@example.com",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "iat": now,
+        "exp": now + 3600,
+    }
+    claims.update(overrides)
+    return {key: value for key, value in claims.items() if value is not None}
+
+
+def public_jwk(private_key, kid, algorithm):
+    """JWKS entry for the public half of `private_key`."""
+    algorithm_class = jwt.get_algorithm_by_name(algorithm)
+    jwk = algorithm_class.to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update({"kid": kid, "alg": algorithm, "use": "sig"})
+    return jwk
+
+
+class JWKSServer:
+    """httpx.MockTransport handler serving a JWKS document and counting fetches."""
+    
+    def __init__(self, *jwks):
+        self.keys = list(jwks)
+        self.fetches = 0
+    
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.fetches += 1
+        assert request.url.path == "/auth/v1/.well-known/jwks.json"
+        return httpx.Response(200, json={"keys": self.keys})
+
+
+@pytest.fixture(autouse=True)
+def auth_state(monkeypatch):
+    """Fresh key and user caches, with the JWT secret configured."""
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", JWT_SECRET)
+    monkeypatch.setattr(auth_module, "_jwks", {})
+    monkeypatch.setattr(auth_module, "_jwks_fetched_at", 0.0)
+    auth_module._user_cache.clear()
+    yield
+    auth_module._user_cache.clear()
+
+
+@pytest.fixture
+def jwks_server(monkeypatch):
+    """JWKS endpoint answering the auth service's key fetches."""
+    server = JWKSServer(
+        public_jwk(RSA_KEY, "rsa-key", "RS256"),
+        public_jwk(EC_KEY, "ec-key", "ES256"),
+    )
+    async_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        auth_module.httpx,
+        "AsyncClient",
+        lambda **kwargs: async_client(transport=httpx.MockTransport(server), **kwargs),
+    )
+    return server
+
+
+@pytest.fixture
+def supabase_calls(mock_supabase_client, monkeypatch):
+    """Record the tokens get_user sends to Supabase."""
+    calls = []
+    get_user = mock_supabase_client.auth.get_user
+    
+    def recording_get_user(jwt=None):
+        calls.append(jwt)
+        return get_user(jwt)
+    
+    monkeypatch.setattr(mock_supabase_client.auth, "get_user", recording_get_user)
+    return calls
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_hs256_token_verified_with_secret(supabase_calls):
+    """Test that a token signed with the JWT secret is verified without Supabase."""
+    token = jwt.encode(make_claims(), JWT_SECRET, algorithm="HS256")
+    
+    user = await auth_service.get_user(token)
+    
+    assert user["id"] == "local-user-id"
+    assert user["email"] == "local@example.com"
+    assert set(user) == USER_FIELDS
+    assert supabase_calls == []
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+@pytest.mark.parametrize("private_key,kid,algorithm", [
+    (RSA_KEY, "rsa-key", "RS256"),
+    (EC_KEY, "ec-key", "ES256"),
+], ids=["RS256", "ES256"])
+async def test_asymmetric_token_verified_with_jwks_key(jwks_server, supabase_calls, private_key, kid, algorithm):
+    """Test that tokens signed with a JWKS key are verified by key ID."""
+    token = jwt.encode(make_claims(), private_key, algorithm=algorithm, headers={"kid": kid})
+    
+    user = await auth_service.get_user(token)
+    
+    assert user["id"] == "local-user-id"
+    assert jwks_server.fetches == 1
+    assert supabase_calls == []
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_unknown_kid_refreshes_jwks_once_per_cooldown(jwks_server, supabase_calls):
+    """Test that an unknown key ID refetches the JWKS, then waits out the cooldown."""
+    rotated_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    auth_module._jwks["rsa-key"] = jwt.PyJWK(public_jwk(RSA_KEY, "rsa-key", "RS256"))
+    auth_module._jwks_fetched_at = time.time()
+    jwks_server.keys.append(public_jwk(rotated_key, "rotated-key", "RS256"))
+    token = jwt.encode(make_claims(), rotated_key, algorithm="RS256", headers={"kid": "rotated-key"})
+    
+    # Within the cooldown the new key isn't fetched and Supabase decides
+    user = await auth_service.get_user(token)
+    assert jwks_server.fetches == 0
+    assert supabase_calls == [token]
+    assert user["id"] == "test-user-id-123"
+    
+    auth_module._user_cache.clear()
+    auth_module._jwks_fetched_at -= auth_module.JWKS_REFRESH_COOLDOWN_SECONDS
+    
+    user = await auth_service.get_user(token)
+    assert jwks_server.fetches == 1
+    assert user["id"] == "local-user-id"
+    
+    # A key ID the refreshed JWKS doesn't have either is not refetched again
+    unknown = jwt.encode(make_claims(), rotated_key, algorithm="RS256", headers={"kid": "unknown-key"})
+    await auth_service.get_user(unknown)
+    assert jwks_server.fetches == 1
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_expired_token_rejected_without_supabase(supabase_calls):
+    """Test that a validly signed but expired token is rejected locally."""
+    token = jwt.encode(make_claims(exp=int(time.time()) - 60), JWT_SECRET, algorithm="HS256")
+    
+    assert await auth_service.get_user(token) is None
+    assert supabase_calls == []
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+@pytest.mark.parametrize("claims", [
+    make_claims(aud="anon"),
+    make_claims(exp=None),
+    make_claims(sub=None),
+], ids=["wrong_audience", "missing_exp", "missing_sub"])
+async def test_unverifiable_claims_fall_back_to_supabase(supabase_calls, claims):
+    """Test that tokens with the wrong audience or missing claims are left to Supabase."""
+    token = jwt.encode(claims, JWT_SECRET, algorithm="HS256")
+    
+    user = await auth_service.get_user(token)
+    
+    assert supabase_calls == [token]
+    assert user["id"] == "test-user-id-123"
+
+
+@pytest.mark.auth
+@pytest.mark.asyncio
+async def test_fallback_to_supabase_uses_same_fields(monkeypatch, supabase_calls):
+    """Test that users fetched from Supabase have the same fields as locally verified ones."""
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", "")
+    token = jwt.encode(make_claims(), JWT_SECRET, algorithm="HS256")
+    
+    user = await auth_service.get_user(token)
+    
+    assert supabase_calls == [token]
+    assert user["id"] == "test-user-id-123"
+    assert set(user) == USER_FIELDS
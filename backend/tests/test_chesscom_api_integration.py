@@ -1,183 +1,239 @@
 """Integration tests for Chess.com API client."""
+import asyncio
+from datetime import datetime, timezone
+
 import pytest
-from unittest.mock import AsyncMock, patch, MagicMock
 import httpx
+import orjson
 
+import app.services.chesscom_api as chesscom_module
 from app.services.chesscom_api import ChessComAPI, ChessComAPIError
 
 
+class ChessComRouter:
+    """
+    httpx.MockTransport handler serving canned responses keyed on URL path.
+    
+    Requests to paths without a registered response get a 404.
+    """
+    
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+    
+    def respond(self, path: str, status_code: int = 200, **kwargs):
+        """Answer requests to `path` with a new httpx.Response(status_code, **kwargs)."""
+        self.routes[path] = (status_code, kwargs)
+    
+    def respond_in_turn(self, path: str, *responses):
+        """Answer successive requests to `path` with each (status_code, kwargs); the last repeats."""
+        self.routes[path] = list(responses)
+    
+    def fail(self, path: str, error: Exception):
+        """Raise `error` for requests to `path`."""
+        self.routes[path] = error
+    
+    def reset(self):
+        self.routes.clear()
+        self.requests.clear()
+    
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        route = self.routes.get(request.url.path)
+        if route is None:
+            return httpx.Response(404, json={"code": 0, "message": "Not found"})
+        if isinstance(route, Exception):
+            raise route
+        if isinstance(route, list):
+            route = route.pop(0) if len(route) > 1 else route[0]
+        status_code, kwargs = route
+        return httpx.Response(status_code, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def chesscom_router() -> ChessComRouter:
+    return ChessComRouter()
+
+
+@pytest.fixture(scope="module")
+async def chesscom_api(chesscom_router) -> ChessComAPI:
+    """One API client for the module, answering from chesscom_router instead of the network."""
+    api = ChessComAPI(transport=httpx.MockTransport(chesscom_router))
+    # No real API to protect; the shared client shouldn't carry waits over between tests
+    api.rate_limit_delay = 0.0
+    yield api
+    await api.close()
+
+
+@pytest.fixture(autouse=True)
+def reset_chesscom(chesscom_router):
+    """Clear canned responses and recorded requests before each test."""
+    chesscom_router.reset()
+
+
 @pytest.mark.asyncio
-async def test_get_player_profile_lowercase():
-    """Test fetching player profile with lowercase username."""
-    api = ChessComAPI()
-    
-    # Mock the response
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
-        "username": "testuser",
-        "name": "Test User",
-        "status": "premium"
-    }
-    mock_response.headers = {"content-type": "application/json"}
-    mock_response.history = []
-    
-    with patch.object(api.client, 'get', return_value=mock_response) as mock_get:
-        result = await api.get_player_profile("testuser")
+@pytest.mark.parametrize("username,status_code,body,expected_error", [
+    ("testuser", 200, {"username": "testuser", "name": "Test User", "status": "premium"}, None),
+    # Mixed case is sent lowercase (Chess.com would otherwise redirect to it)
+    ("TestUser", 200, {"username": "testuser", "name": "Test User"}, None),
+    ("nonexistent", 404, {"code": 0, "message": "User \"nonexistent\" not found."}, "not found"),
+    ("testuser", 429, {"code": 0, "message": "Rate limit exceeded"}, "rate limit"),
+    # Deleted/banned account
+    ("deleteduser", 410, {"code": 0, "message": "Account has been closed"}, "permanently unavailable"),
+], ids=["lowercase", "mixed_case", "not_found", "rate_limit", "deleted_account"])
+async def test_get_player_profile(chesscom_api, chesscom_router, username, status_code, body, expected_error):
+    """Test fetching a player profile and mapping error statuses to ChessComAPIError."""
+    path = f"/pub/player/{username.lower()}"
+    # Retry-After: 0 keeps the client's 429 retries from sleeping
+    chesscom_router.respond(path, status_code, headers={"Retry-After": "0"}, json=body)
+    
+    if expected_error is None:
+        result = await chesscom_api.get_player_profile(username)
         
         assert result["username"] == "testuser"
         assert "name" in result
-        mock_get.assert_called_once()
+        assert len(chesscom_router.requests) == 1
+    else:
+        with pytest.raises(ChessComAPIError) as exc_info:
+            await chesscom_api.get_player_profile(username)
+        
+        assert expected_error in str(exc_info.value).lower()
+    
+    assert chesscom_router.requests[0].url.path == path
+    if status_code == 429:
+        assert len(chesscom_router.requests) == ChessComAPI.MAX_RETRIES
 
 
 @pytest.mark.asyncio
-async def test_get_player_profile_mixed_case():
-    """Test that mixed case usernames are handled via lowercase conversion."""
-    api = ChessComAPI()
-    
-    # Mock the response (API returns lowercase)
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
-        "username": "testuser",
-        "name": "Test User"
-    }
-    mock_response.headers = {"content-type": "application/json"}
-    # Simulate redirect history
-    redirect_response = MagicMock()
-    redirect_response.url = "https://api.chess.com/pub/player/TestUser"
-    mock_response.history = [redirect_response]
-    mock_response.url = "https://api.chess.com/pub/player/testuser"
-    
-    with patch.object(api.client, 'get', return_value=mock_response):
-        result = await api.get_player_profile("TestUser")
-        
-        # Should still work because we convert to lowercase
-        assert result["username"] == "testuser"
+async def test_client_follows_redirects(chesscom_api):
+    """Test that the HTTP client is configured to follow redirects."""
+    # Check client configuration
+    assert chesscom_api.client.follow_redirects is True
+    
+    # Check User-Agent header
+    user_agent = ChessComAPI.DEFAULT_HEADERS["User-Agent"]
+    assert "contact:" in user_agent
+    assert chesscom_api.client.headers["User-Agent"] == user_agent
 
 
 @pytest.mark.asyncio
-async def test_get_player_profile_not_found():
-    """Test handling of non-existent user."""
-    api = ChessComAPI()
-    
-    # Mock 404 response
-    mock_response = MagicMock()
-    mock_response.status_code = 404
-    mock_response.json.return_value = {
-        "code": 0,
-        "message": "User \"nonexistent\" not found."
-    }
-    mock_response.text = "Not found"
-    
-    mock_error = httpx.HTTPStatusError(
-        "Not found",
-        request=MagicMock(),
-        response=mock_response
-    )
+async def test_get_player_stats(chesscom_api, chesscom_router):
+    """Test fetching player statistics."""
+    chesscom_router.respond("/pub/player/testuser/stats", json={
+        "chess_rapid": {"last": {"rating": 1500}},
+        "chess_blitz": {"last": {"rating": 1450}}
+    })
     
-    with patch.object(api.client, 'get', side_effect=mock_error):
-        with pytest.raises(ChessComAPIError) as exc_info:
-            await api.get_player_profile("nonexistent")
-        
-        assert "not found" in str(exc_info.value).lower()
+    result = await chesscom_api.get_player_stats("testuser")
+    
+    assert "chess_rapid" in result
+    assert "chess_blitz" in result
 
 
 @pytest.mark.asyncio
-async def test_get_player_profile_rate_limit():
-    """Test handling of rate limit (429 response)."""
-    api = ChessComAPI()
-    
-    # Mock 429 response
-    mock_response = MagicMock()
-    mock_response.status_code = 429
-    mock_response.json.return_value = {
-        "code": 0,
-        "message": "Rate limit exceeded"
-    }
-    mock_response.text = "Too many requests"
-    
-    mock_error = httpx.HTTPStatusError(
-        "Too many requests",
-        request=MagicMock(),
-        response=mock_response
-    )
+async def test_network_error_handling(chesscom_api, chesscom_router):
+    """Test handling of network errors."""
+    chesscom_router.fail("/pub/player/testuser", httpx.ConnectError("Connection failed"))
     
-    with patch.object(api.client, 'get', side_effect=mock_error):
-        with pytest.raises(ChessComAPIError) as exc_info:
-            await api.get_player_profile("testuser")
-        
-        assert "rate limit" in str(exc_info.value).lower()
+    with pytest.raises(ChessComAPIError) as exc_info:
+        await chesscom_api.get_player_profile("testuser")
+    
+    assert "network error" in str(exc_info.value).lower()
+
+
+class FakeRedis:
+    """Async Redis stand-in for the archive cache, recording each key's expiry."""
+    
+    def __init__(self):
+        self.values = {}
+        self.expiry = {}
+    
+    async def get(self, key):
+        return self.values.get(key)
+    
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+        self.expiry[key] = ex
+
+
+ARCHIVE_GAME = {
+    "url": "https://www.chess.com/game/live/1",
+    "pgn": "1. e4 e5 *",
+    "time_class": "blitz",
+    "rated": True,
+    "end_time": 1700000000,
+    "tcn": "mC0K",
+    "accuracies": {"white": 90.1, "black": 85.3},
+}
 
 
 @pytest.mark.asyncio
-async def test_get_player_profile_deleted_account():
-    """Test handling of deleted/banned account (410 response)."""
-    api = ChessComAPI()
-    
-    # Mock 410 response
-    mock_response = MagicMock()
-    mock_response.status_code = 410
-    mock_response.json.return_value = {
-        "code": 0,
-        "message": "Account has been closed"
-    }
-    mock_response.text = "Gone"
-    
-    mock_error = httpx.HTTPStatusError(
-        "Gone",
-        request=MagicMock(),
-        response=mock_response
+async def test_concurrent_identical_requests_share_one_call(chesscom_api, chesscom_router):
+    """Test that identical requests in flight together reach Chess.com once."""
+    chesscom_router.respond("/pub/player/shared", json={"username": "shared"})
+    
+    first, second = await asyncio.gather(
+        chesscom_api.get_player_profile("shared"),
+        chesscom_api.get_player_profile("Shared"),
     )
     
-    with patch.object(api.client, 'get', side_effect=mock_error):
-        with pytest.raises(ChessComAPIError) as exc_info:
-            await api.get_player_profile("deleteduser")
-        
-        assert "permanently unavailable" in str(exc_info.value).lower()
+    assert first == second == {"username": "shared"}
+    assert len(chesscom_router.requests) == 1
 
 
 @pytest.mark.asyncio
-async def test_client_follows_redirects():
-    """Test that the HTTP client is configured to follow redirects."""
-    api = ChessComAPI()
+async def test_not_modified_archive_reuses_cached_games(chesscom_api, chesscom_router):
+    """Test that a 304 for a revalidated archive returns the games cached with its ETag."""
+    now = datetime.now(timezone.utc)
+    path = f"/pub/player/etaguser/games/{now.year:04d}/{now.month:02d}"
+    chesscom_router.respond(path, headers={"ETag": '"v1"'}, json={"games": [ARCHIVE_GAME]})
     
-    # Check client configuration
-    assert api.client.follow_redirects is True
+    games = await chesscom_api._get_month_games("etaguser", now.year, now.month)
     
-    # Check User-Agent header
-    assert "User-Agent" in api.client.headers
-    assert "contact:" in api.client.headers["User-Agent"]
+    chesscom_router.respond(path, 304)
+    cached = await chesscom_api._get_month_games("etaguser", now.year, now.month)
+    
+    assert cached == games
+    assert cached[0]["url"] == ARCHIVE_GAME["url"]
+    assert "If-None-Match" not in chesscom_router.requests[0].headers
+    assert chesscom_router.requests[1].headers["If-None-Match"] == '"v1"'
 
 
 @pytest.mark.asyncio
-async def test_get_player_stats():
-    """Test fetching player statistics."""
-    api = ChessComAPI()
+async def test_server_error_retried_after_retry_after(chesscom_api, chesscom_router, monkeypatch):
+    """Test that a 5xx response is retried after the delay in its Retry-After header."""
+    delays = []
+    
+    async def record_sleep(delay):
+        delays.append(delay)
+    
+    monkeypatch.setattr(chesscom_module.asyncio, "sleep", record_sleep)
+    chesscom_router.respond_in_turn(
+        "/pub/player/retryuser",
+        (503, {"headers": {"Retry-After": "7"}, "json": {"message": "Maintenance"}}),
+        (200, {"json": {"username": "retryuser"}}),
+    )
     
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.json.return_value = {
-        "chess_rapid": {"last": {"rating": 1500}},
-        "chess_blitz": {"last": {"rating": 1450}}
-    }
-    mock_response.headers = {"content-type": "application/json"}
-    mock_response.history = []
+    result = await chesscom_api.get_player_profile("retryuser")
     
-    with patch.object(api.client, 'get', return_value=mock_response):
-        result = await api.get_player_stats("testuser")
-        
-        assert "chess_rapid" in result
-        assert "chess_blitz" in result
+    assert result == {"username": "retryuser"}
+    assert len(chesscom_router.requests) == 2
+    assert delays == [7.0]
 
 
 @pytest.mark.asyncio
-async def test_network_error_handling():
-    """Test handling of network errors."""
-    api = ChessComAPI()
-    
-    with patch.object(api.client, 'get', side_effect=httpx.ConnectError("Connection failed")):
-        with pytest.raises(ChessComAPIError) as exc_info:
-            await api.get_player_profile("testuser")
-        
-        assert "network error" in str(exc_info.value).lower()
+async def test_finished_month_served_from_redis(chesscom_api, chesscom_router, monkeypatch):
+    """Test that finished months are stored in Redis and then served without a request."""
+    redis = FakeRedis()
+    monkeypatch.setattr(chesscom_module, "async_redis_client", redis)
+    chesscom_router.respond("/pub/player/redisuser/games/2020/01", json={"games": [ARCHIVE_GAME]})
+    
+    games = await chesscom_api._get_month_games("RedisUser", 2020, 1)
+    cached = await chesscom_api._get_month_games("redisuser", 2020, 1)
+    
+    key = "chesscom:archive:redisuser:2020/01"
+    assert cached == games
+    assert "tcn" not in games[0] and "accuracies" not in games[0]
+    assert orjson.loads(redis.values[key]) == games
+    assert redis.expiry[key] == ChessComAPI.FINISHED_ARCHIVE_TTL_SECONDS
+    assert len(chesscom_router.requests) == 1
@@ -0,0 +1,84 @@
+"""Tests for post-fetch game filtering."""
+import random
+from datetime import datetime, timezone
+
+import pytest
+
+import app.services.filter_service as filter_module
+from app.services.filter_service import FilterService, GameColumnStore, GameFilter
+
+# Chess.com time classes plus ones without a GameColumnStore bit code
+TIME_CLASSES = ["bullet", "blitz", "rapid", "daily", "Blitz", "classical", "standard", ""]
+
+START_TS = 1_700_000_000
+DAY = 24 * 3600
+
+
+def make_games(count, seed=7):
+    """Random games, some with missing end times and non-standard time classes."""
+    rng = random.Random(seed)
+    games = []
+    for i in range(count):
+        game = {
+            "url": f"https://www.chess.com/game/live/{i}",
+            "time_class": rng.choice(TIME_CLASSES),
+            "rated": rng.random() < 0.7,
+        }
+        if rng.random() < 0.9:
+            game["end_time"] = START_TS + rng.randrange(60 * DAY)
+        games.append(game)
+    return games
+
+
+GAMES = make_games(1000)
+
+FILTERS = {
+    "time_classes": GameFilter(time_controls=["blitz", "rapid"]),
+    "mixed_case": GameFilter(time_controls=["Bullet", "DAILY"]),
+    "non_standard": GameFilter(time_controls=["classical"]),
+    "standard_and_non_standard": GameFilter(time_controls=["blitz", "standard"]),
+    "dates": GameFilter(
+        start_date=datetime.fromtimestamp(START_TS + 10 * DAY, tz=timezone.utc),
+        end_date=datetime.fromtimestamp(START_TS + 40 * DAY, tz=timezone.utc),
+    ),
+    "rated_blitz": GameFilter(time_controls=["blitz"], rated_only=True),
+    "unrated_with_count": GameFilter(time_controls=["rapid", "classical"], unrated_only=True, game_count=25),
+    "everything": GameFilter(
+        start_date=datetime.fromtimestamp(START_TS + 5 * DAY, tz=timezone.utc),
+        time_controls=["bullet", "blitz", "rapid", "daily"],
+        rated_only=True,
+        game_count=50,
+    ),
+}
+
+
+def filter_with_loop(monkeypatch, games, game_filter):
+    """Filter through the per-game loop regardless of list size."""
+    with monkeypatch.context() as patch:
+        patch.setattr(FilterService, "VECTORIZE_MIN_GAMES", len(games) + 1)
+        return FilterService.apply_filters(games, game_filter)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("game_filter", FILTERS.values(), ids=FILTERS.keys())
+@pytest.mark.parametrize("path", ["numpy", "kernel"])
+def test_vectorized_paths_match_loop(monkeypatch, game_filter, path):
+    """Test that the NumPy and compiled paths return the same games as the loop."""
+    if path == "kernel" and filter_module.filter_kernel is None:
+        pytest.skip("numba not installed")
+    expected = filter_with_loop(monkeypatch, GAMES, game_filter)
+    
+    monkeypatch.setattr(filter_module, "NUMBA_AVAILABLE", path == "kernel")
+    
+    assert FilterService.apply_filters(GAMES, game_filter) == expected
+    assert FilterService.apply_filters(GameColumnStore(GAMES), game_filter) == expected
+
+
+@pytest.mark.unit
+def test_non_standard_time_class_matches_by_name():
+    """Test that time classes without a bit code are matched like the loop matches them."""
+    games = FilterService.apply_filters(GAMES, GameFilter(time_controls=["Classical"]))
+    
+    assert games
+    assert all(game["time_class"] == "classical" for game in games)
+    assert len(games) == sum(game["time_class"] == "classical" for game in GAMES)
@@ -0,0 +1,132 @@
+"""Tests for Redis quota counters and client-side rate limiting."""
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import app.core.rate_limit as rate_limit
+from app.core.database import redis_client
+from app.core.rate_limit import AI_QUOTA_TTL_SECONDS, TokenBucket, consume_ai_quota, reset_ai_quota
+
+requires_redis = pytest.mark.skipif(redis_client is None, reason="Redis not available")
+
+
+@pytest.fixture
+def quota_user_id():
+    """User ID with no quota counter, unique to this test process."""
+    user_id = 10_000_000 + os.getpid()
+    reset_ai_quota(user_id)
+    yield user_id
+    reset_ai_quota(user_id)
+
+
+@requires_redis
+def test_consume_seeds_counter_from_database(quota_user_id):
+    """Test that the first use seeds the counter with the database usage."""
+    assert consume_ai_quota(quota_user_id, limit=5, used=3) == 1
+    assert redis_client.get(f"ai:{quota_user_id}") == "4"
+    
+    # Later calls use the counter, not the (stale) database value
+    assert consume_ai_quota(quota_user_id, limit=5, used=0) == 0
+
+
+@requires_redis
+def test_consume_stops_at_limit(quota_user_id):
+    """Test that an exhausted quota is refused without incrementing the counter."""
+    for expected in (1, 0):
+        assert consume_ai_quota(quota_user_id, limit=2, used=0) == expected
+    
+    assert consume_ai_quota(quota_user_id, limit=2, used=0) == -1
+    assert redis_client.get(f"ai:{quota_user_id}") == "2"
+
+
+@requires_redis
+def test_consume_sets_ttl(quota_user_id):
+    """Test that counters expire so they are re-seeded from the database."""
+    consume_ai_quota(quota_user_id, limit=5, used=0)
+    
+    assert 0 < redis_client.ttl(f"ai:{quota_user_id}") <= AI_QUOTA_TTL_SECONDS
+
+
+@requires_redis
+def test_reset_drops_counter(quota_user_id):
+    """Test that a reset counter is re-seeded on the next use."""
+    consume_ai_quota(quota_user_id, limit=5, used=4)
+    reset_ai_quota(quota_user_id)
+    
+    assert redis_client.exists(f"ai:{quota_user_id}") == 0
+    assert consume_ai_quota(quota_user_id, limit=5, used=1) == 3
+
+
+def test_consume_without_redis_returns_none(monkeypatch):
+    """Test that the database is left to decide when Redis is not configured."""
+    monkeypatch.setattr(rate_limit, "_consume_quota_script", None)
+    
+    assert consume_ai_quota(1, limit=5, used=0) is None
+
+
+def test_consume_returns_none_on_redis_error(monkeypatch):
+    """Test that Redis errors fall back to the database instead of failing the request."""
+    def failing_script(keys, args):
+        raise ConnectionError("Redis went away")
+    
+    monkeypatch.setattr(rate_limit, "_consume_quota_script", failing_script)
+    
+    assert consume_ai_quota(1, limit=5, used=0) is None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock for TokenBucket; sleeping advances it. Yields the sleeps."""
+    now = [100.0]
+    sleeps = []
+    
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+    
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+    return SimpleNamespace(now=now, sleeps=sleeps)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waits_once_capacity_is_used(clock):
+    """Test that a burst up to capacity goes straight through and the next call waits."""
+    bucket = TokenBucket(capacity=3, rate=2)
+    
+    for _ in range(3):
+        await bucket.take()
+    assert clock.sleeps == []
+    
+    await bucket.take()
+    assert clock.sleeps == [0.5]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills_at_rate(clock):
+    """Test that tokens come back at `rate` per second, up to capacity."""
+    bucket = TokenBucket(capacity=3, rate=2)
+    await bucket.take(3)
+    
+    clock.now[0] += 1.0
+    await bucket.take(2)
+    assert clock.sleeps == []
+    
+    # Idle time beyond a full bucket doesn't bank extra tokens
+    clock.now[0] += 100.0
+    await bucket.take(3)
+    await bucket.take()
+    assert clock.sleeps == [0.5]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_rejects_more_than_capacity(clock):
+    """Test that asking for more tokens than the bucket holds fails instead of waiting forever."""
+    bucket = TokenBucket(capacity=3, rate=2)
+    
+    with pytest.raises(ValueError):
+        await bucket.take(4)
+    
+    await bucket.take(3)
+    assert clock.sleeps == []
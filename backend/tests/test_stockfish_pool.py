@@ -0,0 +1,164 @@
+"""Tests for the shared Stockfish engine pool (with fake engines, no Stockfish binary)."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import app.services.stockfish_pool as stockfish_pool
+from app.services.stockfish_pool import StockfishPool, close_stockfish_pools
+
+
+class FakeEngine:
+    """Stand-in for chess.engine.UciProtocol that counts quit() calls."""
+    
+    def __init__(self, number: int):
+        self.number = number
+        self.quits = 0
+    
+    async def quit(self):
+        self.quits += 1
+
+
+class FakeEngineFactory:
+    """Replacement for StockfishPool._start_engine recording every engine it starts."""
+    
+    def __init__(self):
+        self.engines = []
+    
+    async def __call__(self) -> FakeEngine:
+        engine = FakeEngine(len(self.engines))
+        self.engines.append(engine)
+        return engine
+
+
+@pytest.fixture
+def factory() -> FakeEngineFactory:
+    return FakeEngineFactory()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic() for the pool module."""
+    now = [1000.0]
+    monkeypatch.setattr(stockfish_pool, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def make_pool(factory, **kwargs) -> StockfishPool:
+    pool = StockfishPool("/nonexistent/stockfish", **kwargs)
+    pool._start_engine = factory
+    return pool
+
+
+async def use_engines(pool, count):
+    """Hold `count` engines at once, then release them all."""
+    release = asyncio.Event()
+    
+    async def borrow():
+        async with pool.acquire():
+            await release.wait()
+    
+    tasks = [asyncio.create_task(borrow()) for _ in range(count)]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.asyncio
+async def test_engines_are_reused(factory):
+    """Test that released engines are handed out again instead of starting new ones."""
+    pool = make_pool(factory, min_size=1, max_size=2)
+    
+    async with pool.acquire() as first:
+        pass
+    async with pool.acquire() as second:
+        pass
+    
+    assert second is first
+    assert len(factory.engines) == 1
+    assert first.quits == 0
+
+
+@pytest.mark.asyncio
+async def test_start_prewarms_min_size(factory):
+    """Test that start() launches min_size engines that acquire() then uses."""
+    pool = make_pool(factory, min_size=2, max_size=4)
+    
+    await pool.start()
+    await pool.start()
+    assert len(factory.engines) == 2
+    
+    await use_engines(pool, 2)
+    assert len(factory.engines) == 2
+
+
+@pytest.mark.asyncio
+async def test_concurrent_use_bounded_by_max_size(factory):
+    """Test that no more than max_size engines run at once."""
+    pool = make_pool(factory, min_size=1, max_size=2)
+    active = 0
+    peak = 0
+    
+    async def borrow():
+        nonlocal active, peak
+        async with pool.acquire():
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+    
+    await asyncio.gather(*(borrow() for _ in range(6)))
+    
+    assert peak == 2
+    assert len(factory.engines) == 2
+
+
+@pytest.mark.asyncio
+async def test_surplus_idle_engines_pruned_after_timeout(factory, clock):
+    """Test that engines idle past idle_timeout are quit, keeping min_size alive."""
+    pool = make_pool(factory, min_size=1, max_size=3, idle_timeout=300)
+    await use_engines(pool, 3)
+    assert len(factory.engines) == 3
+    
+    clock[0] += 299
+    async with pool.acquire():
+        pass
+    assert [engine.quits for engine in factory.engines] == [0, 0, 0]
+    
+    clock[0] += 2
+    async with pool.acquire() as engine:
+        pass
+    
+    assert engine.quits == 0
+    assert sorted(e.quits for e in factory.engines) == [0, 1, 1]
+    assert len(pool._idle) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_engine_is_discarded(factory):
+    """Test that an engine that raised while borrowed is quit and never reused."""
+    pool = make_pool(factory, min_size=1, max_size=2)
+    
+    with pytest.raises(RuntimeError):
+        async with pool.acquire() as broken:
+            raise RuntimeError("engine crashed")
+    
+    async with pool.acquire() as engine:
+        pass
+    
+    assert broken.quits == 1
+    assert engine is not broken
+
+
+@pytest.mark.asyncio
+async def test_close_stockfish_pools_quits_each_engine_once(factory, monkeypatch):
+    """Test that shutdown quits every idle engine exactly once, even if repeated."""
+    pool = make_pool(factory, min_size=2, max_size=3)
+    monkeypatch.setattr(stockfish_pool, "_pools", {pool.stockfish_path: pool})
+    await use_engines(pool, 3)
+    
+    await close_stockfish_pools()
+    await close_stockfish_pools()
+    
+    assert [engine.quits for engine in factory.engines] == [1, 1, 1]
+    assert pool._idle == []
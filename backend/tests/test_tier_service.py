@@ -0,0 +1,99 @@
+"""Tests for AI quota accounting in the tier service."""
+import pytest
+
+import app.services.tier_service as tier_module
+from app.models import User
+from app.services.tier_service import TierService
+
+
+class FakeSession:
+    """Session stub counting commits and rollbacks; commit() can be made to fail."""
+    
+    def __init__(self, fail_commit: bool = False):
+        self.fail_commit = fail_commit
+        self.commits = 0
+        self.rollbacks = 0
+    
+    def commit(self):
+        if self.fail_commit:
+            raise RuntimeError("commit failed")
+        self.commits += 1
+    
+    def rollback(self):
+        self.rollbacks += 1
+    
+    def flush(self):
+        pass
+
+
+def make_user(user_id: int) -> User:
+    return User(
+        id=user_id,
+        chesscom_username=f"player{user_id}",
+        tier="free",
+        ai_analyses_used=0,
+        ai_analyses_limit=TierService.FREE_AI_ANALYSIS_LIMIT,
+    )
+
+
+@pytest.fixture
+def released_quota(monkeypatch):
+    """User IDs whose Redis quota counter was reset; consuming always succeeds."""
+    released = []
+    monkeypatch.setattr(tier_module, "consume_ai_quota", lambda user_id, limit, used: limit - used - 1)
+    monkeypatch.setattr(tier_module, "reset_ai_quota", released.append)
+    return released
+
+
+def test_failed_commit_releases_quota(released_quota):
+    """Test that a failed commit resets the Redis counter it had already incremented."""
+    service = TierService(FakeSession(fail_commit=True))
+    
+    with pytest.raises(RuntimeError):
+        service.increment_ai_usage(make_user(1))
+    
+    assert released_quota == [1]
+
+
+def test_rolled_back_batch_releases_quota(released_quota):
+    """Test that rolling back a batch resets the counters of every user in it."""
+    db = FakeSession()
+    service = TierService(db)
+    
+    with pytest.raises(ValueError):
+        with service.batch():
+            service.increment_ai_usage(make_user(1))
+            service.increment_ai_usage(make_user(2))
+            raise ValueError("abort batch")
+    
+    assert db.rollbacks == 1
+    assert sorted(released_quota) == [1, 2]
+
+
+def test_committed_usage_keeps_quota(released_quota):
+    """Test that committed usage is never released by a later rollback."""
+    db = FakeSession()
+    service = TierService(db)
+    
+    with service.batch():
+        service.increment_ai_usage(make_user(1))
+    with pytest.raises(ValueError):
+        with service.batch():
+            service.increment_ai_usage(make_user(2))
+            raise ValueError("abort batch")
+    
+    assert db.commits == 1
+    assert released_quota == [2]
+
+
+def test_rollback_without_redis_releases_nothing(released_quota, monkeypatch):
+    """Test that nothing is reset when Redis is unavailable and the database decides."""
+    monkeypatch.setattr(tier_module, "consume_ai_quota", lambda user_id, limit, used: None)
+    service = TierService(FakeSession())
+    
+    with pytest.raises(ValueError):
+        with service.batch():
+            assert service.increment_ai_usage(make_user(1)) is True
+            raise ValueError("abort batch")
+    
+    assert released_quota == []
@@ -1,19 +1,58 @@
 """Test user creation with automatic game fetching."""
 import pytest
-from unittest.mock import patch, AsyncMock, MagicMock
+from unittest.mock import patch, AsyncMock
 from app.api.users import create_user, UserCreate
 from app.models import User, Game
 
 
+class FakeQuery:
+    """Query stub returning a fixed first() / count() result; filter/order_by chain."""
+    __slots__ = ("_first", "_count")
+    
+    def __init__(self, first=None, count: int = 0):
+        self._first = first
+        self._count = count
+    
+    def filter(self, *args, **kwargs):
+        return self
+    
+    def order_by(self, *args, **kwargs):
+        return self
+    
+    def first(self):
+        return self._first
+    
+    def count(self) -> int:
+        return self._count
+
+
+class FakeSession:
+    """Session stub handing out the given queries in order and recording writes."""
+    
+    def __init__(self, *queries: FakeQuery):
+        self._queries = iter(queries)
+        self.added = []
+        self.committed = False
+    
+    def query(self, *entities) -> FakeQuery:
+        return next(self._queries)
+    
+    def add(self, instance):
+        self.added.append(instance)
+    
+    def commit(self):
+        self.committed = True
+    
+    def refresh(self, instance):
+        pass
+
+
 @pytest.mark.asyncio
 async def test_create_user_triggers_background_task():
     """Test that creating a user triggers background game fetching."""
     from fastapi import BackgroundTasks
-    from sqlalchemy.orm import Session
     
-    # Mock database session
-    mock_db = MagicMock(spec=Session)
-    mock_db.query.return_value.filter.return_value.first.return_value = None  # No existing user
+    db = FakeSession(FakeQuery(first=None))  # No existing user
     
     # Mock Chess.com API responses
     mock_profile = {
@@ -26,8 +65,8 @@ async def test_create_user_triggers_background_task():
         "chess_rapid": {"last": {"rating": 1500}}
     }
     
-    # Mock background tasks
-    mock_bg_tasks = MagicMock(spec=BackgroundTasks)
+    # Real task list (tasks are only queued, never run, without a response)
+    background_tasks = BackgroundTasks()
     
     # Create user data
     user_data = UserCreate(
@@ -41,44 +80,29 @@ async def test_create_user_triggers_background_task():
         mock_api.get_player_stats = AsyncMock(return_value=mock_stats)
         
         # Call create_user
-        result = await create_user(user_data, mock_bg_tasks, mock_db)
+        result = await create_user(user_data, background_tasks, db)
         
         # Verify background task was added
-        assert mock_bg_tasks.add_task.called
+        assert len(background_tasks.tasks) == 1
         
         # Verify the task function is correct
-        call_args = mock_bg_tasks.add_task.call_args
-        assert call_args[0][0].__name__ == 'fetch_initial_games_background'
+        assert background_tasks.tasks[0].func.__name__ == 'fetch_initial_games_background'
         
         # Verify user was committed
-        assert mock_db.commit.called
+        assert db.committed
+        assert db.added == [result]
 
 
 @pytest.mark.asyncio
 async def test_get_recommendations_returns_empty_for_new_user():
     """Test that recommendations endpoint returns empty array instead of 404."""
     from app.api.insights import get_recommendations
-    from sqlalchemy.orm import Session
-    
-    # Mock database session
-    mock_db = MagicMock(spec=Session)
-    
-    # Mock user exists
-    mock_user = MagicMock(spec=User)
-    mock_user.id = 1
     
-    # Create a mock query chain that returns user, then None for insights
-    mock_user_query = MagicMock()
-    mock_user_query.filter.return_value.first.return_value = mock_user
-    
-    mock_insight_query = MagicMock()
-    mock_insight_query.filter.return_value.order_by.return_value.first.return_value = None
-    
-    # Set up query to return different chains
-    mock_db.query.side_effect = [mock_user_query, mock_insight_query]
+    # User exists, but has no insights yet
+    db = FakeSession(FakeQuery(first=User(id=1)), FakeQuery(first=None))
     
     # Call get_recommendations
-    result = await get_recommendations(1, mock_db)
+    result = await get_recommendations(1, db)
     
     # Should return empty recommendations, not raise 404
     assert result["recommendations"] == []
@@ -91,24 +115,15 @@ async def test_get_recommendations_returns_empty_for_new_user():
 async def test_user_response_includes_game_count():
     """Test that user response includes total_games field."""
     from app.api.users import get_user
-    from sqlalchemy.orm import Session
-    
-    # Mock database session
-    mock_db = MagicMock(spec=Session)
     
-    # Mock user
-    mock_user = MagicMock(spec=User)
-    mock_user.id = 1
-    mock_user.chesscom_username = "testuser"
-    
-    # Mock game count query
-    mock_db.query.return_value.filter.side_effect = [
-        MagicMock(first=MagicMock(return_value=mock_user)),  # User query
-        MagicMock(count=MagicMock(return_value=5))           # Game count query
-    ]
+    user = User(id=1, chesscom_username="testuser")
+    db = FakeSession(
+        FakeQuery(first=user),  # User query
+        FakeQuery(count=5)      # Game count query
+    )
     
     # Call get_user
-    result = await get_user(1, mock_db)
+    result = await get_user(1, db)
     
     # Verify game count was added
     assert hasattr(result, 'total_games')
@@ -4,14 +4,129 @@ Chess Insight AI Deployment Readiness Test
 Tests all configurations before deploying to Render
 """
 
+import io
 import os
+import re
 import sys
 import json
-from pathlib import Path
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+    # libyaml's C loader when PyYAML was built with it
+    YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+except ImportError:
+    YAML_AVAILABLE = False
+
+def _token_pattern(tokens):
+    """One alternation over all tokens, so a file is scanned once for the whole list."""
+    return re.compile("|".join(map(re.escape, sorted(tokens, key=len, reverse=True))))
+
+def _missing_tokens(content, tokens, pattern):
+    """Tokens not found in content, in list order."""
+    found = set(pattern.findall(content))
+    # A token can only hide inside an overlapping match of another; confirm directly
+    return [token for token in tokens if token not in found and token not in content]
+
+REQUIRED_RENDER_SECTIONS = [
+    "services:",
+    "type: web",
+    "type: pserv", 
+    "type: redis",
+    "buildCommand:",
+    "startCommand:",
+    "envVars:"
+]
+RENDER_SECTIONS_PATTERN = _token_pattern(REQUIRED_RENDER_SECTIONS)
+
+def _missing_render_sections(content):
+    """
+    REQUIRED_RENDER_SECTIONS not present in the parsed render.yaml.
+    
+    Keys in comments don't count, and each section must appear where Render
+    reads it: service types and command/env keys on entries under services.
+    """
+    data = yaml.load(content, Loader=YAML_LOADER)
+    services = data.get("services") if isinstance(data, dict) else None
+    if not isinstance(services, list):
+        return list(REQUIRED_RENDER_SECTIONS)
+    
+    services = [service for service in services if isinstance(service, dict)]
+    present = {"services:"}
+    present.update(f"type: {service.get('type')}" for service in services)
+    present.update(f"{key}:" for service in services for key in service)
+    return [section for section in REQUIRED_RENDER_SECTIONS if section not in present]
+
+ESSENTIAL_PACKAGES = [
+    "fastapi",
+    "uvicorn",
+    "sqlalchemy", 
+    "alembic",
+    "psycopg2-binary",
+    "redis",
+    "python-chess",
+    "stockfish",
+    "httpx",
+    "pydantic",
+    "loguru"
+]
+
+REQUIRED_ENV_VARS = [
+    "POSTGRES_SERVER",
+    "POSTGRES_USER", 
+    "POSTGRES_PASSWORD",
+    "POSTGRES_DB",
+    "REDIS_HOST",
+    "SECRET_KEY"
+]
+ENV_VARS_PATTERN = _token_pattern(REQUIRED_ENV_VARS)
+
+# Markers main.py must contain: health endpoints (both paths) and the CORS middleware
+MAIN_PY_MARKERS = ["/health", "/api/v1/health", "CORSMiddleware"]
+MAIN_PY_MARKERS_PATTERN = _token_pattern(MAIN_PY_MARKERS)
+
+# Project name at the start of a requirement line, before any extras, version or marker
+REQUIREMENT_NAME = re.compile(r"^\s*([A-Za-z0-9][A-Za-z0-9._-]*)", re.MULTILINE)
+
+def _requirement_names(requirements):
+    """Lowercased package names listed in a requirements file (comment lines excluded)."""
+    return {name.lower() for name in REQUIREMENT_NAME.findall(requirements)}
+
+@lru_cache(maxsize=None)
+def _read_text(filepath):
+    """Read a file once per run; several checks inspect the same file."""
+    with open(filepath, "r", encoding="utf-8") as f:
+        return f.read()
+
+@lru_cache(maxsize=None)
+def _inspect_main_py():
+    """Scan main.py once for what both the health and CORS checks look for."""
+    missing = _missing_tokens(_read_text("backend/app/main.py"), MAIN_PY_MARKERS, MAIN_PY_MARKERS_PATTERN)
+    return {
+        "health": "/health" not in missing and "/api/v1/health" not in missing,
+        "cors": "CORSMiddleware" not in missing,
+    }
+
+@lru_cache(maxsize=None)
+def _list_dir(dirpath):
+    """Names in a directory, scanned once per run (empty if it doesn't exist)."""
+    try:
+        with os.scandir(dirpath) as entries:
+            return frozenset(entry.name for entry in entries)
+    except OSError:
+        return frozenset()
+
+def _path_exists(path):
+    """Check a path against its parent's cached listing instead of a stat per check."""
+    parent, name = os.path.split(path.rstrip("/"))
+    return name in _list_dir(parent or ".")
 
 def test_file_exists(filepath, description):
     """Test if a required file exists."""
-    if Path(filepath).exists():
+    if _path_exists(filepath):
         print(f"✅ {description}: {filepath}")
         return True
     else:
@@ -20,7 +135,7 @@ def test_file_exists(filepath, description):
 
 def test_directory_exists(dirpath, description):
     """Test if a required directory exists."""
-    if Path(dirpath).exists():
+    if _path_exists(dirpath):
         print(f"✅ {description}: {dirpath}")
         return True
     else:
@@ -35,24 +150,13 @@ def test_render_yaml():
         return False
     
     try:
-        with open("render.yaml", "r") as f:
-            content = f.read()
+        content = _read_text("render.yaml")
             
-        # Check for essential components
-        required_sections = [
-            "services:",
-            "type: web",
-            "type: pserv", 
-            "type: redis",
-            "buildCommand:",
-            "startCommand:",
-            "envVars:"
-        ]
-        
-        missing = []
-        for section in required_sections:
-            if section not in content:
-                missing.append(section)
+        # Check for essential components (substring scan if PyYAML isn't installed)
+        if YAML_AVAILABLE:
+            missing = _missing_render_sections(content)
+        else:
+            missing = _missing_tokens(content, REQUIRED_RENDER_SECTIONS, RENDER_SECTIONS_PATTERN)
         
         if missing:
             print(f"❌ render.yaml missing sections: {missing}")
@@ -96,27 +200,10 @@ def test_requirements():
         return False
     
     try:
-        with open("backend/requirements.txt", "r") as f:
-            requirements = f.read()
-        
-        essential_packages = [
-            "fastapi",
-            "uvicorn",
-            "sqlalchemy", 
-            "alembic",
-            "psycopg2-binary",
-            "redis",
-            "python-chess",
-            "stockfish",
-            "httpx",
-            "pydantic",
-            "loguru"
-        ]
+        requirements = _read_text("backend/requirements.txt")
         
-        missing = []
-        for package in essential_packages:
-            if package not in requirements.lower():
-                missing.append(package)
+        missing_names = set(ESSENTIAL_PACKAGES) - _requirement_names(requirements)
+        missing = [package for package in ESSENTIAL_PACKAGES if package in missing_names]
         
         if missing:
             print(f"❌ Missing essential packages: {missing}")
@@ -137,10 +224,7 @@ def test_health_endpoint():
         return False
     
     try:
-        with open("backend/app/main.py", "r") as f:
-            main_content = f.read()
-        
-        if "/health" in main_content and "/api/v1/health" in main_content:
+        if _inspect_main_py()["health"]:
             print("✅ Health endpoints configured")
             return True
         else:
@@ -156,10 +240,7 @@ def test_cors_configuration():
     print("\\n🔍 Testing CORS configuration...")
     
     try:
-        with open("backend/app/main.py", "r") as f:
-            main_content = f.read()
-        
-        if "CORSMiddleware" in main_content:
+        if _inspect_main_py()["cors"]:
             print("✅ CORS middleware configured")
             return True
         else:
@@ -178,22 +259,9 @@ def test_environment_variables():
         return False
     
     try:
-        with open("backend/app/core/config.py", "r") as f:
-            config_content = f.read()
-        
-        required_env_vars = [
-            "POSTGRES_SERVER",
-            "POSTGRES_USER", 
-            "POSTGRES_PASSWORD",
-            "POSTGRES_DB",
-            "REDIS_HOST",
-            "SECRET_KEY"
-        ]
+        config_content = _read_text("backend/app/core/config.py")
         
-        missing = []
-        for var in required_env_vars:
-            if var not in config_content:
-                missing.append(var)
+        missing = _missing_tokens(config_content, REQUIRED_ENV_VARS, ENV_VARS_PATTERN)
         
         if missing:
             print(f"❌ Missing environment variables in config: {missing}")
@@ -206,6 +274,32 @@ def test_environment_variables():
         print(f"❌ Error checking environment variables: {e}")
         return False
 
+# Per-thread capture buffer for checks running concurrently in main()
+_captured = threading.local()
+
+class _ThreadLocalStdout:
+    """sys.stdout stand-in that sends a thread's prints to its capture buffer, if it has one."""
+    
+    def __init__(self, stream):
+        self._stream = stream
+    
+    def write(self, text):
+        buffer = getattr(_captured, "buffer", None)
+        return (self._stream if buffer is None else buffer).write(text)
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+def _run_captured(test_func):
+    """Run one check, capturing what it prints; returns (result, output, exception)."""
+    _captured.buffer = io.StringIO()
+    try:
+        return test_func(), _captured.buffer.getvalue(), None
+    except Exception as e:
+        return False, _captured.buffer.getvalue(), e
+    finally:
+        _captured.buffer = None
+
 def main():
     """Run all deployment readiness tests."""
     print("🚀 Chess Insight AI - Deployment Readiness Test")
@@ -223,14 +317,25 @@ def main():
     passed = 0
     total = len(tests)
     
-    for test_name, test_func in tests:
-        try:
-            if test_func():
-                passed += 1
-            else:
-                print(f"\\n⚠️  {test_name} test failed")
-        except Exception as e:
-            print(f"\\n💥 {test_name} test crashed: {e}")
+    # The checks only read files, so they run concurrently; output is
+    # captured per check and printed in the order above
+    stdout = sys.stdout
+    sys.stdout = _ThreadLocalStdout(stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=total) as pool:
+            futures = [pool.submit(_run_captured, test_func) for _, test_func in tests]
+            results = [future.result() for future in futures]
+    finally:
+        sys.stdout = stdout
+    
+    for (test_name, _), (result, output, error) in zip(tests, results):
+        print(output, end="")
+        if error is not None:
+            print(f"\\n💥 {test_name} test crashed: {error}")
+        elif result:
+            passed += 1
+        else:
+            print(f"\\n⚠️  {test_name} test failed")
     
     print("\\n" + "=" * 50)
     print(f"📊 Test Results: {passed}/{total} tests passed")
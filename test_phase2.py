@@ -4,168 +4,211 @@ Chess Insight AI - Phase 2 Backend Testing
 Tests all new features with gh_wilder account
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import orjson
+import sys
 import time
 from colorama import init, Fore, Style
 
-init()  # Initialize colorama for Windows
+# Color only on a terminal; redirected output (CI logs) stays plain text
+USE_COLOR = sys.stdout.isatty()
+if USE_COLOR:
+    init()  # Initialize colorama for Windows
+
+CYAN = Fore.CYAN if USE_COLOR else ""
+YELLOW = Fore.YELLOW if USE_COLOR else ""
+RESET = Style.RESET_ALL if USE_COLOR else ""
+SUCCESS_PREFIX = f"{Fore.GREEN if USE_COLOR else ''}✅ "
+INFO_PREFIX = f"{YELLOW}ℹ️  "
+ERROR_PREFIX = f"{Fore.RED if USE_COLOR else ''}❌ "
+RULE = f"{CYAN}{'='*50}{RESET}"
 
 BASE_URL = "http://localhost:8000/api/v1"
 USER_ID = 1
+TIMEOUT = 30  # seconds per request
+
+# orjson decodes the body bytes directly; faster than the stdlib-based .json()
+def parse_json(response):
+    return orjson.loads(response.content)
 
 def print_header(text):
-    print(f"\n{Fore.CYAN}{'='*50}{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}{text}{Style.RESET_ALL}")
-    print(f"{Fore.CYAN}{'='*50}{Style.RESET_ALL}\n")
+    print(f"\n{RULE}\n{CYAN}{text}{RESET}\n{RULE}\n")
 
 def print_success(text):
-    print(f"{Fore.GREEN}✅ {text}{Style.RESET_ALL}")
+    print(f"{SUCCESS_PREFIX}{text}{RESET}")
 
 def print_info(text):
-    print(f"{Fore.YELLOW}ℹ️  {text}{Style.RESET_ALL}")
+    print(f"{INFO_PREFIX}{text}{RESET}")
 
 def print_error(text):
-    print(f"{Fore.RED}❌ {text}{Style.RESET_ALL}")
-
-print_header("Chess Insight AI - Phase 2 Testing")
-
-# Test 1: Check initial tier status
-print_info("[1/8] Checking initial tier status...")
-try:
-    response = requests.get(f"{BASE_URL}/users/{USER_ID}/tier-status")
-    tier = response.json()
-    print_success(f"Tier: {tier['tier']}")
-    print(f"   AI Analyses: {tier['ai_analyses_used']}/{tier['ai_analyses_limit']}")
-    print(f"   Remaining: {tier['remaining_ai_analyses']}")
-except Exception as e:
-    print_error(f"Failed: {e}")
+    print(f"{ERROR_PREFIX}{text}{RESET}")
 
-# Test 2: Clear existing games
-print_info("\n[2/8] Clearing existing games for fresh start...")
-try:
-    response = requests.delete(f"{BASE_URL}/users/{USER_ID}/games")
-    result = response.json()
-    print_success(f"Cleared {result['games_deleted']} games")
-except Exception as e:
-    print_info("No existing games to clear")
-
-# Test 3: Fetch games with NEW comprehensive filters
-print_info("\n[3/8] Fetching games with filters...")
-print("   Filters: 25 games, rapid+blitz only, rated only")
-try:
+async def submit_analysis(client, analysis_game_ids, mode):
     payload = {
-        "game_count": 25,
-        "time_controls": ["rapid", "blitz"],
-        "rated_only": True
+        "game_ids": analysis_game_ids,
+        "mode": mode
     }
-    response = requests.post(f"{BASE_URL}/games/{USER_ID}/fetch", json=payload)
-    result = response.json()
-    print_success(f"Fetched {result['games_added']} games")
-    print(f"   Total in DB: {result['existing_games']}")
-    print(f"   Filters applied: {result.get('filters_applied', {})}")
-except Exception as e:
-    print_error(f"Failed: {e}")
-
-# Test 4: Verify fetched games
-print_info("\n[4/8] Retrieving fetched games...")
-try:
-    response = requests.get(f"{BASE_URL}/games/{USER_ID}")
-    games = response.json()
-    print_success(f"Retrieved {len(games)} games")
-    if games:
-        sample = games[0]
-        print(f"   Sample: {sample['white_username']} vs {sample['black_username']}")
-        print(f"   Time class: {sample['time_class']}")
-        print(f"   URL: {sample['chesscom_url']}")
-        
-        # Store game IDs for analysis
-        game_ids = [g['id'] for g in games[:5]]
-except Exception as e:
-    print_error(f"Failed: {e}")
-    game_ids = []
+    return await client.post(f"/analysis/{USER_ID}/analyze", json=payload)
 
-# Test 5: Test Stockfish-only analysis (doesn't count toward limit)
-print_info("\n[5/8] Testing Stockfish-only analysis...")
-if game_ids:
+# Requests run together report their errors in order, so exceptions are held until then
+async def settle(coro):
+    if coro is None:
+        return None
     try:
-        payload = {
-            "game_ids": game_ids[:2],  # First 2 games
-            "mode": "stockfish-only"
-        }
-        response = requests.post(f"{BASE_URL}/analysis/{USER_ID}/analyze", json=payload)
-        result = response.json()
-        print_success(f"Queued {result['games_queued']} games")
-        print(f"   Mode: {result.get('analysis_mode', 'N/A')}")
-        print(f"   Uses AI: {result.get('uses_ai', False)}")
-        print(f"   Tier info: {result.get('tier_info', {})}")
+        return await coro
+    except Exception as e:
+        return e
+
+def result_of(outcome):
+    if isinstance(outcome, Exception):
+        raise outcome
+    return outcome
+
+async def main():
+    # One keep-alive connection pool for the whole run
+    async with httpx.AsyncClient(base_url=BASE_URL, timeout=TIMEOUT) as client:
+        await run_tests(client)
+
+async def run_tests(client):
+    print_header("Chess Insight AI - Phase 2 Testing")
+    
+    # Test 1: Check initial tier status
+    print_info("[1/8] Checking initial tier status...")
+    try:
+        response = await client.get(f"/users/{USER_ID}/tier-status")
+        tier = parse_json(response)
+        print_success(f"Tier: {tier['tier']}")
+        print(f"   AI Analyses: {tier['ai_analyses_used']}/{tier['ai_analyses_limit']}")
+        print(f"   Remaining: {tier['remaining_ai_analyses']}")
     except Exception as e:
         print_error(f"Failed: {e}")
-else:
-    print_info("Skipping - no games available")
-
-# Test 6: Test AI-enhanced analysis (counts toward limit)
-print_info("\n[6/8] Testing AI-enhanced analysis...")
-if game_ids and len(game_ids) > 2:
+    
+    # Test 2: Clear existing games
+    print_info("\n[2/8] Clearing existing games for fresh start...")
+    try:
+        response = await client.delete(f"/users/{USER_ID}/games")
+        result = parse_json(response)
+        print_success(f"Cleared {result['games_deleted']} games")
+    except Exception as e:
+        print_info("No existing games to clear")
+    
+    # Test 3: Fetch games with NEW comprehensive filters
+    print_info("\n[3/8] Fetching games with filters...")
+    print("   Filters: 25 games, rapid+blitz only, rated only")
     try:
         payload = {
-            "game_ids": [game_ids[2]],  # Third game
-            "mode": "ai-enhanced"
+            "game_count": 25,
+            "time_controls": ["rapid", "blitz"],
+            "rated_only": True
         }
-        response = requests.post(f"{BASE_URL}/analysis/{USER_ID}/analyze", json=payload)
-        result = response.json()
-        print_success(f"Queued {result['games_queued']} games for AI analysis")
-        print(f"   Mode: {result.get('analysis_mode', 'N/A')}")
-        print(f"   Remaining AI analyses: {result.get('tier_info', {}).get('remaining_ai_analyses', 'N/A')}")
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 403:
-            error_detail = e.response.json().get('detail', {})
-            print_error(f"AI limit reached: {error_detail}")
-        else:
-            print_error(f"Failed: {e}")
+        response = await client.post(f"/games/{USER_ID}/fetch", json=payload)
+        result = parse_json(response)
+        print_success(f"Fetched {result['games_added']} games")
+        print(f"   Total in DB: {result['existing_games']}")
+        print(f"   Filters applied: {result.get('filters_applied', {})}")
     except Exception as e:
         print_error(f"Failed: {e}")
-else:
-    print_info("Skipping - no games available")
-
-# Test 7: Check updated tier status
-print_info("\n[7/8] Checking updated tier status...")
-try:
-    response = requests.get(f"{BASE_URL}/users/{USER_ID}/tier-status")
-    tier = response.json()
-    print_success(f"AI Analyses Used: {tier['ai_analyses_used']}/{tier['ai_analyses_limit']}")
-    print(f"   Remaining: {tier['remaining_ai_analyses']}")
-    if tier['remaining_ai_analyses'] == 0:
-        print_info(f"   Trial exhausted: {tier.get('upgrade_message', '')}")
-except Exception as e:
-    print_error(f"Failed: {e}")
-
-# Test 8: Test AUTO mode (intelligent fallback)
-print_info("\n[8/8] Testing AUTO mode...")
-if game_ids and len(game_ids) > 3:
+    
+    # Test 4: Verify fetched games
+    print_info("\n[4/8] Retrieving fetched games...")
+    game_ids = []
     try:
-        payload = {
-            "game_ids": [game_ids[3]],  # Fourth game
-            "mode": "auto"
-        }
-        response = requests.post(f"{BASE_URL}/analysis/{USER_ID}/analyze", json=payload)
-        result = response.json()
-        print_success(f"AUTO mode selected: {result.get('analysis_mode', 'N/A')}")
-        if result.get('analysis_mode') == 'stockfish-only':
-            print_info("   Auto-fallback to Stockfish (AI limit reached)")
-        else:
-            print_success("   Using AI-enhanced analysis")
+        response = await client.get(f"/games/{USER_ID}")
+        games = parse_json(response)
+        print_success(f"Retrieved {len(games)} games")
+        if games:
+            sample = games[0]
+            print(f"   Sample: {sample['white_username']} vs {sample['black_username']}")
+            print(f"   Time class: {sample['time_class']}")
+            print(f"   URL: {sample['chesscom_url']}")
+            
+            # Store game IDs for analysis
+            game_ids = [g['id'] for g in games[:5]]
     except Exception as e:
         print_error(f"Failed: {e}")
-else:
-    print_info("Skipping - no games available")
-
-# Summary
-print_header("Testing Summary")
-print_success("Game Filtering: Tested ✓")
-print_success("Tier Management: Tested ✓")
-print_success("Analysis Modes: Tested ✓")
-print_success("AI Usage Tracking: Tested ✓")
-
-print(f"\n{Fore.CYAN}All Phase 2 features verified!{Style.RESET_ALL}")
-print(f"{Fore.YELLOW}Note: Wait 30-60s for analysis to complete in background{Style.RESET_ALL}\n")
+        game_ids = []
+    
+    # Tests 5 and 6 analyze different games and only test 6 counts toward the AI
+    # limit, so both are submitted together; results are still reported in order.
+    # Tests 7 and 8 depend on test 6's usage count and stay sequential.
+    stockfish_outcome, ai_outcome = await asyncio.gather(
+        settle(submit_analysis(client, game_ids[:2], "stockfish-only") if game_ids else None),  # First 2 games
+        settle(submit_analysis(client, [game_ids[2]], "ai-enhanced") if game_ids and len(game_ids) > 2 else None)  # Third game
+    )
+    
+    # Test 5: Test Stockfish-only analysis (doesn't count toward limit)
+    print_info("\n[5/8] Testing Stockfish-only analysis...")
+    if stockfish_outcome is not None:
+        try:
+            response = result_of(stockfish_outcome)
+            result = parse_json(response)
+            print_success(f"Queued {result['games_queued']} games")
+            print(f"   Mode: {result.get('analysis_mode', 'N/A')}")
+            print(f"   Uses AI: {result.get('uses_ai', False)}")
+            print(f"   Tier info: {result.get('tier_info', {})}")
+        except Exception as e:
+            print_error(f"Failed: {e}")
+    else:
+        print_info("Skipping - no games available")
+    
+    # Test 6: Test AI-enhanced analysis (counts toward limit)
+    print_info("\n[6/8] Testing AI-enhanced analysis...")
+    if ai_outcome is not None:
+        try:
+            response = result_of(ai_outcome)
+            result = parse_json(response)
+            print_success(f"Queued {result['games_queued']} games for AI analysis")
+            print(f"   Mode: {result.get('analysis_mode', 'N/A')}")
+            print(f"   Remaining AI analyses: {result.get('tier_info', {}).get('remaining_ai_analyses', 'N/A')}")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 403:
+                error_detail = parse_json(e.response).get('detail', {})
+                print_error(f"AI limit reached: {error_detail}")
+            else:
+                print_error(f"Failed: {e}")
+        except Exception as e:
+            print_error(f"Failed: {e}")
+    else:
+        print_info("Skipping - no games available")
+    
+    # Test 7: Check updated tier status
+    print_info("\n[7/8] Checking updated tier status...")
+    try:
+        response = await client.get(f"/users/{USER_ID}/tier-status")
+        tier = parse_json(response)
+        print_success(f"AI Analyses Used: {tier['ai_analyses_used']}/{tier['ai_analyses_limit']}")
+        print(f"   Remaining: {tier['remaining_ai_analyses']}")
+        if tier['remaining_ai_analyses'] == 0:
+            print_info(f"   Trial exhausted: {tier.get('upgrade_message', '')}")
+    except Exception as e:
+        print_error(f"Failed: {e}")
+    
+    # Test 8: Test AUTO mode (intelligent fallback)
+    print_info("\n[8/8] Testing AUTO mode...")
+    if game_ids and len(game_ids) > 3:
+        try:
+            response = await submit_analysis(client, [game_ids[3]], "auto")  # Fourth game
+            result = parse_json(response)
+            print_success(f"AUTO mode selected: {result.get('analysis_mode', 'N/A')}")
+            if result.get('analysis_mode') == 'stockfish-only':
+                print_info("   Auto-fallback to Stockfish (AI limit reached)")
+            else:
+                print_success("   Using AI-enhanced analysis")
+        except Exception as e:
+            print_error(f"Failed: {e}")
+    else:
+        print_info("Skipping - no games available")
+    
+    # Summary
+    print_header("Testing Summary")
+    print_success("Game Filtering: Tested ✓")
+    print_success("Tier Management: Tested ✓")
+    print_success("Analysis Modes: Tested ✓")
+    print_success("AI Usage Tracking: Tested ✓")
+    
+    print(f"\n{CYAN}All Phase 2 features verified!{RESET}")
+    print(f"{YELLOW}Note: Wait 30-60s for analysis to complete in background{RESET}\n")
+
+if __name__ == "__main__":
+    asyncio.run(main())